@@ -1,13 +1,13 @@
-import csv
-import os
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from torch.utils.data import DataLoader
 from .utils.Dataset import LeakDataset
-from .utils.TrainValidate import train_model, validate_model
+from .utils.TrainValidate import validate_model, append_loss_log
+from .utils.Parallel import configure_cpu_threads, timed_train_epoch, train_cpu_parallel
 from .utils.SaveLoad import save_model_with_params
 from .utils.Seed import set_seed
+from .utils.Augment import SensorAugmentation
 
 
 class LeakLocalizationNN(nn.Module):
@@ -50,27 +50,17 @@ if __name__ == "__main__":
     set_seed(seed)
     loss_log_path = "models/training_losses_run13.csv"
 
-    # Create CSV file and write header if it doesn't exist
-    if not os.path.exists(loss_log_path):
-        with open(loss_log_path, mode="w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "epoch",
-                "train_loss",
-                "val_loss",
-                "val_leak_x_loss_norm",
-                "val_leak_y_loss_norm",
-                "val_leak_size_loss_norm",
-                "val_leak_x_loss_real",
-                "val_leak_y_loss_real",
-                "val_leak_size_loss_real"
-            ])
-
     input_dim = 504  # Number of pressure head readings per input sample
     hidden_dims = [45, 40, 45]  # Custom hidden layers configuration
     output_dim = 3 
     model_save_path = "models/best_leak_localization_model_run13.pth"
 
+    cpu_workers = 1  # >1 trains with DistributedDataParallel (gloo) across local CPU processes
+    batch_size = 32
+    autocast_dtype = None  # e.g. torch.bfloat16 for mixed-precision training on CPU
+    learning_rate = 0.001
+    use_augmentation = False  # True trains on sensor-corrupted batches (see below)
+
     csv_file = "leak_data.csv"  # Path to your CSV file
     input_columns = ["Node1", "Node2", "Node3", "Node4", "Node5"]  # Define input columns
     output_columns = ["X_coor", "Y_coor", "burst_size"]  # Define output columns
@@ -81,48 +71,69 @@ if __name__ == "__main__":
     val_size = len(dataset) - train_size
 
     train_dataset, val_dataset = torch.utils.data.random_split(dataset, [train_size, val_size])
-    train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=32, shuffle=False)
+
+    # Get the normalization parameters
+    normalization_params = dataset.get_normalization_params()
+    output_means = normalization_params["output_means"]
+    output_stds = normalization_params["output_stds"]
+    num_epochs = 20
+
+    # With use_augmentation, sensor noise, bias, drift and missing readings are drawn afresh
+    # for every training batch (metres of pressure head). It trades clean-input accuracy for
+    # robustness to real sensors, so it is off by default
+    augment = None
+    if use_augmentation:
+        augment = SensorAugmentation.from_normalization(
+            normalization_params, input_columns, noise_std=0.05, bias_std=0.2, drift_std=0.2,
+            dropout_prob=0.02, sensor_dropout_prob=0.01, seed=seed
+        )
+
+    if cpu_workers > 1:
+        train_cpu_parallel(
+            LeakLocalizationNN,
+            {"input_dim": input_dim, "hidden_dims": hidden_dims, "output_dim": output_dim},
+            train_dataset,
+            val_dataset,
+            normalization_params,
+            num_workers=cpu_workers,
+            num_epochs=num_epochs,
+            lr=learning_rate,
+            batch_size=batch_size,
+            seed=seed,
+            model_save_path=model_save_path,
+            loss_log_path=loss_log_path,
+            augment=augment,
+        )
+        raise SystemExit(0)
+
+    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
+    val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False)
 
     # Initialize model, optimizer, and loss function
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    if device.type == "cpu":
+        configure_cpu_threads()
     model = LeakLocalizationNN(input_dim=input_dim, hidden_dims=hidden_dims, output_dim=output_dim)
     model.to(device)
 
-    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
     criterion = nn.MSELoss()
 
     best_val_loss = float("inf")
-    # Get the normalization parameters
-    normalization_params = dataset.get_normalization_params()
-    output_means = normalization_params["output_means"]
-    output_stds = normalization_params["output_stds"]
     # Training loop
-    num_epochs = 20
     for epoch in range(num_epochs):
-        train_loss = train_model(model, train_loader, optimizer, criterion, device)
+        train_loss, samples_per_sec = timed_train_epoch(model, train_loader, optimizer, criterion, device, autocast_dtype, augment)
         val_loss, normalized_output_losses, denormalized_output_losses = validate_model(
             model, val_loader, criterion, device, output_means, output_stds
         )
 
-        print(f"Epoch {epoch + 1}/{num_epochs}, Train Loss: {train_loss:.4f}, Validation Loss: {val_loss:.4f}")
+        print(f"Epoch {epoch + 1}/{num_epochs}, Train Loss: {train_loss:.4f}, Validation Loss: {val_loss:.4f}, Throughput: {samples_per_sec:.0f} samples/sec")
         print("Validation Loss Breakdown (Normalized):", normalized_output_losses)
         print("Validation Loss Breakdown (Denormalized, Real Units):", denormalized_output_losses)
         print("_______________________________________________________________________________________")
 
-        with open(loss_log_path, mode="a", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                epoch + 1,
-                train_loss,
-                val_loss,
-                normalized_output_losses["leak_x"],
-                normalized_output_losses["leak_y"],
-                normalized_output_losses["leak_size_lps"],
-                denormalized_output_losses["leak_x"],
-                denormalized_output_losses["leak_y"],
-                denormalized_output_losses["leak_size_lps"],
-            ])
+        append_loss_log(loss_log_path, epoch + 1, train_loss, val_loss,
+                        normalized_output_losses, denormalized_output_losses, samples_per_sec)
 
         
         if val_loss < best_val_loss:
@@ -135,6 +146,7 @@ if __name__ == "__main__":
                 input_stds=normalization_params["input_stds"],
                 output_means=normalization_params["output_means"],
                 output_stds=normalization_params["output_stds"],
+                export_path=model_save_path.replace(".pth", ".npz"),
             )
             print(f"Best model saved at epoch {epoch + 1} with validation loss: {best_val_loss:.4f}")
             print("---------------------------------------------------------------------------------------")
\ No newline at end of file
@@ -0,0 +1,432 @@
+"""
+Benchmark Suite
+Times INP parsing (including generated networks of increasing size, see
+synthetic_network.py), scenario simulation (EPANET and the batched solver in
+hydraulic_solver.py), dataset building and loading, training
+throughput and API latency under concurrent load, and writes the numbers as JSON
+tagged with the git commit so runs can be compared across commits
+
+Run from the repository root:
+    python -m backend.benchmark --suites parser generate api --output bench.json
+    python -m backend.benchmark --compare old.json new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).parent
+MAIN_INP = BACKEND_DIR / "main_network.inp"
+SUITES = ("parser", "synthetic", "generate", "gga", "build_dataset", "dataset", "epoch", "api")
+DEFAULT_ENDPOINTS = ["/api/network", "/api/leak-predictions", "/api/telemetry/status", "/metrics"]
+# Read by main.py at import to place its history store and prediction archive (DATA_DIR_ENV there)
+API_DATA_DIR_ENV = "LEAK_API_DATA_DIR"
+
+
+def summarize(samples: List[float]) -> Dict:
+    """Distribution of a list of timings in seconds"""
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "min_s": samples[0],
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "p95_s": samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+        "max_s": samples[-1],
+    }
+
+
+def time_call(fn: Callable, repeats: int, warmup: int = 1) -> Dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def environment() -> Dict:
+    """Commit, interpreter and library versions the numbers were measured with"""
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], capture_output=True, text=True, cwd=BACKEND_DIR).stdout.strip()
+        except OSError:
+            return ""
+
+    versions = {"numpy": np.__version__}
+    for name in ("pandas", "wntr", "torch", "fastapi"):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def bench_parser(args) -> Dict:
+    from .epanet_parser import EPANETParser
+
+    results = {}
+    for inp in args.inp:
+        stats = time_call(lambda: EPANETParser(str(inp)), args.repeats)
+        parser = EPANETParser(str(inp))
+        stats.update({"nodes": len(parser.nodes), "pipes": len(parser.pipes)})
+        topology = time_call(parser.get_network_topology, args.repeats)
+        results[Path(inp).name] = {"parse": stats, "get_network_topology": topology}
+    return results
+
+
+def bench_synthetic(args) -> Dict:
+    import wntr
+    from .epanet_parser import EPANETParser
+    from .synthetic_network import write_synthetic_network
+
+    # Scaling curve: parse and simulate generated networks of increasing size
+    out_dir = Path(tempfile.mkdtemp())
+    results = {}
+    for size in args.synthetic_sizes:
+        inp = out_dir / f"synthetic_{args.synthetic_topology}_{size}.inp"
+        start = time.perf_counter()
+        counts = write_synthetic_network(inp, size, args.synthetic_topology, seed=args.seed)
+        entry = {**counts, "write_s": time.perf_counter() - start, "bytes": inp.stat().st_size}
+
+        start = time.perf_counter()
+        parser = EPANETParser(str(inp))
+        entry["parse_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        json.dumps(parser.get_network_topology())
+        entry["topology_json_s"] = time.perf_counter() - start
+
+        if size <= args.synthetic_simulate_max:
+            start = time.perf_counter()
+            wn = wntr.network.WaterNetworkModel(str(inp))
+            entry["wntr_model_s"] = time.perf_counter() - start
+            start = time.perf_counter()
+            wntr.sim.EpanetSimulator(wn).run_sim(file_prefix=str(out_dir / f"sim_{size}"))
+            entry["simulate_24h_s"] = time.perf_counter() - start
+        results[str(size)] = entry
+    return results
+
+
+def _sample_nodes(n: int, seed: int) -> List[str]:
+    import wntr
+    junctions = wntr.network.WaterNetworkModel(str(MAIN_INP)).junction_name_list
+    return list(np.random.default_rng(seed).choice(junctions, size=min(n, len(junctions)), replace=False))
+
+
+def bench_generate(args) -> Dict:
+    from .generate_data import DataGenerator
+
+    nodes = _sample_nodes(args.scenarios, args.seed)
+
+    # As the API runs it: a fresh generator (WNTR model, INP write, ENopen) per scenario
+    fresh = []
+    for node in nodes:
+        start = time.perf_counter()
+        DataGenerator(str(MAIN_INP), step_m=60, duration_h=24, run_name="benchmark", keep_files=False).generate_data(
+            node, 0.5, 0, 60, 4, write_csv=False)
+        fresh.append(time.perf_counter() - start)
+
+    # Batch jobs: one open EPANET project reused for every scenario
+    gd = DataGenerator(str(MAIN_INP), step_m=60, duration_h=24, run_name="benchmark", keep_files=False)
+    persistent = []
+    try:
+        for node in nodes:
+            start = time.perf_counter()
+            gd.generate_data(node, 0.5, 0, 60, 4, write_csv=False, close=False)
+            persistent.append(time.perf_counter() - start)
+    finally:
+        gd.close()
+
+    # 10-minute sampling with fixed vs adaptive hydraulic steps
+    sub_hourly = {}
+    for adaptive in (False, True):
+        gd = DataGenerator(str(MAIN_INP), step_m=10, duration_h=24, run_name="benchmark", adaptive_steps=adaptive,
+                           keep_files=False)
+        samples, solves = [], []
+        try:
+            for node in nodes:
+                start = time.perf_counter()
+                gd.generate_data(node, 0.5, 0, 70, 4, write_csv=False, close=False)
+                samples.append(time.perf_counter() - start)
+                solves.append(gd.hydraulic_solves)
+        finally:
+            gd.close()
+        sub_hourly["adaptive" if adaptive else "fixed"] = {**summarize(samples), "hydraulic_solves": float(np.mean(solves))}
+    return {"fresh_generator": summarize(fresh), "persistent_generator": summarize(persistent),
+            "ten_minute_steps": sub_hourly}
+
+
+def bench_gga(args) -> Dict:
+    from .hydraulic_solver import HydraulicSolver
+
+    # Batched sparse solver vs. the persistent EPANET generator, on the same scenarios
+    start = time.perf_counter()
+    solver = HydraulicSolver(MAIN_INP)
+    setup_s = time.perf_counter() - start
+    rng = np.random.default_rng(args.seed)
+    nodes = list(rng.choice(solver.junctions, args.gga_scenarios))
+    emitters = rng.uniform(0.1, 5.0, args.gga_scenarios)
+    starts = rng.integers(1, 24, args.gga_scenarios) * 60
+    durations = rng.integers(1, 13, args.gga_scenarios)
+    start = time.perf_counter()
+    solver.simulate_scenarios(nodes, emitters, 0, starts, durations)
+    solver_s = time.perf_counter() - start
+    validation = solver.validate(MAIN_INP, num_scenarios=args.scenarios, seed=args.seed)
+    return {
+        "setup_s": setup_s,
+        "scenarios": args.gga_scenarios,
+        "solver_scenarios_per_s": args.gga_scenarios / solver_s,
+        "epanet_scenarios_per_s": validation["scenarios"] / validation["epanet_s"],
+        "pressure_max_abs_m": validation["pressure_max_abs_m"],
+    }
+
+
+def _scratch_dir(args) -> Path:
+    # Per-run temporary directory for everything the suites would otherwise write into
+    # backend/ (quarantine, history store, prediction archive); removed by main()
+    if getattr(args, "_scratch_dir", None) is None:
+        args._scratch_dir = Path(tempfile.mkdtemp(prefix="leak-benchmark-"))
+    return args._scratch_dir
+
+
+def _build(args, path: Path) -> Dict:
+    from .generate_data import OBS_NODES
+    from .legacy_generate_data import build_dataset
+    from .scenario_quarantine import ScenarioQuarantine
+
+    nodes = _sample_nodes(args.scenarios, args.seed)
+    emitters = [0.1389, 0.4167]
+    start = time.perf_counter()
+    df = build_dataset(str(MAIN_INP), OBS_NODES, nodes, sample_minutes=60, emitter_choices=emitters,
+                       emitter_exponent=1, random_seed=args.seed,
+                       quarantine=ScenarioQuarantine(MAIN_INP, _scratch_dir(args) / "quarantine.json"))
+    elapsed = time.perf_counter() - start
+    df = df[df["leak"] == 1]
+    df.to_csv(path, index=False)
+    return {"scenarios": len(df) + 1, "seconds": elapsed, "scenarios_per_sec": (len(df) + 1) / elapsed}
+
+
+def _dataset_csv(args) -> Path:
+    # build_dataset output reused by the dataset and epoch suites
+    if getattr(args, "_dataset_csv", None) is None:
+        args._dataset_csv = Path(tempfile.mkdtemp()) / "benchmark_dataset.csv"
+        args._build_result = _build(args, args._dataset_csv)
+    return args._dataset_csv
+
+
+def _columns():
+    from .generate_data import OBS_NODES
+    return [f"{n}_Hour{h}" for n in OBS_NODES for h in range(24)], ["leak_x", "leak_y", "leak_size_lps"]
+
+
+def bench_build_dataset(args) -> Dict:
+    _dataset_csv(args)
+    return args._build_result
+
+
+def bench_dataset(args) -> Dict:
+    from .utils.Dataset import LeakDataset
+
+    csv_file = _dataset_csv(args)
+    input_columns, output_columns = _columns()
+    stats = time_call(lambda: LeakDataset(str(csv_file), input_columns, output_columns), args.repeats)
+    stats["rows"] = len(LeakDataset(str(csv_file), input_columns, output_columns))
+    return stats
+
+
+def bench_epoch(args) -> Dict:
+    import pandas as pd
+    import torch
+    from torch.utils.data import DataLoader
+
+    from .Localization import LeakLocalizationNN
+    from .run_model import MODEL_HIDDEN_DIMS
+    from .utils.Dataset import LeakDataset
+    from .utils.Parallel import timed_train_epoch
+    from .utils.Seed import set_seed
+
+    # Tile the small built dataset up to a realistic epoch size
+    input_columns, output_columns = _columns()
+    df = pd.read_csv(_dataset_csv(args))
+    tiled = Path(tempfile.mkdtemp()) / "benchmark_epoch.csv"
+    pd.concat([df] * int(np.ceil(args.epoch_samples / max(len(df), 1))))[:args.epoch_samples].to_csv(tiled, index=False)
+
+    set_seed(args.seed)
+    dataset = LeakDataset(str(tiled), input_columns, output_columns)
+    loader = DataLoader(dataset, batch_size=args.batch_size, shuffle=True)
+    model = LeakLocalizationNN(input_dim=len(input_columns), hidden_dims=MODEL_HIDDEN_DIMS, output_dim=3)
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+    criterion = torch.nn.MSELoss()
+
+    rates = [timed_train_epoch(model, loader, optimizer, criterion, torch.device("cpu"))[1]
+             for _ in range(args.epochs)]
+    return {
+        "samples": len(dataset),
+        "batch_size": args.batch_size,
+        "threads": torch.get_num_threads(),
+        "samples_per_sec": {"median": statistics.median(rates), "max": max(rates), "all": rates},
+    }
+
+
+def _start_server(data_dir: Path):
+    import uvicorn
+    os.environ[API_DATA_DIR_ENV] = str(data_dir)
+    from .main import app
+    from .utils.Parallel import _free_port
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def bench_api(args) -> Dict:
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, thread, base_url = _start_server(_scratch_dir(args))
+
+    def fetch(url):
+        start = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    results = {}
+    try:
+        for endpoint in args.endpoint or DEFAULT_ENDPOINTS:
+            url = base_url.rstrip("/") + endpoint
+            fetch(url)  # warm caches and lazy model loads
+            per_concurrency = {}
+            for concurrency in args.concurrency:
+                started = time.perf_counter()
+                with ThreadPoolExecutor(concurrency) as pool:
+                    samples = list(pool.map(fetch, [url] * args.requests))
+                wall = time.perf_counter() - started
+                per_concurrency[str(concurrency)] = {**summarize(samples), "requests_per_sec": len(samples) / wall}
+            results[endpoint] = per_concurrency
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join()
+    return results
+
+
+BENCHMARKS = {
+    "parser": bench_parser,
+    "synthetic": bench_synthetic,
+    "generate": bench_generate,
+    "gga": bench_gga,
+    "build_dataset": bench_build_dataset,
+    "dataset": bench_dataset,
+    "epoch": bench_epoch,
+    "api": bench_api,
+}
+
+
+def _flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    # Comparable scalars: medians for timings, rates for throughputs
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif (key.endswith("_s") and key not in ("min_s", "mean_s", "p95_s", "max_s")
+              or key in ("scenarios_per_sec", "requests_per_sec", "median")) and isinstance(value, (int, float)):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(old_path: str, new_path: str):
+    """Print the relative change of every comparable number between two result files"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_flat, new_flat = _flatten(old["results"]), _flatten(new["results"])
+    print(f"{old['environment']['commit'][:10]} -> {new['environment']['commit'][:10]}")
+    for name in sorted(old_flat.keys() & new_flat.keys()):
+        a, b = old_flat[name], new_flat[name]
+        change = (b - a) / a * 100 if a else float("nan")
+        print(f"{name:80s} {a:12.6g} -> {b:12.6g} ({change:+.1f}%)")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    ap.add_argument("--output", help="Result JSON path (default benchmark_results/<commit>-<time>.json)")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    ap.add_argument("--repeats", type=int, default=10, help="Timed repetitions for micro benchmarks")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--inp", nargs="+", default=[str(MAIN_INP), str(BACKEND_DIR / "PATTERN.inp")],
+                    help="INP files for the parser suite")
+    ap.add_argument("--synthetic-sizes", nargs="+", type=int, default=[1000, 10000, 50000],
+                    help="Junction counts of the generated networks for the synthetic suite")
+    ap.add_argument("--synthetic-topology", choices=("grid", "tree", "looped"), default="looped")
+    ap.add_argument("--synthetic-simulate-max", type=int, default=50000,
+                    help="Largest synthetic network also run through EPANET")
+    ap.add_argument("--scenarios", type=int, default=10, help="Leak nodes simulated by generate/build_dataset")
+    ap.add_argument("--gga-scenarios", type=int, default=500, help="Leak scenarios solved by the gga suite")
+    ap.add_argument("--epochs", type=int, default=3)
+    ap.add_argument("--epoch-samples", type=int, default=4096)
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--base-url", help="Benchmark a running server instead of an in-process one")
+    ap.add_argument("--endpoint", action="append", help="Endpoint path (repeatable), e.g. '/api/generate_data?node_id=NODE_474'")
+    ap.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    ap.add_argument("--requests", type=int, default=200, help="Requests per endpoint and concurrency level")
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = {"environment": environment(), "config": {k: v for k, v in vars(args).items() if k != "compare"}, "results": {}}
+    try:
+        for suite in args.suites:
+            print(f"[BENCH] {suite} ...")
+            start = time.perf_counter()
+            report["results"][suite] = BENCHMARKS[suite](args)
+            print(f"[BENCH] {suite} done in {time.perf_counter() - start:.1f}s")
+    finally:
+        if getattr(args, "_scratch_dir", None) is not None:
+            shutil.rmtree(args._scratch_dir, ignore_errors=True)
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = Path("benchmark_results") / f"{report['environment']['commit'][:10] or 'nocommit'}-{stamp}.json"
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[BENCH] wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
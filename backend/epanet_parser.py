@@ -16,6 +16,9 @@ class NodeInfo:
     x: float
     y: float
     elevation: float = 0.0
+    demand: float = 0.0
+    pattern: Optional[str] = None
+    emitter: float = 0.0
 
 
 @dataclass
@@ -25,6 +28,9 @@ class PipeInfo:
     to_node: str
     length: float
     diameter: float
+    roughness: float = 100.0
+    minor_loss: float = 0.0
+    status: str = "OPEN"
 
 
 class EPANETParser:
@@ -34,6 +40,9 @@ class EPANETParser:
         self.inp_file = inp_file_path
         self.nodes: Dict[str, NodeInfo] = {}
         self.pipes: Dict[str, PipeInfo] = {}
+        self.patterns: Dict[str, List[float]] = {}
+        self.options: Dict[str, str] = {}
+        self.times: Dict[str, str] = {}
         self.parse_inp_file()
     
     def parse_inp_file(self):
@@ -47,6 +56,11 @@ class EPANETParser:
             self._parse_reservoirs(content)
             self._parse_tanks(content)
             self._parse_pipes(content)
+            self._parse_demands(content)
+            self._parse_emitters(content)
+            self._parse_status(content)
+            self._parse_patterns(content)
+            self._parse_options(content)
             self._parse_coordinates(content)
             
         except FileNotFoundError:
@@ -80,7 +94,9 @@ class EPANETParser:
                     type='junction',
                     x=0.0,
                     y=0.0,
-                    elevation=elevation
+                    elevation=elevation,
+                    demand=float(parts[2]) if len(parts) > 2 else 0.0,
+                    pattern=parts[3] if len(parts) > 3 else None
                 )
     
     def _parse_reservoirs(self, content: str):
@@ -135,9 +151,63 @@ class EPANETParser:
                     from_node=from_node,
                     to_node=to_node,
                     length=length,
-                    diameter=diameter
+                    diameter=diameter,
+                    roughness=float(parts[5]) if len(parts) > 5 else 100.0,
+                    minor_loss=float(parts[6]) if len(parts) > 6 else 0.0,
+                    status=parts[7].upper() if len(parts) > 7 else "OPEN"
                 )
     
+    def _parse_demands(self, content: str):
+        """Parse the DEMANDS section (replaces the junction's base demand; categories are summed)"""
+        lines = self._parse_section(content, 'DEMANDS')
+        replaced = set()
+        
+        for line in lines:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0] in self.nodes:
+                node = self.nodes[parts[0]]
+                if parts[0] not in replaced:
+                    node.demand = 0.0
+                    replaced.add(parts[0])
+                node.demand += float(parts[1])
+                if len(parts) > 2:
+                    node.pattern = parts[2]
+    
+    def _parse_emitters(self, content: str):
+        """Parse emitter coefficients"""
+        lines = self._parse_section(content, 'EMITTERS')
+        
+        for line in lines:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0] in self.nodes:
+                self.nodes[parts[0]].emitter = float(parts[1])
+    
+    def _parse_status(self, content: str):
+        """Parse initial link status overrides (OPEN/CLOSED/CV)"""
+        lines = self._parse_section(content, 'STATUS')
+        
+        for line in lines:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0] in self.pipes:
+                self.pipes[parts[0]].status = parts[1].upper()
+    
+    def _parse_patterns(self, content: str):
+        """Parse time patterns (multipliers of a pattern may span several lines)"""
+        lines = self._parse_section(content, 'PATTERNS')
+        
+        for line in lines:
+            parts = line.split()
+            if len(parts) >= 2:
+                self.patterns.setdefault(parts[0], []).extend(float(v) for v in parts[1:])
+    
+    def _parse_options(self, content: str):
+        """Parse OPTIONS and TIMES as upper-cased "KEY WORDS" -> last value"""
+        for section, target in (('OPTIONS', self.options), ('TIMES', self.times)):
+            for line in self._parse_section(content, section):
+                parts = line.split()
+                if len(parts) >= 2:
+                    target[" ".join(parts[:-1]).upper()] = parts[-1]
+    
     def _parse_coordinates(self, content: str):
         """Parse node coordinates"""
         lines = self._parse_section(content, 'COORDINATES')
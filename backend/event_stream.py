@@ -0,0 +1,60 @@
+"""
+Server-Sent Events
+Fan-out of live events (new predictions) to every connected SSE client
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Optional, Set
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class EventBroadcaster:
+    """
+    Publish/subscribe hub for SSE clients
+    publish() may be called from any thread; each subscriber gets its own bounded
+    queue so a slow client drops events instead of growing memory
+    """
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _put(self, message: str):
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()  # drop the oldest event for this slow client
+            queue.put_nowait(message)
+
+    def publish(self, event: str, data: Any):
+        """Send an event to every current subscriber"""
+        if self._loop is None or not self._subscribers:
+            return
+        message = format_sse(event, data)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._put(message)
+        else:
+            self._loop.call_soon_threadsafe(self._put, message)
+
+    async def subscribe(self, keepalive_s: float = 15.0) -> AsyncIterator[str]:
+        """Yield SSE messages for one client until it disconnects"""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers.add(queue)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=keepalive_s)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self._subscribers.discard(queue)
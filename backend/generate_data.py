@@ -5,9 +5,13 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 import wntr
-from wntr.epanet.toolkit import ENepanet
+from wntr.epanet.toolkit import ENepanet, ENgetwarning
 from wntr.epanet.util import EN
 
+from .hourly_aggregator import HourlyAggregator
+from .metrics import STAGE_SECONDS, timed
+from .scenario_quarantine import SimulationDiverged
+
 EPANET_OUT_DIR = Path("epanet_runs")
 EPANET_OUT_DIR.mkdir(exist_ok=True)
 
@@ -29,9 +33,25 @@ OBS_NODES=[
 ]
 
 class DataGenerator():
-    def __init__(self, inp_file: str,step_m: int = 10,duration_h: int = 24):
+    def __init__(self, inp_file: str,step_m: int = 10,duration_h: int = 24, run_name: str = "tmp", adaptive_steps: bool = False,
+                 abort_on_warnings: bool = False, keep_files: bool = True):
+        # adaptive_steps: solve hydraulics only where the state can change (pattern steps,
+        # leak on/off, window edges) and hold each solution over the sampling steps it
+        # covers. Exact without tanks or controls, which are the only other sources of
+        # change between pattern steps.
+        # A non-finite pressure or demand always aborts a run with SimulationDiverged;
+        # abort_on_warnings (for dataset builds) does the same at the first EPANET warning
+        # (unbalanced, disconnected, negative pressures, ...). Interactive runs keep
+        # warned results: negative pressures are a valid outcome of a large leak.
+        # keep_files=False deletes the run's .inp/.rpt/.bin from epanet_runs on close.
         self.inp_file = inp_file
-        self.wn = wntr.network.WaterNetworkModel(self.inp_file)
+        with timed("wntr_model"):
+            self.wn = wntr.network.WaterNetworkModel(self.inp_file)
+        if adaptive_steps and (self.wn.num_tanks > 0 or len(self.wn.control_name_list) > 0):
+            raise ValueError("adaptive_steps needs a network without tanks or controls")
+        self.adaptive_steps = adaptive_steps
+        self.abort_on_warnings = abort_on_warnings
+        self.hydraulic_solves = 0  # ENrunH calls of the last generate_data run
         self.wn.options.hydraulic.emitter_exponent = float(1.0)
         
         # CONSTANTS
@@ -45,14 +65,33 @@ class DataGenerator():
         
         self.total_steps= (self.TOTAL_HOURS * 3600) // self.STEP_S
 
-        # Write a clean INP for EPANET engine
-        inp_tmp = EPANET_OUT_DIR / "tmp.inp"
-        rpt_tmp = EPANET_OUT_DIR / "tmp.rpt"
-        out_tmp = EPANET_OUT_DIR / "tmp.bin"
-        wntr.network.io.write_inpfile(self.wn, inp_tmp)
-
-        self.epnet = ENepanet()
-        self.epnet.ENopen(str(inp_tmp), str(rpt_tmp), str(out_tmp))
+        # Write a clean INP for EPANET engine (one run_name per concurrent generator)
+        inp_tmp = EPANET_OUT_DIR / f"{run_name}.inp"
+        rpt_tmp = EPANET_OUT_DIR / f"{run_name}.rpt"
+        out_tmp = EPANET_OUT_DIR / f"{run_name}.bin"
+        self.keep_files = keep_files
+        self.run_files = (inp_tmp, rpt_tmp, out_tmp)
+        with timed("write_inpfile"):
+            wntr.network.io.write_inpfile(self.wn, inp_tmp)
+
+        with timed("en_open"):
+            self.epnet = ENepanet()
+            self.epnet.ENopen(str(inp_tmp), str(rpt_tmp), str(out_tmp))
+
+    def _breakpoints(self, collection_start_s: int, collection_end_s: int, leak_start_s: int, leak_end_s: int) -> np.ndarray:
+        # Hydraulic times adaptive mode must stop at: window edges, pattern steps, and the
+        # sampling steps where the emitter is toggled and where the toggle first shows
+        step = self.STEP_S
+        pattern_step = int(self.wn.options.time.pattern_timestep)
+        pattern_start = int(self.wn.options.time.pattern_start)
+        first_pattern = -(pattern_start % pattern_step)
+        points = [collection_start_s, collection_end_s]
+        points.extend(range(first_pattern, collection_end_s, pattern_step))
+        for edge in (leak_start_s, leak_end_s):
+            toggle = -(-edge // step) * step  # first sampling step at or after the edge
+            points.extend([toggle, toggle + step])
+        points = np.unique(np.array(points, dtype=np.int64))
+        return points[(points > 0) & (points <= collection_end_s)]
 
     def get_resolution_label(self,sample_minutes: int) -> str:
         return RESOLUTION_MAP.get(sample_minutes, f"Min{sample_minutes}")
@@ -84,13 +123,6 @@ class DataGenerator():
 
         return 1.0
 
-    def _aggregate_to_hourly(self, pressure_df: pd.DataFrame, total_hours: int) -> pd.DataFrame:
-        df = pressure_df.copy()
-        df.index = df.index.astype(int)
-        df["hour_index"] = df.index // 3600
-        hourly = df.groupby("hour_index").mean(numeric_only=True)
-        return hourly.reindex(range(total_hours))
-
     def _EN(self, name: str) -> int:
         # robust constant getter across WNTR versions
         if hasattr(EN, name):
@@ -104,8 +136,14 @@ class DataGenerator():
         emitter_cof:float,
         collection_start_hour:int,
         leak_start_min:int,
-        leak_duration_hours:int
+        leak_duration_hours:int,
+        progress_callback=None,
+        write_csv:bool=True,
+        close:bool=True
     ):
+        # progress_callback(sim_time_s, end_time_s) is called after every hydraulic step.
+        # close=False keeps the EPANET project open so the generator can run further
+        # scenarios (batch jobs); call close() when done.
         collection_start_s = int(round(collection_start_hour * 3600.0))
         collection_end_s = int(round(collection_start_hour + self.TOTAL_HOURS) * 3600.0)
 
@@ -115,8 +153,12 @@ class DataGenerator():
 
         leak_start_s = int(round(collection_start_s + float(leak_start_min) * 60.0))
         leak_end_s = int(leak_start_s + float(leak_duration_hours) * 3600)
+        # Quarantine key of this scenario, see ScenarioQuarantine
+        scenario = {"leak_start_s": leak_start_s, "leak_duration_s": leak_end_s - leak_start_s}
         
         node.emitter_coefficient = 0.0 # type: ignore
+        leak_idx = None
+        hydraulics_open = False
 
         try:
             # Map node names -> EPANET indices
@@ -133,16 +175,22 @@ class DataGenerator():
             # Force EPANET engine timesteps (don’t rely only on the INP)
             self.epnet.ENsettimeparam(self._EN("DURATION"), int(collection_end_s))
             self.epnet.ENsettimeparam(self._EN("HYDSTEP"), self.STEP_S)
-            self.epnet.ENsettimeparam(self._EN("REPORTSTEP"), self.STEP_S)
+            # A report step longer than the run lets adaptive HYDSTEPs exceed STEP_S
+            self.epnet.ENsettimeparam(self._EN("REPORTSTEP"), collection_end_s if self.adaptive_steps else self.STEP_S)
             self.epnet.ENsettimeparam(self._EN("REPORTSTART"), 0)    
+            breakpoints = self._breakpoints(collection_start_s, collection_end_s, leak_start_s, leak_end_s)
 
             # Init hydraulics
+            loop_started = time.perf_counter()
             self.epnet.ENopenH()
+            hydraulics_open = True
             self.epnet.ENinitH(0)
 
             # Collect pressures at each report step
             pressures = []
             times = []
+            # Hourly means of the collection window, closed on each hour boundary
+            hourly = HourlyAggregator(OBS_NODES, step_m=self.STEP_S // 60, origin_s=collection_start_s, total_hours=self.TOTAL_HOURS)
 
             # Collect leak-node pressure during leak window for leak_size calculation
             leak_press_series = []
@@ -152,9 +200,14 @@ class DataGenerator():
             started = False
             ended = False
             step_index = 0
+            self.hydraulic_solves = 0
 
             while True:
                 t = self.epnet.ENrunH()  # current time (seconds)
+                self.hydraulic_solves += 1
+                code = self.epnet.errcode
+                if self.abort_on_warnings and 0 < code < 100:
+                    raise SimulationDiverged(leak_node, emitter_cof, t, ENgetwarning(code, t), code=code, **scenario)
 
                 # Toggle emitter exactly at the time
                 if leak_idx is not None:
@@ -165,7 +218,9 @@ class DataGenerator():
                         self.epnet.ENsetnodevalue(leak_idx, self._EN("EMITTER"), 0.0)
                         ended = True
 
-                # Read pressures for observation nodes if inside collection window
+                # Read pressures for observation nodes if inside collection window (adaptive
+                # mode stops at its start, so earlier solutions never reach into it)
+                row = None
                 if collection_start_s <= t < collection_end_s:
                     row = {}
                     for n in OBS_NODES:
@@ -173,29 +228,54 @@ class DataGenerator():
                         p = float(p)
 
                         if not math.isfinite(p):
-                            fail_time_s = int(t)
-                            fail_node = n
-                            print(f"[NONFINITE] t={fail_time_s}s node={fail_node} leak_node={leak_node} C={emitter_cof}")
-                            break
+                            raise SimulationDiverged(leak_node, emitter_cof, t, "non-finite pressure", node=n, **scenario)
                         row[n] = float(p)
-                    pressures.append(row)
-                    times.append(step_index)
-                    step_index += 1
 
                 # Leak node pressure
                 if leak_idx is not None:
                     pL = float(self.epnet.ENgetnodevalue(leak_idx, self._EN("PRESSURE")))
                     dL = float(self.epnet.ENgetnodevalue(leak_idx, self._EN("DEMAND")))
-                    leak_press_series.append((int(t), pL))
-                    leak_demand_series.append((int(t), dL))
-
+                    if not (math.isfinite(pL) and math.isfinite(dL)):
+                        raise SimulationDiverged(leak_node, emitter_cof, t, "non-finite leak node pressure or demand",
+                                                 node=leak_node, **scenario)
+
+                if self.adaptive_steps:
+                    later = breakpoints[breakpoints > t]
+                    if len(later):
+                        self.epnet.ENsettimeparam(self._EN("HYDSTEP"), int(later[0] - t))
                 tstep = self.epnet.ENnextH()
+
+                # The solution holds until the next hydraulic time: one sampling step, or
+                # several in adaptive mode
+                for ts in range(int(t), int(t) + max(int(tstep), 1), self.STEP_S):
+                    if row is not None and collection_start_s <= ts < collection_end_s:
+                        pressures.append(row)
+                        times.append(step_index)
+                        step_index += 1
+                        hourly.add(ts, np.array([row.get(n, np.nan) for n in OBS_NODES]))
+                    if leak_idx is not None:
+                        leak_press_series.append((ts, pL))
+                        leak_demand_series.append((ts, dL))
+
+                if progress_callback is not None:
+                    progress_callback(int(t), collection_end_s)
+
                 if tstep <= 0:
                     break
             self.epnet.ENcloseH()
+            hydraulics_open = False
+            STAGE_SECONDS.observe(time.perf_counter() - loop_started, stage="hydraulic_loop")
+            hourly.flush()
 
         finally:
-            self.epnet.ENclose()
+            # An aborted run leaves hydraulics open; close them so a generator kept open
+            # (close=False) can run the next scenario
+            if hydraulics_open:
+                self.epnet.ENcloseH()
+            if leak_idx is not None:
+                self.epnet.ENsetnodevalue(leak_idx, self._EN("EMITTER"), 0.0)
+            if close:
+                self.close()
 
         interval_press = pd.DataFrame(pressures, index=pd.Index(times, name="time_s"))
 
@@ -265,11 +345,27 @@ class DataGenerator():
                         row[f"{nid}_{label_prefix}{k}"] = float(val) if pd.notna(val) else ""
                     else:
                         row[f"{nid}_{label_prefix}{k}"] = ""
+
+            # Sub-hourly runs also carry the hourly features the model expects
+            if self.STEP_S < 3600:
+                for j, nid in enumerate(OBS_NODES):
+                    for h in range(self.TOTAL_HOURS):
+                        val = hourly.hourly[h, j]
+                        row[f"{nid}_Hour{h}"] = float(val) if np.isfinite(val) else ""
             
-            csv_data_path = Path(__file__).parent / "generated_data.csv"
-            pd.DataFrame([row]).to_csv(csv_data_path)
+            if write_csv:
+                csv_data_path = Path(__file__).parent / "generated_data.csv"
+                with timed("csv_write"):
+                    pd.DataFrame([row]).to_csv(csv_data_path)
             return row
 
+    def close(self):
+        """Close the EPANET project of a generator run with close=False"""
+        self.epnet.ENclose()
+        if not self.keep_files:
+            for path in self.run_files:
+                path.unlink(missing_ok=True)
+
 if __name__ == "__main__":
     inp_path = Path(__file__).parent
 
@@ -0,0 +1,486 @@
+"""
+Batched Sparse Hydraulic Solver
+Global Gradient Algorithm (Todini-Pilati, as in EPANET) steady-state solver in NumPy and
+SciPy sparse, built from EPANETParser's network arrays
+
+Supports what main_network.inp uses: SI flow units, Hazen-Williams headloss with minor
+losses, reservoirs, demand patterns and emitters with exponent 1. Without tanks each
+hydraulic step of an extended-period run is an independent steady state, so many
+(time, leak) scenarios are solved together: their head matrices share one sparsity
+pattern, so the ordering and symbolic factorization are done once and every Newton
+iteration factorizes the whole batch with vectorized NumPy operations.
+
+    python -m backend.hydraulic_solver     # validate against EPANET and time both
+"""
+
+import heapq
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import scipy.sparse as sp
+
+from .epanet_parser import EPANETParser
+from .generate_data import DataGenerator, OBS_NODES
+
+# Flow unit -> m^3/s
+SI_FLOW_UNITS = {"LPS": 1e-3, "LPM": 1e-3 / 60.0, "MLD": 1e3 / 86400.0, "CMH": 1.0 / 3600.0, "CMD": 1.0 / 86400.0}
+
+# EPANET's Hazen-Williams constant (4.727 in ft, cfs) converted to m, m^3/s
+HW_EXPONENT = 1.852
+HW_SI = 4.727 * 0.3048 ** 4.871 / 0.0283168 ** HW_EXPONENT
+GRAVITY = 9.81
+# Lower bound on a link's headloss gradient (EPANET's RQtol, converted to m per m^3/s)
+MIN_GRADIENT = 1e-7 * 0.3048 / 0.0283168
+
+
+def _clock_seconds(value: str) -> int:
+    # "h:mm[:ss]" or decimal hours, as in the TIMES section
+    if ":" in value:
+        parts = [int(p) for p in value.split(":")]
+        return parts[0] * 3600 + parts[1] * 60 + (parts[2] if len(parts) > 2 else 0)
+    return int(round(float(value) * 3600))
+
+
+def _minimum_degree(n: int, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    # Greedy minimum-degree elimination order on the explicit elimination graph. Water
+    # networks are nearly trees, so eliminating low-degree junctions first leaves little fill.
+    adjacency = [set() for _ in range(n)]
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        if i != j:
+            adjacency[i].add(j)
+            adjacency[j].add(i)
+    heap = [(len(nbrs), i) for i, nbrs in enumerate(adjacency)]
+    heapq.heapify(heap)
+    eliminated = np.zeros(n, dtype=bool)
+    order = []
+    while heap:
+        degree, v = heapq.heappop(heap)
+        if eliminated[v] or degree != len(adjacency[v]):
+            continue
+        eliminated[v] = True
+        order.append(v)
+        neighbours = adjacency[v]
+        for u in neighbours:
+            adjacency[u].discard(v)
+            adjacency[u] |= neighbours
+            adjacency[u].discard(u)
+            heapq.heappush(heap, (len(adjacency[u]), u))
+    return np.array(order, dtype=np.int64)
+
+
+def _rounds(index: np.ndarray) -> List[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    # Split a scatter into rounds whose target indices are unique, so that plain fancy
+    # indexing can subtract them without np.subtract.at; (targets, positions or None = all)
+    if len(index) == 0:
+        return []
+    sorter = np.argsort(index, kind="stable")
+    ordered = index[sorter]
+    occurrence = np.empty(len(index), dtype=np.int64)
+    occurrence[sorter] = np.arange(len(index)) - np.searchsorted(ordered, ordered)
+    if occurrence.max() == 0:
+        return [(index, None)]
+    rounds = []
+    for r in range(int(occurrence.max()) + 1):
+        positions = np.nonzero(occurrence == r)[0]
+        rounds.append((index[positions], positions))
+    return rounds
+
+
+def _scatter_subtract(target: np.ndarray, rounds, values: np.ndarray):
+    for rows, positions in rounds:
+        target[rows] -= values if positions is None else values[positions]
+
+
+class _BatchedLDL:
+    """
+    LDL^T factorization and solves of many SPD matrices sharing one sparsity pattern
+
+    The symbolic work is done once: a minimum-degree ordering, the elimination tree, the
+    fill-in and a level schedule (columns whose subtrees are complete). The numeric
+    factorization then runs level by level, vectorized over the batch and over the
+    independent columns of each level.
+    """
+
+    def __init__(self, n: int, rows: np.ndarray, cols: np.ndarray):
+        # rows/cols: the matrix entries (either triangle, diagonal included) that factor()
+        # receives values for, in that order
+        self.n = n
+        order = _minimum_degree(n, rows, cols)
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.arange(n)
+        self.order = order
+        r, c = rank[rows], rank[cols]
+        r, c = np.maximum(r, c), np.minimum(r, c)
+
+        # Symbolic elimination: column structures, elimination tree and levels
+        struct = [set() for _ in range(n)]
+        for i, k in zip(r[r != c].tolist(), c[r != c].tolist()):
+            struct[k].add(i)
+        children = [[] for _ in range(n)]
+        level = np.zeros(n, dtype=np.int64)
+        for k in range(n):
+            for child in children[k]:
+                struct[k] |= struct[child]
+                level[k] = max(level[k], level[child] + 1)
+            struct[k].discard(k)
+            if struct[k]:
+                children[min(struct[k])].append(k)
+
+        # Slots of L (diagonal holds D)
+        slot = {}
+        diag = np.empty(n, dtype=np.int64)
+        for k in range(n):
+            diag[k] = slot[(k, k)] = len(slot)
+            for i in sorted(struct[k]):
+                slot[(i, k)] = len(slot)
+        self.nnz = len(slot)
+        self.diag = diag
+        entry_slot = np.array([slot[(i, k)] for i, k in zip(r.tolist(), c.tolist())])
+        self._entries = sp.csr_matrix((np.ones(len(entry_slot)), (entry_slot, np.arange(len(entry_slot)))),
+                                      shape=(self.nnz, len(entry_slot)))
+
+        self.levels = []
+        for lvl in range(int(level.max()) + 1 if n else 0):
+            columns = np.nonzero(level == lvl)[0]
+            off, off_row, off_col = [], [], []
+            update_a, update_b, update_d, targets = [], [], [], []
+            for k in columns.tolist():
+                below = sorted(struct[k])
+                for i in below:
+                    off.append(slot[(i, k)])
+                    off_row.append(i)
+                    off_col.append(k)
+                for x, j in enumerate(below):
+                    for i in below[x:]:
+                        update_a.append(slot[(i, k)])
+                        update_b.append(slot[(j, k)])
+                        update_d.append(diag[k])
+                        targets.append(slot[(i, j)])
+            off_row = np.array(off_row, dtype=np.int64)
+            off_col = np.array(off_col, dtype=np.int64)
+            self.levels.append({
+                "off": np.array(off, dtype=np.int64),
+                "off_row": off_row,
+                "off_col": off_col,
+                "off_diag": diag[off_col],
+                "update": (np.array(update_a, dtype=np.int64), np.array(update_b, dtype=np.int64),
+                           np.array(update_d, dtype=np.int64)),
+                # Collision-free scatters of the update / forward / backward contributions
+                "update_rounds": _rounds(np.array(targets, dtype=np.int64)),
+                "row_rounds": _rounds(off_row),
+                "column_rounds": _rounds(off_col),
+            })
+
+    def factor(self, values: np.ndarray) -> np.ndarray:
+        """Numeric factorization of B matrices given their entry values (entries, B)"""
+        # Slot-major (nnz, B) so every gather below reads contiguous rows
+        factors = self._entries @ values
+        for lvl in self.levels:
+            if len(lvl["off"]):
+                factors[lvl["off"]] /= factors[lvl["off_diag"]]
+            a, b, d = lvl["update"]
+            if len(a):
+                _scatter_subtract(factors, lvl["update_rounds"], factors[a] * factors[b] * factors[d])
+        return factors
+
+    def solve(self, factors: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+        """Solve (n, B) right-hand sides, in the caller's node order"""
+        y = rhs[self.order]
+        for lvl in self.levels:
+            if len(lvl["off"]):
+                _scatter_subtract(y, lvl["row_rounds"], factors[lvl["off"]] * y[lvl["off_col"]])
+        y /= factors[self.diag]
+        for lvl in reversed(self.levels):
+            if len(lvl["off"]):
+                _scatter_subtract(y, lvl["column_rounds"], factors[lvl["off"]] * y[lvl["off_row"]])
+        x = np.empty_like(y)
+        x[self.order] = y
+        return x
+
+
+class HydraulicSolver:
+    """
+    Steady-state GGA solver for many scenarios at once
+
+    A scenario is a time (selecting the demand pattern multipliers) plus an optional
+    extra emitter ("leak") at one junction, on top of any EMITTERS in the INP file.
+    """
+
+    def __init__(self, inp_file: Union[str, Path], accuracy: Optional[float] = None, max_trials: int = 200):
+        parser = EPANETParser(str(inp_file))
+        units = parser.options.get("UNITS", "GPM").upper()
+        if units not in SI_FLOW_UNITS:
+            raise ValueError(f"Unsupported flow units {units!r}, expected one of {list(SI_FLOW_UNITS)}")
+        if parser.options.get("HEADLOSS", "H-W").upper() != "H-W":
+            raise ValueError("Only Hazen-Williams headloss is supported")
+        if float(parser.options.get("EMITTER EXPONENT", "0.5")) != 1.0:
+            raise ValueError("Only emitter exponent 1 is supported")
+        if any(node.type == "tank" for node in parser.nodes.values()):
+            raise ValueError("Tanks are not supported (steady states would not be independent)")
+
+        self.flow_to_si = SI_FLOW_UNITS[units]
+        self.accuracy = float(accuracy if accuracy is not None else parser.options.get("ACCURACY", 0.001))
+        self.max_trials = max_trials
+
+        junctions = [n for n in parser.nodes.values() if n.type == "junction"]
+        reservoirs = [n for n in parser.nodes.values() if n.type == "reservoir"]
+        self.junctions: List[str] = [n.id for n in junctions]
+        self.junction_index = {n: i for i, n in enumerate(self.junctions)}
+        self.elevation = np.array([n.elevation for n in junctions])
+        self.fixed_head = np.array([n.elevation for n in reservoirs])
+        self.emitters = np.array([n.emitter for n in junctions]) * self.flow_to_si
+
+        # Demands (m^3/s) by pattern; junctions without one use the default pattern
+        default_pattern = parser.options.get("PATTERN", "1")
+        multiplier = float(parser.options.get("DEMAND MULTIPLIER", 1.0))
+        self.patterns = {pid: np.array(values) for pid, values in parser.patterns.items()}
+        self.pattern_step_s = _clock_seconds(parser.times.get("PATTERN TIMESTEP", "1:00"))
+        self.pattern_start_s = _clock_seconds(parser.times.get("PATTERN START", "0:00"))
+        self._demand_groups = []
+        demand = np.array([n.demand for n in junctions]) * multiplier * self.flow_to_si
+        pattern_ids = np.array([n.pattern or default_pattern for n in junctions])
+        for pid in np.unique(pattern_ids):
+            mask = pattern_ids == pid
+            self._demand_groups.append((self.patterns.get(pid), np.where(mask, demand, 0.0)))
+
+        # Open pipes; node numbering is junctions, then reservoirs (fixed heads)
+        number = {n.id: i for i, n in enumerate(junctions + reservoirs)}
+        pipes = [p for p in parser.pipes.values() if p.status != "CLOSED"]
+        self.pipes: List[str] = [p.id for p in pipes]
+        self.from_node = np.array([number[p.from_node] for p in pipes])
+        self.to_node = np.array([number[p.to_node] for p in pipes])
+        diameter_m = np.array([p.diameter for p in pipes]) / 1000.0
+        length = np.array([p.length for p in pipes])
+        roughness = np.array([p.roughness for p in pipes])
+        self.resistance = HW_SI * length / (roughness ** HW_EXPONENT * diameter_m ** 4.871)
+        self.minor_resistance = 8.0 * np.array([p.minor_loss for p in pipes]) / (GRAVITY * np.pi ** 2 * diameter_m ** 4)
+        # EPANET's initial flows: 1 ft/s through every pipe
+        self.initial_flow = np.pi * diameter_m ** 2 / 4.0 * 0.3048
+
+        self._build_pattern()
+
+    def _build_pattern(self):
+        # Matrix entries: the junction diagonal, then one off-diagonal per junction-junction pipe.
+        # Per-pipe and per-junction values reach them through constant sparse incidence matrices.
+        n = len(self.junctions)
+        a, b = self.from_node, self.to_node
+        from_junction, to_junction = a < n, b < n
+        inner = from_junction & to_junction
+        pipe_ids = np.arange(len(a))
+        self._n = n
+        self._ldl = _BatchedLDL(n, np.concatenate([np.arange(n), a[inner]]), np.concatenate([np.arange(n), b[inner]]))
+
+        def incidence(rows, cols, signs, shape):
+            return sp.csr_matrix((signs, (rows, cols)), shape=shape)
+
+        # (entries x pipes): +p on both junction ends' diagonals, -p off the diagonal
+        num_inner = int(inner.sum())
+        self._pipe_to_entries = incidence(
+            np.concatenate([a[from_junction], b[to_junction], n + np.arange(num_inner)]),
+            np.concatenate([pipe_ids[from_junction], pipe_ids[to_junction], pipe_ids[inner]]),
+            np.concatenate([np.ones(from_junction.sum() + to_junction.sum()), -np.ones(num_inner)]),
+            (n + num_inner, len(a)))
+        # (junctions x pipes): signed flow into each junction
+        self._pipe_to_inflow = incidence(
+            np.concatenate([a[from_junction], b[to_junction]]),
+            np.concatenate([pipe_ids[from_junction], pipe_ids[to_junction]]),
+            np.concatenate([-np.ones(from_junction.sum()), np.ones(to_junction.sum())]), (n, len(a)))
+        # (junctions x pipes): p * fixed head of the other end, for pipes to a reservoir
+        to_fixed, from_fixed = from_junction & ~to_junction, to_junction & ~from_junction
+        self._pipe_to_fixed = incidence(
+            np.concatenate([a[to_fixed], b[from_fixed]]),
+            np.concatenate([pipe_ids[to_fixed], pipe_ids[from_fixed]]),
+            np.concatenate([self.fixed_head[b[to_fixed] - n], self.fixed_head[a[from_fixed] - n]]), (n, len(a)))
+        # (pipes x junctions) head difference from - to, plus the reservoir ends' part
+        self._head_difference = (-self._pipe_to_inflow.T).tocsr()
+        self._fixed_difference = np.zeros(len(a))
+        self._fixed_difference[from_fixed] += self.fixed_head[a[from_fixed] - n]
+        self._fixed_difference[to_fixed] -= self.fixed_head[b[to_fixed] - n]
+
+    def demands(self, times_s: Sequence[float]) -> np.ndarray:
+        """Junction demands (B, J) in m^3/s at each time"""
+        times_s = np.asarray(times_s, dtype=np.float64)
+        total = np.zeros((len(times_s), self._n))
+        for pattern, demand in self._demand_groups:
+            if pattern is None or len(pattern) == 0:
+                factor = np.ones(len(times_s))
+            else:
+                period = ((times_s + self.pattern_start_s) // self.pattern_step_s).astype(np.int64)
+                factor = pattern[period % len(pattern)]
+            total += factor[:, None] * demand[None, :]
+        return total
+
+    def solve(self, times_s: Sequence[float], leak_nodes: Optional[Sequence[Optional[str]]] = None,
+              emitter_cofs=None) -> Dict[str, np.ndarray]:
+        """
+        Solve B scenarios together
+
+        Parameters:
+        - times_s (sequence of B floats): Simulation time of each scenario (selects demands).
+        - leak_nodes (sequence of B junction ids or None): Extra emitter location per scenario.
+        - emitter_cofs (float or B floats): Extra emitter coefficient(s), INP flow units per m.
+
+        Returns:
+        - dict: heads and pressures (B, J) in m, flows (B, P) and leak_flow (B,) in INP flow
+          units, iterations (int) and converged (B,) flags.
+        """
+        # Node/pipe-major (., B) arrays throughout, like the factorization
+        demand = self.demands(times_s).T
+        n, batch = demand.shape
+        emitter = np.repeat(self.emitters[:, None], batch, axis=1)
+        columns = np.arange(batch)
+        leak = np.full(batch, -1)
+        if leak_nodes is not None:
+            leak = np.array([self.junction_index[j] if j is not None else -1 for j in leak_nodes])
+            cofs = np.broadcast_to(np.asarray(emitter_cofs if emitter_cofs is not None else 0.0, dtype=np.float64),
+                                   (batch,)) * self.flow_to_si
+            has_leak = leak >= 0
+            emitter[leak[has_leak], columns[has_leak]] += cofs[has_leak]
+
+        resistance, minor_resistance = self.resistance[:, None], self.minor_resistance[:, None]
+        fixed_difference = self._fixed_difference[:, None]
+        supply = emitter * self.elevation[:, None] - demand
+        flows = np.repeat(self.initial_flow[:, None], batch, axis=1)
+        heads = np.zeros((n, batch))
+        converged = np.zeros(batch, dtype=bool)
+
+        iterations = 0
+        for iterations in range(1, self.max_trials + 1):
+            q = np.abs(flows)
+            friction = resistance * q ** (HW_EXPONENT - 1)
+            minor = minor_resistance * q
+            gradient = HW_EXPONENT * friction + 2.0 * minor
+            p = 1.0 / np.maximum(gradient, MIN_GRADIENT)
+            y = p * (friction + minor) * flows
+
+            entries = self._pipe_to_entries @ p
+            entries[:n] += emitter
+            # Right-hand side: flow imbalance plus fixed-head and emitter terms
+            rhs = supply + self._pipe_to_inflow @ (flows - y) + self._pipe_to_fixed @ p
+            heads = self._ldl.solve(self._ldl.factor(entries), rhs)
+
+            new_flows = flows - y + p * (self._head_difference @ heads + fixed_difference)
+            change = np.abs(new_flows - flows).sum(axis=0) / np.maximum(np.abs(new_flows).sum(axis=0), 1e-12)
+            flows = new_flows
+            converged = change <= self.accuracy
+            if converged.all():
+                break
+
+        heads, flows = heads.T, flows.T
+        pressures = heads - self.elevation
+        rows = np.arange(batch)
+        leak_flow = np.where(leak >= 0, (emitter.T - self.emitters)[rows, np.maximum(leak, 0)]
+                             * pressures[rows, np.maximum(leak, 0)], 0.0)
+        return {
+            "heads": heads,
+            "pressures": pressures,
+            "flows": flows / self.flow_to_si,
+            "leak_flow": leak_flow / self.flow_to_si,
+            "iterations": iterations,
+            "converged": converged,
+        }
+
+    def simulate_scenarios(self, node_ids: Sequence[str], emitter_cofs, collection_start_hours, leak_start_mins,
+                           leak_duration_hours, step_m: int = 60, window_hours: int = 24,
+                           batch_size: int = 128) -> Dict[str, np.ndarray]:
+        """
+        Extended-period leak scenarios with DataGenerator's step semantics (scalars broadcast)
+
+        The emitter switches on after the first step at or after the leak start and off after
+        the first step at or after its end. Steps without a leak share one baseline solve per
+        time; the leak steps are solved batch_size at a time.
+
+        Returns:
+        - pressures (N, 21, window steps): OBS_NODES pressures at every step of the window
+        - leak_size_lps (N,), leak_node_pressure_head (N,): as in DataGenerator.generate_data
+        """
+        n = len(node_ids)
+        step_s = step_m * 60
+        C = np.broadcast_to(np.asarray(emitter_cofs, dtype=np.float64), (n,))
+        start_s = np.broadcast_to(np.asarray(collection_start_hours, dtype=np.float64), (n,)) * 3600.0
+        leak_start_s = start_s + np.broadcast_to(np.asarray(leak_start_mins, dtype=np.float64), (n,)) * 60.0
+        leak_end_s = leak_start_s + np.broadcast_to(np.asarray(leak_duration_hours, dtype=np.float64), (n,)) * 3600.0
+
+        # Every step from 0 to the end of the latest window (leak-size means may start before it)
+        num_steps = int(np.ceil((start_s.max() + window_hours * 3600) / step_s)) + 1
+        t = np.arange(num_steps) * step_s
+        on_after = np.ceil(leak_start_s / step_s)[:, None] * step_s
+        off_at = np.ceil(leak_end_s / step_s)[:, None] * step_s
+        active = (t[None, :] > on_after) & (t[None, :] <= off_at)
+
+        obs = np.array([self.junction_index[o] for o in OBS_NODES])
+        leak = np.array([self.junction_index[j] for j in node_ids])
+        base = self.solve(t)["pressures"]
+        obs_pressures = np.repeat(base[None, :, obs], n, axis=0)  # (N, T, 21)
+        leak_pressures = base[:, leak].T.copy()                   # (N, T)
+
+        scenario, step = np.nonzero(active)
+        for lo in range(0, len(scenario), batch_size):
+            s, k = scenario[lo:lo + batch_size], step[lo:lo + batch_size]
+            result = self.solve(t[k], [node_ids[i] for i in s], C[s])
+            obs_pressures[s, k] = result["pressures"][:, obs]
+            leak_pressures[s, k] = result["pressures"][np.arange(len(s)), leak[s]]
+
+        window = (start_s // step_s).astype(np.int64)[:, None] + np.arange(window_hours * 3600 // step_s)[None, :]
+        pressures = obs_pressures[np.arange(n)[:, None], window]
+        # DataGenerator stops recording at the end of the collection window
+        in_leak = ((t[None, :] >= leak_start_s[:, None]) & (t[None, :] < leak_end_s[:, None])
+                   & (t[None, :] <= start_s[:, None] + window_hours * 3600))
+        counts = in_leak.sum(axis=1)
+        clipped = np.clip(leak_pressures, 0.0, None)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            head = np.where(counts > 0, (clipped * in_leak).sum(axis=1) / counts, 0.0)
+        return {
+            "pressures": np.ascontiguousarray(pressures.transpose(0, 2, 1)),
+            "leak_size_lps": C * head * self.flow_to_si * 1000.0,
+            "leak_node_pressure_head": head,
+        }
+
+    def validate(self, inp_file: Union[str, Path], num_scenarios: int = 20, seed: int = 42) -> Dict:
+        """
+        Compare random hourly scenarios against full EPANET runs (DataGenerator)
+        Returns error statistics and the wall time of both engines
+        """
+        rng = np.random.default_rng(seed)
+        nodes = list(rng.choice(self.junctions, num_scenarios))
+        C = rng.uniform(0.1, 5.0, num_scenarios).round(2)
+        starts = rng.integers(0, 24, num_scenarios)
+        leak_mins = rng.integers(1, 24, num_scenarios) * 60
+        durations = rng.integers(1, 13, num_scenarios)
+
+        started = time.perf_counter()
+        predicted = self.simulate_scenarios(nodes, C, starts, leak_mins, durations)
+        solver_s = time.perf_counter() - started
+
+        gd = DataGenerator(str(inp_file), step_m=60, duration_h=24, run_name="gga_validate", abort_on_warnings=False,
+                           keep_files=False)
+        errors, size_errors = [], []
+        started = time.perf_counter()
+        try:
+            for i in range(num_scenarios):
+                row = gd.generate_data(nodes[i], float(C[i]), int(starts[i]), int(leak_mins[i]), int(durations[i]),
+                                       write_csv=False, close=False)
+                actual = np.array([[row[f"{nid}_Hour{h}"] for h in range(24)] for nid in OBS_NODES], dtype=np.float64)
+                errors.append(predicted["pressures"][i] - actual)
+                size_errors.append(predicted["leak_size_lps"][i] - row["leak_size_lps"])
+        finally:
+            gd.close()
+        epanet_s = time.perf_counter() - started
+        errors = np.abs(np.array(errors))
+        size_errors = np.abs(np.array(size_errors))
+        return {
+            "scenarios": num_scenarios,
+            "pressure_mae_m": float(errors.mean()),
+            "pressure_max_abs_m": float(errors.max()),
+            "leak_size_max_abs_lps": float(size_errors.max()),
+            "solver_s": solver_s,
+            "epanet_s": epanet_s,
+        }
+
+
+if __name__ == "__main__":
+    inp_file = Path(__file__).parent / "main_network.inp"
+    solver = HydraulicSolver(inp_file)
+    print("Validation vs EPANET:", solver.validate(inp_file, num_scenarios=50))
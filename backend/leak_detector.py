@@ -3,16 +3,35 @@ Leak Detection Module
 Interfaces with ML model to provide leak predictions and monitoring data
 """
 
+import hashlib
 import random
 from datetime import datetime, timedelta
 from typing import List, Dict
 import math
+import os
+import numpy as np
 import pandas as pd
 
 
-from .run_model import PredictLeakLocation
+from .utils.NumpyModel import NumpyLeakModel
+from .metrics import PREDICTIONS_TOTAL, timed
 
-Localizer = PredictLeakLocation()
+MODEL_PATH = "./backend/model/leak_model.pth"
+# Torch-free copy of MODEL_PATH, written by utils.SaveLoad.export_checkpoint_to_numpy
+NUMPY_MODEL_PATH = "./backend/model/leak_model.npz"
+
+_localizer = None
+
+def get_localizer():
+    """
+    Torch-based predictor, created on first use so API workers serving the
+    NumPy artifact never import torch
+    """
+    global _localizer
+    if _localizer is None:
+        from .run_model import PredictLeakLocation
+        _localizer = PredictLeakLocation()
+    return _localizer
 
 class LeakDetector:
     """
@@ -20,8 +39,13 @@ class LeakDetector:
     Currently uses simulated data - replace with actual model integration
     """
     
-    def __init__(self):
+    def __init__(self, execution_mode: str = "numpy"):
         self.last_update = datetime.now()
+        # "numpy" serves NUMPY_MODEL_PATH without torch; anything else is a torch
+        # execution mode, see utils.Optimize.EXECUTION_MODES
+        self.execution_mode = execution_mode
+        self._numpy_model = None
+        self._model_version = None
         # In production, load your trained model here
         # self.model = load_model('path_to_model')
     
@@ -30,38 +54,79 @@ class LeakDetector:
         Get leak predictions for all nodes
         Replace with actual model predictions
         """
-        predictions=Localizer.run_test_cases(model_path="./backend/model/leak_model.pth",test_csv=csv_path)
-        print("Success",predictions)
-        return predictions
-    
-    # def get_pressure_history(self, node_id: str, hours: int = 24) -> List[Dict]:
-    #     """
-    #     Get historical pressure data for a node
-    #     Returns time series data for the specified number of hours
-    #     """
-    #     data=[]
-    #     column_names=[]
-    #     for i in range(int(sample_duration_hours*60/sample_minutes)):
-    #         column_names.append(f"{node_id}_{label_prefix}{i}")
+        with timed("csv_read"):
+            data=pd.read_csv(csv_path)
+        return self.predict_frame(data)
 
-    #     for column in column_names:
-    #         data.append({
-    #             "timestamp": timestamp.isoformat(),
-    #             "pressure": round(pressure, 2)
-    #         })
-        
-    #     return data
-    
-    # def get_demand_comparison(self) -> Dict:
-    #     """
-    #     Get base demand vs actual demand comparison
-    #     Returns recent time series for demand analysis
-    #     """
-    #     # to do add base demand logic
-    #     demand_dic= generated_data["leak_demand_time"]
+    def predict_frame(self, data: pd.DataFrame) -> Dict:
+        """
+        Predictions for every row of a generated-data frame (e.g. one simulation row),
+        without going through the shared CSV
+        """
+        if self._use_numpy_model():
+            PREDICTIONS_TOTAL.inc(len(data), engine="numpy")
+            with timed("forward"):
+                return self._numpy_model.predict(data)
+        mode = "eager" if self.execution_mode == "numpy" else self.execution_mode
+        PREDICTIONS_TOTAL.inc(len(data), engine=mode)
+        inputs = data[self.input_columns()].to_numpy(dtype=np.float32)
+        return get_localizer().predict_array(MODEL_PATH, inputs, mode=mode)
 
-    #     return demand_dic
-    
+    def _use_numpy_model(self) -> bool:
+        if self.execution_mode == "numpy" and os.path.exists(NUMPY_MODEL_PATH):
+            if self._numpy_model is None:
+                with timed("numpy_model_load"):
+                    self._numpy_model = NumpyLeakModel.load(NUMPY_MODEL_PATH)
+            return True
+        return False
+
+    def input_columns(self) -> List[str]:
+        """Feature columns of an observation window, in the order the model expects"""
+        if self._use_numpy_model():
+            return list(self._numpy_model.input_columns)
+        from .run_model import HOURLY_NODES
+        return list(HOURLY_NODES)
+
+    def input_dim(self) -> int:
+        """Number of features per observation window the model expects"""
+        return len(self.input_columns())
+
+    def model_version(self) -> str:
+        """Short SHA-256 of the model artifact in use, recomputed when the file changes"""
+        path = NUMPY_MODEL_PATH if self._use_numpy_model() else MODEL_PATH
+        key = (path, os.path.getmtime(path))
+        if self._model_version is None or self._model_version[0] != key:
+            with open(path, "rb") as f:
+                self._model_version = (key, hashlib.sha256(f.read()).hexdigest()[:12])
+        return self._model_version[1]
+
+    def predict_batch(self, pressures: np.ndarray, batch_size: int = 4096) -> Dict:
+        """
+        Score many observation windows at once
+        pressures is an (N, input_dim) matrix of raw hourly pressures in model column order;
+        each micro-batch of batch_size rows is one forward pass
+        """
+        pressures = np.asarray(pressures, dtype=np.float32)
+        if pressures.ndim == 1:
+            pressures = pressures.reshape(1, -1)
+        if pressures.ndim != 2 or pressures.shape[1] != self.input_dim():
+            raise ValueError(f"Expected an N x {self.input_dim()} pressure matrix, got shape {pressures.shape}")
+        if not np.isfinite(pressures).all():
+            raise ValueError("Pressure matrix contains non-finite values")
+        batch_size = max(1, int(batch_size))
+
+        if self._use_numpy_model():
+            model = self._numpy_model
+            PREDICTIONS_TOTAL.inc(len(pressures), engine="numpy")
+            with timed("forward"):
+                outputs = [model.predict_array(pressures[start:start + batch_size])
+                           for start in range(0, pressures.shape[0], batch_size)]
+            predictions = np.concatenate(outputs) if outputs else np.empty((0, len(model.output_names)))
+            return {name: predictions[:, i].tolist() for i, name in enumerate(model.output_names)}
+
+        mode = "eager" if self.execution_mode == "numpy" else self.execution_mode
+        PREDICTIONS_TOTAL.inc(len(pressures), engine=mode)
+        return get_localizer().predict_array(MODEL_PATH, pressures, mode=mode, batch_size=batch_size)
     
     # def get_average_pressure(self) -> Dict:
     #     """
@@ -5,9 +5,13 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 import wntr
-from wntr.epanet.toolkit import ENepanet
+from wntr.epanet.toolkit import ENepanet, ENgetwarning
 from wntr.epanet.util import EN
 
+from .hourly_aggregator import HourlyAggregator
+from .periodic_baseline import PeriodicBaseline
+from .scenario_quarantine import ScenarioQuarantine, SimulationDiverged
+
 EMITTER_CHOICES = [0.01389, 0.02778, 0.1389, 0.2778, 0.4167, 0.5556]
 
 EPANET_OUT_DIR = Path("epanet_runs")
@@ -76,13 +80,6 @@ def _flow_to_lps_factor(flow_unit: str | None) -> float:
 
     return 1.0
 
-def _aggregate_to_hourly(pressure_df: pd.DataFrame, total_hours: int) -> pd.DataFrame:
-    df = pressure_df.copy()
-    df.index = df.index.astype(int)
-    df["hour_index"] = df.index // 3600
-    hourly = df.groupby("hour_index").mean(numeric_only=True)
-    return hourly.reindex(range(total_hours))
-
 def _EN(name: str) -> int:
     # robust constant getter across WNTR versions
     if hasattr(EN, name):
@@ -101,7 +98,10 @@ def run_one_scenario_epanet_toolkit(
     emitter_exponent: float | None = None,
     leak_start_hr: float | None = None,
     leak_duration_hr: float | None = None,
+    abort_on_warnings: bool = True,
 ) -> dict:
+    # Raises SimulationDiverged at the first non-finite pressure, or EPANET warning when
+    # abort_on_warnings is set
     # Load WN for metadata + setting time options cleanly
     wn = wntr.network.WaterNetworkModel(inp_path)
 
@@ -146,6 +146,10 @@ def run_one_scenario_epanet_toolkit(
         # IMPORTANT: start OFF in the INP
         j.emitter_coefficient = 0.0
 
+    # Quarantine key of this scenario, see ScenarioQuarantine
+    scenario = {"leak_start_s": leak_start_s,
+                "leak_duration_s": leak_end_s - leak_start_s if leak_start_s is not None else None}
+
     # Write a clean INP for EPANET engine
     inp_tmp = EPANET_OUT_DIR / "tmp.inp"
     rpt_tmp = EPANET_OUT_DIR / "tmp.rpt"
@@ -177,9 +181,8 @@ def run_one_scenario_epanet_toolkit(
         en.ENopenH()
         en.ENinitH(0)
 
-        # Collect pressures at each report step
-        pressures = []
-        times = []
+        # Hourly mean pressures, accumulated as each report step arrives
+        hourly = HourlyAggregator(obs_nodes, step_m=sample_minutes, total_hours=total_hours)
 
         # Collect leak-node pressure during leak window for leak_size calculation
         leak_press_series = []
@@ -198,25 +201,27 @@ def run_one_scenario_epanet_toolkit(
                     ended = True
 
             t = en.ENrunH()  # current time (seconds)
+            if abort_on_warnings and 0 < en.errcode < 100:
+                raise SimulationDiverged(leak_node, emitter_coeff, t, ENgetwarning(en.errcode, t), code=en.errcode,
+                                         **scenario)
 
             # Read pressures for observation nodes
-            row = {}
-            for n in obs_nodes:
+            values = np.full(len(obs_nodes), np.nan)
+            for i, n in enumerate(obs_nodes):
                 p = en.ENgetnodevalue(node_index[n], _EN("PRESSURE"))
                 p = float(p)
 
                 if not math.isfinite(p):
-                    fail_time_s = int(t)
-                    fail_node = n
-                    print(f"[NONFINITE] t={fail_time_s}s node={fail_node} leak_node={leak_node} C={emitter_coeff}")
-                    break
-                row[n] = float(p)
-            pressures.append(row)
-            times.append(int(t))
+                    raise SimulationDiverged(leak_node, emitter_coeff, t, "non-finite pressure", node=n, **scenario)
+                values[i] = p
+            hourly.add(int(t), values)
 
             # Leak node pressure
             if leak_idx is not None:
                 pL = float(en.ENgetnodevalue(leak_idx, _EN("PRESSURE")))
+                if not math.isfinite(pL):
+                    raise SimulationDiverged(leak_node, emitter_coeff, t, "non-finite leak node pressure", node=leak_node,
+                                             **scenario)
                 leak_press_series.append((int(t), pL))
 
             tstep = en.ENnextH()
@@ -227,10 +232,8 @@ def run_one_scenario_epanet_toolkit(
     finally:
         en.ENclose()
 
-    # Build pressure dataframe: index=time_s, columns=nodes
-    minute_press = pd.DataFrame(pressures, index=pd.Index(times, name="time_s"))
-
-    hourly_press = _aggregate_to_hourly(minute_press, total_hours=total_hours)
+    hourly.flush()
+    hourly_press = hourly.hourly  # shape (total_hours, len(obs_nodes))
 
     # Leak size from emitter law (mean Q during leak window)
     leak_size_lps = ""
@@ -277,14 +280,30 @@ def run_one_scenario_epanet_toolkit(
             "leak_duration_hr": float(leak_duration_hr),
         })
 
-    for nid in obs_nodes:
+    for j, nid in enumerate(obs_nodes):
         for h in range(total_hours):
-            val = hourly_press.loc[h, nid]
-            row[f"{nid}_Hour{h}"] = float(val) if pd.notna(val) else ""
+            val = hourly_press[h, j]
+            row[f"{nid}_Hour{h}"] = float(val) if np.isfinite(val) else ""
 
     return row
 
 
+def periodic_baseline_row(inp_path: str, obs_nodes: list[str], sample_minutes: int, duration_days: int) -> dict:
+    # Same row as run_one_scenario_epanet_toolkit(leak_node=None), from PeriodicBaseline
+    total_hours = int(duration_days * 24)
+    hourly_press = PeriodicBaseline(inp_path, step_m=sample_minutes, nodes=obs_nodes, keep_files=False).hourly(0, total_hours)
+    row = {
+        "leak": 0, "leak_node": "", "leak_x": "", "leak_y": "",
+        "leak_size_lps": "", "leak_node_pressure_head": "",
+        "emitter_coeff": "", "leak_start_hr": "", "leak_duration_hr": ""
+    }
+    for j, nid in enumerate(obs_nodes):
+        for h in range(total_hours):
+            val = hourly_press[h, j]
+            row[f"{nid}_Hour{h}"] = float(val) if np.isfinite(val) else ""
+    return row
+
+
 def build_dataset(
     inp_path: str,
     obs_nodes: list[str],
@@ -297,34 +316,55 @@ def build_dataset(
     random_seed: int | None = 42,
     leak_start_hr_min: int = 0,
     leak_start_hr_max: int = 19,  # for 4h leak within 24h
+    quarantine: ScenarioQuarantine | None = None,
+    scenarios: list[tuple[str, float, int]] | None = None,
+    include_baseline: bool = True,
 ) -> pd.DataFrame:
+    # scenarios: explicit (leak node, emitter, start hour) list, e.g. from scenario_sampler;
+    # replaces the exhaustive leak_nodes x emitter_choices grid.
+    # Scenarios that diverge are recorded in the quarantine (the shared quarantine.json
+    # by default) and dropped; quarantined (leak node, emitter, start, duration) scenarios
+    # are not simulated
     rng = random.Random(random_seed)
+    if quarantine is None:
+        quarantine = ScenarioQuarantine(inp_path)
+    skipped = 0
     rows = []
     scenario_id = 0
 
-    # Baseline
-    scenario_id += 1
-    start_time = time.time()
-    r = run_one_scenario_epanet_toolkit(
-    inp_path=inp_path,
-    obs_nodes=obs_nodes,
-    sample_minutes=sample_minutes,
-    duration_days=duration_days,
-    emitter_exponent=emitter_exponent,
-    leak_node=None,
-    )
-
-    r["scenario_id"] = scenario_id
-    rows.append(r)
-    print(f"Baseline Scenario {scenario_id} took {time.time() - start_time:.2f} seconds to collect data.")
-    batch_start = time.time()
-    # Leak scenarios: different random start times, same 4h duration
-    for ln in leak_nodes:
-        for emitter_c in emitter_choices:
-            scenario_id += 1
+    if include_baseline:
+        # Baseline: tiled from one periodic cycle (a few hours of hydraulics for any number of
+        # days) unless the network has controls or rules
+        scenario_id += 1
+        start_time = time.time()
+        try:
+            r = periodic_baseline_row(inp_path, obs_nodes, sample_minutes, duration_days)
+        except ValueError:
+            r = run_one_scenario_epanet_toolkit(
+            inp_path=inp_path,
+            obs_nodes=obs_nodes,
+            sample_minutes=sample_minutes,
+            duration_days=duration_days,
+            emitter_exponent=emitter_exponent,
+            leak_node=None,
+            )
+
+        r["scenario_id"] = scenario_id
+        rows.append(r)
+        print(f"Baseline Scenario {scenario_id} took {time.time() - start_time:.2f} seconds to collect data.")
 
-            start_hr = rng.randint(leak_start_hr_min, leak_start_hr_max)
+    if scenarios is None:
+        # Every leak node x emitter, different random start times, same 4h duration
+        scenarios = [(ln, float(emitter_c), rng.randint(leak_start_hr_min, leak_start_hr_max))
+                     for ln in leak_nodes for emitter_c in emitter_choices]
 
+    batch_start = time.time()
+    for ln, emitter_c, start_hr in scenarios:
+        if quarantine.contains(ln, float(emitter_c), int(float(start_hr) * 3600), int(float(leak_duration_hr) * 3600)):
+            skipped += 1
+            continue
+
+        try:
             r = run_one_scenario_epanet_toolkit(
                 inp_path=inp_path,
                 obs_nodes=obs_nodes,
@@ -336,13 +376,21 @@ def build_dataset(
                 leak_start_hr=float(start_hr),
                 leak_duration_hr=float(leak_duration_hr),
             )
-            r["scenario_id"] = scenario_id
-            rows.append(r)
-
-            if (scenario_id % 20 == 0):
-                print(f"Processed {scenario_id} scenarios – last 20 took {time.time() - batch_start:.2f}s")
-                batch_start = time.time()
-
+        except SimulationDiverged as e:
+            print(f"[QUARANTINE] {e}")
+            quarantine.add(e)
+            skipped += 1
+            continue
+        scenario_id += 1
+        r["scenario_id"] = scenario_id
+        rows.append(r)
+
+        if (scenario_id % 20 == 0):
+            print(f"Processed {scenario_id} scenarios – last 20 took {time.time() - batch_start:.2f}s")
+            batch_start = time.time()
+
+    if skipped:
+        print(f"Skipped {skipped} diverged or quarantined scenarios ({len(quarantine)} quarantined in total)")
     df = pd.DataFrame(rows)
     cols = ["scenario_id"] + [c for c in df.columns if c != "scenario_id"]
     return df.loc[:, cols]
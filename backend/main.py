@@ -3,10 +3,21 @@ FastAPI Backend for Water Supply Leak Detection System
 Provides REST API endpoints for EPANET network data, leak predictions, and monitoring
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
+import asyncio
+import io
+import json
+import os
+import threading
+import time
+import uuid
+import numpy as np
+import pandas as pd
 import uvicorn
 from datetime import datetime
 
@@ -14,7 +25,18 @@ from pathlib import Path
 
 from .epanet_parser import EPANETParser
 from .leak_detector import LeakDetector
-from .generate_data import DataGenerator
+from .generate_data import DataGenerator, OBS_NODES
+from .scenario_quarantine import SimulationDiverged
+from .telemetry_stream import TelemetryStream
+from .event_stream import EventBroadcaster, format_sse
+from .simulation_cache import SimulationCache
+from .signature_table import SignatureTable
+from .signature_index import SignatureIndex
+from .metrics import HTTP_REQUEST_SECONDS, render_prometheus, timed
+from .request_profiler import ADMIN_TOKEN_ENV, ProfilerBusy, ProfileStore, RequestProfile, is_authorized
+from .response_schema import ARRAY_ENCODINGS, RESPONSE_FORMATS, average_pressure, compact_response
+from .timeseries_store import RESOLUTIONS, TimeSeriesStore
+from .prediction_archive import PredictionArchive, input_hash
 
 app = FastAPI(
     title="Water Supply Leak Detection API",
@@ -32,8 +54,49 @@ app.add_middleware(
 )
 
 # Initialize EPANET parser and leak detector
-parser = EPANETParser("./backend/main_network.inp")
+with timed("inp_parse"):
+    parser = EPANETParser("./backend/main_network.inp")
 leak_detector = LeakDetector()
+telemetry = TelemetryStream(score_fn=leak_detector.predict_batch)
+# Pushes new predictions to every client of /api/stream/predictions
+events = EventBroadcaster()
+# Directory of the history store and prediction archive: the backend directory unless
+# $LEAK_API_DATA_DIR is set when this module is imported (e.g. by the benchmark)
+DATA_DIR_ENV = "LEAK_API_DATA_DIR"
+DATA_DIR = Path(os.environ.get(DATA_DIR_ENV) or Path(__file__).parent)
+# Pressure/demand telemetry and predictions, read back by the history endpoints
+history = TimeSeriesStore(DATA_DIR / "history")
+# Every served prediction with its model version and input hash, for map and trend queries
+archive = PredictionArchive(DATA_DIR / "predictions.sqlite")
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Per-request profiles captured on demand, see profile_request
+profiles = ProfileStore(max_profiles=50)
+
+NETWORK_INP = Path(__file__).parent / "main_network.inp"
+GENERATED_CSV = Path(__file__).parent / "generated_data.csv"
+# Identical simulation requests are answered from here; set disk_dir (e.g.
+# "epanet_runs/cache") to keep results across restarts
+simulation_cache = SimulationCache(NETWORK_INP, max_entries=256, disk_dir=None)
+# Precomputed on-grid scenarios (python -m backend.signature_table); None until built
+signature_table = SignatureTable.open(Path(__file__).parent / "signatures", NETWORK_INP)
+# k-NN localization over the table, one index per collection start hour, built on first use
+_signature_indexes: Dict[int, SignatureIndex] = {}
+
+
+def get_signature_index(collection_start_hour: Optional[int] = None) -> SignatureIndex:
+    if signature_table is None:
+        raise HTTPException(status_code=503, detail="No signature table built (python -m backend.signature_table)")
+    available = signature_table.axes[4]
+    if collection_start_hour is None:
+        collection_start_hour = available[0]
+    if collection_start_hour not in available:
+        raise HTTPException(status_code=422, detail=f"No signatures collected from hour {collection_start_hour} "
+                                                    f"(table has {available})")
+    if collection_start_hour not in _signature_indexes:
+        _signature_indexes[collection_start_hour] = SignatureIndex(signature_table, collection_start_hour)
+    return _signature_indexes[collection_start_hour]
 
 
 # Pydantic models for API responses
@@ -78,6 +141,72 @@ class LeakPrediction(BaseModel):
     leak_size_lps: List[float]
 
 
+PREDICTION_FIELDS = ("leak_x", "leak_y", "leak_size_lps")
+PREDICTION_SOURCES = ("telemetry", "simulation")
+
+
+class TelemetryReading(BaseModel):
+    node_id: str
+    timestamp: datetime
+    pressure: float
+    demand: Optional[float] = None
+
+class TelemetryBatch(BaseModel):
+    readings: List[TelemetryReading]
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Time every request into http_request_duration_seconds, labelled by route template"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status,
+        )
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """
+    Profile a single request when it carries an X-Profile header or ?profile= query flag
+    ("sample" or "1" for the all-thread sampling profiler, "cprofile" for cProfile) and an
+    X-Admin-Token matching $LEAK_API_PROFILE_TOKEN. The profile is stored and its id
+    returned in X-Profile-Id; streamed response bodies are not covered. cProfile sees every
+    coroutine on the event loop and the sampler every thread, so only one profiled request
+    may run at a time (409 otherwise) and a report is only clean with no other requests in
+    flight.
+    """
+    mode = request.headers.get("x-profile") or request.query_params.get("profile")
+    if not mode:
+        return await call_next(request)
+    if not is_authorized(request.headers.get("x-admin-token")):
+        return JSONResponse({"detail": f"Profiling requires an X-Admin-Token matching ${ADMIN_TOKEN_ENV}"}, status_code=403)
+    try:
+        profile = RequestProfile("sample" if mode in ("1", "true") else mode)
+    except ValueError as e:
+        return JSONResponse({"detail": str(e)}, status_code=400)
+
+    try:
+        profile.start()
+    except ProfilerBusy as e:
+        return JSONResponse({"detail": str(e)}, status_code=409)
+    try:
+        response = await call_next(request)
+    finally:
+        profile.stop()
+    response.headers["X-Profile-Id"] = profiles.add(profile, request.method, request.url.path, response.status_code)
+    return response
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -88,6 +217,40 @@ async def root():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Stage timings and request latencies in the Prometheus text format
+    """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def require_admin(token: Optional[str]):
+    if not is_authorized(token):
+        raise HTTPException(status_code=403, detail=f"Requires an X-Admin-Token matching ${ADMIN_TOKEN_ENV}")
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """
+    Stored request profiles, newest first
+    """
+    require_admin(x_admin_token)
+    return profiles.list()
+
+
+@app.get("/api/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """
+    One stored profile: folded stacks (flamegraph.pl / speedscope input) or a cProfile listing
+    """
+    require_admin(x_admin_token)
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id}")
+    return PlainTextResponse(profile["report"])
+
+
 @app.get("/api/network", response_model=NetworkData)
 async def get_network_data():
     """
@@ -108,6 +271,44 @@ async def get_network_data():
         raise HTTPException(status_code=500, detail=f"Error loading network data: {str(e)}")
 
 
+def publish_prediction(source: str, prediction: Dict, timestamp: Optional[float] = None,
+                       input_hashes: Optional[List[str]] = None):
+    """
+    Push a prediction to the event stream and record it in the history and the archive
+    Telemetry predictions are stamped with the end of their window, simulations with the current time.
+    A prediction whose input hashes and model version match the source's latest archived one
+    (e.g. the same generated data polled again) is published but not recorded again.
+    """
+    events.publish("prediction", {"source": source, **prediction})
+    model_version = leak_detector.model_version()
+    if input_hashes is not None:
+        latest = archive.latest(source)
+        if latest and [row["input_hash"] for row in latest] == list(input_hashes) \
+                and all(row["model_version"] == model_version for row in latest):
+            return
+    timestamp = time.time() if timestamp is None else timestamp
+    for field in PREDICTION_FIELDS:
+        values = prediction.get(field)
+        values = values if isinstance(values, list) else [values]
+        history.append("prediction", f"{source}_{field}", [timestamp] * len(values), values)
+    archive.add(source, prediction, timestamp, model_version, input_hashes)
+
+
+def frame_input_hashes(frame: pd.DataFrame) -> List[str]:
+    """input_hash of every row the model scores in a generated-data frame"""
+    return [input_hash(row) for row in frame[leak_detector.input_columns()].to_numpy(dtype=np.float32)]
+
+
+def score_generated_frame(frame: pd.DataFrame):
+    """Predictions and input hashes of a generated-data frame, read once"""
+    return leak_detector.predict_frame(frame), frame_input_hashes(frame)
+
+
+def generated_row_frame(data: Dict) -> pd.DataFrame:
+    """A run_generate_data row as the one-row frame generated_data.csv would hold (missing readings as NaN)"""
+    return pd.DataFrame([data]).replace("", np.nan)
+
+
 @app.get("/api/leak-predictions", response_model=LeakPrediction)
 async def get_leak_predictions():
     """
@@ -115,41 +316,271 @@ async def get_leak_predictions():
     Returns nodes with leak probability and risk levels
     """
     try:
-        predictions = leak_detector.get_predictions("./backend/generated_data.csv")
+        predictions, hashes = score_generated_frame(read_generated_frame())
+        publish_prediction("simulation", predictions, input_hashes=hashes)
         return predictions
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting predictions: {str(e)}")
 
 
-# @app.get("/api/pressure-data/{node_id}")
-# async def get_pressure_data(node_id: str, hours: int = 24):
-#     """
-#     Get historical pressure data for a specific node
-#     Args:
-#         node_id: Node identifier
-#         hours: Number of hours of historical data (default: 24)
-#     """
-#     try:
-#         data = leak_detector.get_pressure_history(node_id, hours)
-#         return {
-#             "node_id": node_id,
-#             "data": data,
-#             "unit": "psi"
-#         }
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=f"Error getting pressure data: {str(e)}")
+@app.get("/api/leak-candidates")
+async def get_leak_candidates(k: int = 5):
+    """
+    Rank the k most likely leak junctions for the current data by nearest-neighbour
+    match against the precomputed signature table
+    """
+    data = read_generated_frame()
+    # Compare against the baseline of the hour the data was collected from
+    start = int(round(float(data["collection_start_hr"].iloc[0]))) if "collection_start_hr" in data.columns else None
+    index = get_signature_index(start)
+    try:
+        candidates = index.query_frame(data, k=k)[0]
+        return {"candidates": candidates, "collection_start_hour": index.collection_start_hour}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error ranking leak candidates: {str(e)}")
 
 
-# @app.get("/api/demand-data/{node_id}")
-# async def get_demand_data(node_id: str):
-#     """
-#     Get base demand vs actual demand comparison for a node
-#     """
-#     try:
-#         data = leak_detector.get_demand_comparison(node_id)
-#         return data
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=f"Error getting demand data: {str(e)}")
+@app.post("/api/leak-predictions/batch", response_model=LeakPrediction)
+async def get_batch_leak_predictions(request: Request, batch_size: int = 4096):
+    """
+    Score many observation windows in one call
+    Body is either JSON ({"pressures": [[...], ...]} or a bare N x 504 array) or, with
+    Content-Type application/octet-stream, a row-major little-endian float32 N x 504 matrix
+    """
+    try:
+        body = await request.body()
+        n_features = leak_detector.input_dim()
+        if request.headers.get("content-type", "").startswith("application/octet-stream"):
+            if len(body) % (4 * n_features) != 0:
+                raise ValueError(f"Binary body must hold N x {n_features} float32 values")
+            pressures = np.frombuffer(body, dtype="<f4").reshape(-1, n_features)
+        else:
+            payload = json.loads(body)
+            if isinstance(payload, dict):
+                payload = payload.get("pressures")
+            pressures = np.asarray(payload, dtype=np.float32)
+        predictions = leak_detector.predict_batch(pressures, batch_size=batch_size)
+        predictions["count"] = len(predictions["leak_x"])
+        return JSONResponse(predictions)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pressure matrix: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting batch predictions: {str(e)}")
+
+
+@app.post("/api/telemetry")
+async def ingest_telemetry(batch: TelemetryBatch):
+    """
+    Ingest live pressure readings for the observation nodes
+    Returns the predictions for every 24-hour window completed by these readings
+    """
+    try:
+        predictions = telemetry.ingest(
+            {"node_id": r.node_id, "timestamp": r.timestamp.timestamp(), "pressure": r.pressure}
+            for r in batch.readings
+        )
+        # Only network nodes get a history series; the node id names its directory
+        known = [r for r in batch.readings if r.node_id in parser.nodes]
+        history.append_many("pressure", ((r.node_id, r.timestamp.timestamp(), r.pressure) for r in known))
+        history.append_many("demand", ((r.node_id, r.timestamp.timestamp(), r.demand)
+                                       for r in known if r.demand is not None))
+        for prediction in predictions:
+            publish_prediction("telemetry", prediction, prediction["window_end_s"], [prediction["input_hash"]])
+        return {"predictions": predictions, "status": telemetry.status()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error ingesting telemetry: {str(e)}")
+
+
+@app.get("/api/telemetry/status")
+async def get_telemetry_status():
+    """
+    Ring buffer fill level and the latest streaming prediction
+    """
+    return telemetry.status()
+
+
+@app.get("/api/simulation-cache")
+async def get_simulation_cache_stats():
+    """
+    Simulation result cache size and hit/miss counters
+    """
+    return simulation_cache.stats()
+
+
+@app.get("/api/signature-table")
+async def get_signature_table_summary():
+    """
+    Grid of precomputed scenarios answered without simulation (empty if no table is built)
+    """
+    return signature_table.summary() if signature_table is not None else {}
+
+
+@app.get("/api/stream/predictions")
+async def stream_predictions():
+    """
+    Server-Sent Events feed of new predictions (simulation runs and live telemetry)
+    Replaces polling /api/leak-predictions; a keepalive comment is sent every 15 s
+    """
+    return StreamingResponse(events.subscribe(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def history_range(hours: int, start: Optional[datetime], end: Optional[datetime], resolution: str):
+    """Epoch-second bounds of a history query: start..end, or the last hours before end (default now)"""
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown resolution {resolution!r}, expected one of {list(RESOLUTIONS)}")
+    end_s = end.timestamp() if end is not None else time.time()
+    start_s = start.timestamp() if start is not None else end_s - hours * 3600
+    if start_s > end_s:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return start_s, end_s
+
+
+@app.get("/api/pressure-data/{node_id}")
+async def get_pressure_data(node_id: str, hours: int = 24, start: Optional[datetime] = None,
+                            end: Optional[datetime] = None, resolution: str = "hourly"):
+    """
+    Get historical pressure data for a specific node
+    Args:
+        node_id: Node identifier
+        hours: Number of hours of historical data before end (default: 24), if start is not given
+        start, end: ISO datetimes bounding the range (end defaults to now)
+        resolution: "raw" readings, or "hourly" / "daily" mean, min, max and count per bucket
+    """
+    start_s, end_s = history_range(hours, start, end, resolution)
+    if node_id not in parser.nodes:
+        raise HTTPException(status_code=404, detail=f"Unknown node {node_id}")
+    try:
+        return {
+            "node_id": node_id,
+            "resolution": resolution,
+            "data": history.query("pressure", node_id, start_s, end_s, resolution),
+            "unit": "m",
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting pressure data: {str(e)}")
+
+
+@app.get("/api/demand-data/{node_id}")
+async def get_demand_data(node_id: str, hours: int = 24, start: Optional[datetime] = None,
+                          end: Optional[datetime] = None, resolution: str = "hourly"):
+    """
+    Get base demand vs actual demand comparison for a node
+    Actual demand is the reported telemetry over the range (same arguments as /api/pressure-data)
+    """
+    start_s, end_s = history_range(hours, start, end, resolution)
+    if node_id not in parser.nodes:
+        raise HTTPException(status_code=404, detail=f"Unknown node {node_id}")
+    try:
+        return {
+            "node_id": node_id,
+            "resolution": resolution,
+            "base_demand": parser.nodes[node_id].demand,
+            "data": history.query("demand", node_id, start_s, end_s, resolution),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting demand data: {str(e)}")
+
+
+@app.get("/api/prediction-history")
+async def get_prediction_history(source: str = "telemetry", hours: int = 24, start: Optional[datetime] = None,
+                                 end: Optional[datetime] = None, resolution: str = "raw"):
+    """
+    Past leak predictions of a source ("telemetry" or "simulation"), one series per output
+    """
+    start_s, end_s = history_range(hours, start, end, resolution)
+    if source not in PREDICTION_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Unknown source {source!r}, expected one of {list(PREDICTION_SOURCES)}")
+    try:
+        return {
+            "source": source,
+            "resolution": resolution,
+            "data": {field: history.query("prediction", f"{source}_{field}", start_s, end_s, resolution)
+                     for field in PREDICTION_FIELDS},
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting prediction history: {str(e)}")
+
+def archive_filters(start: Optional[datetime], end: Optional[datetime], min_x: Optional[float], min_y: Optional[float],
+                    max_x: Optional[float], max_y: Optional[float], x: Optional[float], y: Optional[float],
+                    radius_m: Optional[float], source: Optional[str], model_version: Optional[str]) -> Dict:
+    """PredictionArchive filter arguments from query parameters; a partial box or circle is a 400"""
+    bbox = (min_x, min_y, max_x, max_y)
+    near = (x, y, radius_m)
+    if any(v is not None for v in bbox) and any(v is None for v in bbox):
+        raise HTTPException(status_code=400, detail="A bounding box needs min_x, min_y, max_x and max_y")
+    if any(v is not None for v in near) and any(v is None for v in near):
+        raise HTTPException(status_code=400, detail="A radius query needs x, y and radius_m")
+    return {
+        "start": start.timestamp() if start is not None else None,
+        "end": end.timestamp() if end is not None else None,
+        "bbox": bbox if min_x is not None else None,
+        "near": near if x is not None else None,
+        "source": source,
+        "model_version": model_version,
+    }
+
+
+@app.get("/api/prediction-archive")
+async def get_archived_predictions(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                   min_x: Optional[float] = None, min_y: Optional[float] = None,
+                                   max_x: Optional[float] = None, max_y: Optional[float] = None,
+                                   x: Optional[float] = None, y: Optional[float] = None, radius_m: Optional[float] = None,
+                                   source: Optional[str] = None, model_version: Optional[str] = None, limit: int = 1000):
+    """
+    Archived predictions, newest first, optionally within a time range, a bounding box
+    (min_x, min_y, max_x, max_y) or radius_m of (x, y), for one source or model version
+    """
+    filters = archive_filters(start, end, min_x, min_y, max_x, max_y, x, y, radius_m, source, model_version)
+    try:
+        predictions = archive.query(limit=max(1, limit), **filters)
+        return {"count": len(predictions), "predictions": predictions}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying prediction archive: {str(e)}")
+
+
+@app.get("/api/prediction-archive/grid")
+async def get_archived_prediction_grid(cell_m: float = 100.0, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                       min_x: Optional[float] = None, min_y: Optional[float] = None,
+                                       max_x: Optional[float] = None, max_y: Optional[float] = None,
+                                       source: Optional[str] = None, model_version: Optional[str] = None):
+    """
+    Map overlay of archived predictions: count, centroid and mean / max leak size per cell_m grid cell
+    """
+    if cell_m <= 0:
+        raise HTTPException(status_code=400, detail="cell_m must be positive")
+    filters = archive_filters(start, end, min_x, min_y, max_x, max_y, None, None, None, source, model_version)
+    filters.pop("near")
+    try:
+        return {"cell_m": cell_m, "cells": archive.grid(cell_m, **filters)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying prediction archive: {str(e)}")
+
+
+@app.get("/api/prediction-archive/trend")
+async def get_archived_prediction_trend(bucket_s: int = 3600, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                        min_x: Optional[float] = None, min_y: Optional[float] = None,
+                                        max_x: Optional[float] = None, max_y: Optional[float] = None,
+                                        x: Optional[float] = None, y: Optional[float] = None, radius_m: Optional[float] = None,
+                                        source: Optional[str] = None, model_version: Optional[str] = None):
+    """
+    Trend chart of archived predictions: count and mean / max leak size per bucket_s seconds
+    """
+    if bucket_s <= 0:
+        raise HTTPException(status_code=400, detail="bucket_s must be positive")
+    filters = archive_filters(start, end, min_x, min_y, max_x, max_y, x, y, radius_m, source, model_version)
+    try:
+        return {"bucket_s": bucket_s, "buckets": archive.trend(bucket_s, **filters)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying prediction archive: {str(e)}")
+
+
+@app.get("/api/prediction-archive/summary")
+async def get_prediction_archive_summary():
+    """
+    Number and time span of archived predictions and the spatial index in use
+    """
+    return archive.summary()
+
 
 # @app.get("/api/statistics")
 # async def get_statistics():
@@ -162,53 +593,185 @@ async def get_leak_predictions():
 #     except Exception as e:
 #         raise HTTPException(status_code=500, detail=f"Error getting statistics: {str(e)}")
 
-@app.get(f"/api/generate_data")
-async def generate_data(
+# Latest generated scenario as CSV text; generated_data.csv is rewritten from it when
+# next read, so a cache hit costs no disk write
+generated_csv_lock = threading.Lock()
+generated_csv = {"text": None, "stale": False}
+
+
+def set_generated_csv(csv_text: str):
+    """Make csv_text the current generated scenario"""
+    with generated_csv_lock:
+        generated_csv.update(text=csv_text, stale=True)
+
+
+def read_generated_frame() -> pd.DataFrame:
+    """
+    The current generated scenario, the one /api/leak-predictions scores
+    Writes generated_data.csv (atomically) first if it is behind
+    """
+    with generated_csv_lock:
+        text = generated_csv["text"]
+        if generated_csv["stale"]:
+            tmp = GENERATED_CSV.with_name(f"{GENERATED_CSV.name}.{uuid.uuid4().hex[:8]}.tmp")
+            tmp.write_text(text)
+            os.replace(tmp, GENERATED_CSV)
+            generated_csv["stale"] = False
+    return pd.read_csv(io.StringIO(text)) if text is not None else pd.read_csv(GENERATED_CSV)
+
+
+def run_generate_data(
     node_id: str,
-    emitter_cof:float=0.5,
-    collection_start_hour:int=0,
-    leak_start_min:int=60,
-    leak_duration_hours:int=4
-):
+    emitter_cof: float,
+    collection_start_hour: int,
+    leak_start_min: int,
+    leak_duration_hours: int,
+    progress_callback=None
+) -> Dict:
     """
-    Generate simulated data for testing purposes
+    Run one leak simulation and add the summary fields the dashboard uses
+    Results are cached per parameter set and network version; a hit also makes the
+    cached scenario the current one, so /api/leak-predictions scores it. On-grid
+    parameters are read from the signature table instead of running EPANET
     """
-    try:
-        total_pressure = 0
-        sample_minutes = 60
-        sample_duration_hours = 24
-        inp_path = Path(__file__).parent / "main_network.inp"
-        gd = DataGenerator(inp_file = str(inp_path), step_m=sample_minutes, duration_h=sample_duration_hours)
+    params = (node_id, float(emitter_cof), int(collection_start_hour), int(leak_start_min), int(leak_duration_hours))
+    cached = simulation_cache.get(params)
+    if cached is not None:
+        data, csv_text = cached
+        set_generated_csv(csv_text)
+        return dict(data)
+
+    sample_minutes = 60
+    sample_duration_hours = 24
+    scenario = signature_table.lookup(*params) if signature_table is not None else None
+    if scenario is not None and (signature_table.step_m, signature_table.duration_h) == (sample_minutes, sample_duration_hours):
+        data = signature_table.row(scenario)
+    else:
+        # Simulations run concurrently (threads of the streaming endpoint); each gets its own EPANET files
+        gd = DataGenerator(inp_file = str(NETWORK_INP), step_m=sample_minutes, duration_h=sample_duration_hours,
+                           run_name=f"api_{uuid.uuid4().hex[:12]}", keep_files=False)
         data = gd.generate_data(
 
             node_id,
             emitter_cof,
             collection_start_hour,
             leak_start_min,
-            leak_duration_hours
+            leak_duration_hours,
+            progress_callback=progress_callback,
+            write_csv=False
         )
+    # Built from this run's own row, never read back from the shared file
+    csv_text = pd.DataFrame([data]).to_csv()
+    set_generated_csv(csv_text)
+
+    
+
+    data.update({"average_pressure": average_pressure(data)})
+
+    #pressure_history
+    pressure_history_dic= data["leak_pressure_time"]
+    data.update({"pressure_history": pressure_history_dic})     
+
+    #demand_history
+    demand_dic= data["leak_demand_time"]
+    data.update({"demand_history": demand_dic})
+
+    simulation_cache.put(params, (dict(data), csv_text))
+    return data
 
-        
 
-        # #average_pressure.
-        pressureColumns=[key for key in data.keys() if key.startswith("NODE")]
-        for column in pressureColumns:
-            total_pressure = data[column] + total_pressure
-        average_pressure = total_pressure / len(pressureColumns)
+def check_response_format(format: str, encoding: str):
+    if format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {format!r}, expected one of {RESPONSE_FORMATS}")
+    if encoding not in ARRAY_ENCODINGS:
+        raise HTTPException(status_code=400, detail=f"Unknown encoding {encoding!r}, expected one of {ARRAY_ENCODINGS}")
 
-        data.update({"average_pressure": average_pressure})
 
-        #pressure_history
-        pressure_history_dic= data["leak_pressure_time"]
-        data.update({"pressure_history": pressure_history_dic})     
+def format_generated_data(data: Dict, format: str, encoding: str):
+    # run_generate_data always simulates hourly samples over a 24 h window
+    if format == "v2":
+        return compact_response(data, OBS_NODES, step_m=60, duration_h=24, encoding=encoding)
+    return jsonable_encoder(data)
 
-        #demand_history
-        demand_dic= data["leak_demand_time"]
-        data.update({"demand_history": demand_dic})
-        return data
+
+@app.get(f"/api/generate_data")
+async def generate_data(
+    node_id: str,
+    emitter_cof:float=0.5,
+    collection_start_hour:int=0,
+    leak_start_min:int=60,
+    leak_duration_hours:int=4,
+    format:str="v1",
+    encoding:str="json"
+):
+    """
+    Generate simulated data for testing purposes
+    format=v1 (default) is the flat row with one NODE_x_Hourk key per reading; format=v2
+    is the compact array schema of response_schema.py, with encoding=base64 for float32-packed arrays
+    """
+    check_response_format(format, encoding)
+    try:
+        data = run_generate_data(node_id, emitter_cof, collection_start_hour, leak_start_min, leak_duration_hours)
+        return JSONResponse(format_generated_data(data, format, encoding))
+    except SimulationDiverged as e:
+        raise HTTPException(status_code=422, detail=f"Simulation diverged: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating data: {str(e)}")
 
+
+@app.get("/api/stream/generate_data")
+async def stream_generate_data(
+    node_id: str,
+    emitter_cof:float=0.5,
+    collection_start_hour:int=0,
+    leak_start_min:int=60,
+    leak_duration_hours:int=4,
+    format:str="v1",
+    encoding:str="json"
+):
+    """
+    Same simulation as /api/generate_data (including format and encoding), streamed as Server-Sent Events:
+    "progress" after every hydraulic timestep, then "result" (the generated data),
+    then "prediction" for the new data; "error" if either step fails
+    """
+    check_response_format(format, encoding)
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def on_progress(sim_time_s: int, end_time_s: int):
+        progress = {"sim_time_s": sim_time_s, "end_time_s": end_time_s,
+                    "fraction": round(min(sim_time_s / end_time_s, 1.0), 4) if end_time_s else 1.0}
+        loop.call_soon_threadsafe(queue.put_nowait, ("progress", progress))
+
+    async def simulate():
+        try:
+            data = await asyncio.to_thread(
+                run_generate_data, node_id, emitter_cof, collection_start_hour,
+                leak_start_min, leak_duration_hours, on_progress
+            )
+            await queue.put(("result", format_generated_data(data, format, encoding)))
+            # Scored from this request's own row: concurrent runs replace generated_data.csv
+            predictions, hashes = await asyncio.to_thread(score_generated_frame, generated_row_frame(data))
+            publish_prediction("simulation", predictions, input_hashes=hashes)
+            await queue.put(("prediction", predictions))
+        except Exception as e:
+            await queue.put(("error", {"detail": f"Error generating data: {str(e)}"}))
+        finally:
+            await queue.put(None)
+
+    async def event_source():
+        task = asyncio.create_task(simulate())
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield format_sse(*item)
+        finally:
+            await task
+
+    return StreamingResponse(event_source(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 if __name__ == "__main__":
     uvicorn.run(
         "__main__:app",
@@ -0,0 +1,236 @@
+"""
+Prediction Archive
+Every leak prediction served (location, size, model version, hash of the model input)
+in a local SQLite database, indexed by time and by location (an R-tree where SQLite has
+the module, a fixed grid otherwise), for map overlays and trend charts over millions
+of past predictions
+"""
+
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+ARCHIVE_FILE = Path(__file__).parent / "predictions.sqlite"
+# (min_x, min_y, max_x, max_y) in network coordinates
+BBox = Tuple[float, float, float, float]
+
+
+def input_hash(inputs: np.ndarray) -> str:
+    """Short SHA-256 of one model input vector (little-endian float32 bytes)"""
+    return hashlib.sha256(np.ascontiguousarray(inputs, dtype="<f4").tobytes()).hexdigest()[:16]
+
+
+def _has_rtree(connection: sqlite3.Connection) -> bool:
+    try:
+        connection.execute("CREATE VIRTUAL TABLE temp.rtree_probe USING rtree(id, a, b)")
+        connection.execute("DROP TABLE temp.rtree_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+class PredictionArchive:
+    """
+    Append-only table of predictions with a time index and a spatial index
+
+    The R-tree is spatial only: with time as a third axis its nodes split on the
+    seconds axis, by far the widest, and cover the whole map. It stores 32-bit bounds,
+    so it only narrows the candidates and every query re-checks the exact columns.
+    Without the R-tree module each row carries its grid_m x grid_m cell and
+    (cell_x, cell_y, time_s) is indexed instead.
+    """
+
+    def __init__(self, path: Union[str, Path] = ARCHIVE_FILE, grid_m: float = 500.0, use_rtree: Optional[bool] = None):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        # SQLite's own floor() is an optional build feature
+        self._db.create_function("floor_div", 2, lambda v, d: math.floor(v / d), deterministic=True)
+        if self.path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            stored = dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+            if not stored:
+                # The index kind and cell size are fixed when the archive is created
+                rtree = _has_rtree(self._db) if use_rtree is None else use_rtree
+                stored = {"spatial_index": "rtree" if rtree else "grid", "grid_m": repr(float(grid_m))}
+                self._db.executemany("INSERT INTO meta VALUES (?, ?)", stored.items())
+            self.spatial_index = stored["spatial_index"]
+            self.grid_m = float(stored["grid_m"])
+
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS predictions (
+                    id INTEGER PRIMARY KEY,
+                    time_s REAL NOT NULL,
+                    source TEXT NOT NULL,
+                    leak_x REAL NOT NULL,
+                    leak_y REAL NOT NULL,
+                    leak_size_lps REAL NOT NULL,
+                    model_version TEXT,
+                    input_hash TEXT,
+                    cell_x INTEGER NOT NULL,
+                    cell_y INTEGER NOT NULL
+                )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS predictions_time ON predictions (time_s)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS predictions_source ON predictions (source, time_s)")
+            if self.spatial_index == "rtree":
+                self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS predictions_rtree "
+                                 "USING rtree(id, min_x, max_x, min_y, max_y)")
+            else:
+                self._db.execute("CREATE INDEX IF NOT EXISTS predictions_cell ON predictions (cell_x, cell_y, time_s)")
+
+    def add(self, source: str, prediction: Dict, timestamp: Optional[float] = None,
+            model_version: Optional[str] = None, input_hashes: Optional[Sequence[str]] = None) -> int:
+        """
+        Archive one prediction dict (leak_x, leak_y, leak_size_lps as scalars or equal-length
+        lists, e.g. one per scored row); rows with non-finite values are skipped.
+        Returns the number of rows stored
+        """
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        columns = [np.atleast_1d(np.asarray(prediction[field], dtype=np.float64))
+                   for field in ("leak_x", "leak_y", "leak_size_lps")]
+        hashes = list(input_hashes) if input_hashes is not None else [None] * len(columns[0])
+        rows = [(timestamp, source, x, y, size, model_version, h,
+                 math.floor(x / self.grid_m), math.floor(y / self.grid_m))
+                for x, y, size, h in zip(*(c.tolist() for c in columns), hashes)
+                if math.isfinite(x) and math.isfinite(y) and math.isfinite(size)]
+        with self._lock, self._db:
+            for row in rows:
+                cursor = self._db.execute(
+                    "INSERT INTO predictions (time_s, source, leak_x, leak_y, leak_size_lps, model_version, "
+                    "input_hash, cell_x, cell_y) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+                if self.spatial_index == "rtree":
+                    self._db.execute("INSERT INTO predictions_rtree VALUES (?, ?, ?, ?, ?)",
+                                     (cursor.lastrowid, row[2], row[2], row[3], row[3]))
+        return len(rows)
+
+    def latest(self, source: str) -> List[Dict]:
+        """
+        The newest archived prediction of a source: its rows (one per scored input, in
+        insertion order) with time_s, model_version and input_hash; empty if none
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT time_s, model_version, input_hash FROM predictions "
+                "WHERE source = ? AND time_s = (SELECT MAX(time_s) FROM predictions WHERE source = ?) ORDER BY id",
+                (source, source)).fetchall()
+        return [dict(row) for row in rows]
+
+    def _filter(self, start: Optional[float], end: Optional[float], bbox: Optional[BBox],
+               near: Optional[Tuple[float, float, float]], source: Optional[str],
+               model_version: Optional[str]) -> Tuple[str, List]:
+        """
+        FROM and WHERE clauses over predictions p shared by every query; with a bbox the
+        spatial index drives the scan (CROSS JOIN fixes the R-tree as the outer loop)
+        """
+        if near is not None:
+            x, y, radius = near
+            bbox = (x - radius, y - radius, x + radius, y + radius)
+        source_table = "predictions p"
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("p.time_s >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("p.time_s < ?")
+            params.append(end)
+        if bbox is not None:
+            min_x, min_y, max_x, max_y = bbox
+            clauses.append("p.leak_x BETWEEN ? AND ? AND p.leak_y BETWEEN ? AND ?")
+            params += [min_x, max_x, min_y, max_y]
+            if self.spatial_index == "rtree":
+                source_table = "predictions_rtree r CROSS JOIN predictions p ON p.id = r.id"
+                clauses.append("r.min_x <= ? AND r.max_x >= ? AND r.min_y <= ? AND r.max_y >= ?")
+                params += [max_x, min_x, max_y, min_y]
+            else:
+                source_table = "predictions p INDEXED BY predictions_cell"
+                clauses.append("p.cell_x BETWEEN ? AND ? AND p.cell_y BETWEEN ? AND ?")
+                params += [math.floor(min_x / self.grid_m), math.floor(max_x / self.grid_m),
+                           math.floor(min_y / self.grid_m), math.floor(max_y / self.grid_m)]
+        if near is not None:
+            clauses.append("(p.leak_x - ?) * (p.leak_x - ?) + (p.leak_y - ?) * (p.leak_y - ?) <= ?")
+            params += [x, x, y, y, radius * radius]
+        if source is not None:
+            clauses.append("p.source = ?")
+            params.append(source)
+        if model_version is not None:
+            clauses.append("p.model_version = ?")
+            params.append(model_version)
+        return source_table + ((" WHERE " + " AND ".join(clauses)) if clauses else ""), params
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None, bbox: Optional[BBox] = None,
+              near: Optional[Tuple[float, float, float]] = None, source: Optional[str] = None,
+              model_version: Optional[str] = None, limit: int = 1000) -> List[Dict]:
+        """
+        Archived predictions, newest first
+
+        Parameters:
+        - start, end (float): Epoch-second range, start <= time_s < end (open if None).
+        - bbox (tuple): (min_x, min_y, max_x, max_y) the leak location must fall in.
+        - near (tuple): (x, y, radius) the leak location must be within.
+        - source, model_version (str): Exact matches.
+        - limit (int): Maximum number of rows.
+
+        Returns:
+        - list of dict: Rows with time_s, source, leak_x, leak_y, leak_size_lps, model_version, input_hash.
+        """
+        from_where, params = self._filter(start, end, bbox, near, source, model_version)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT p.time_s, p.source, p.leak_x, p.leak_y, p.leak_size_lps, p.model_version, p.input_hash "
+                f"FROM {from_where} ORDER BY p.time_s DESC LIMIT ?", params + [int(limit)]).fetchall()
+        return [dict(row) for row in rows]
+
+    def grid(self, cell_m: float, start: Optional[float] = None, end: Optional[float] = None,
+             bbox: Optional[BBox] = None, source: Optional[str] = None,
+             model_version: Optional[str] = None) -> List[Dict]:
+        """
+        Map overlay: per cell_m x cell_m cell with predictions, their count, centroid and
+        mean / max leak size (same filters as query)
+        """
+        from_where, params = self._filter(start, end, bbox, None, source, model_version)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT floor_div(p.leak_x, ?) AS cell_x, floor_div(p.leak_y, ?) AS cell_y, "
+                "COUNT(*) AS count, AVG(p.leak_x) AS x, AVG(p.leak_y) AS y, "
+                "AVG(p.leak_size_lps) AS mean_size_lps, MAX(p.leak_size_lps) AS max_size_lps "
+                f"FROM {from_where} GROUP BY 1, 2 ORDER BY count DESC",
+                [cell_m, cell_m] + params).fetchall()
+        return [dict(row) for row in rows]
+
+    def trend(self, bucket_s: int, start: Optional[float] = None, end: Optional[float] = None,
+              bbox: Optional[BBox] = None, near: Optional[Tuple[float, float, float]] = None,
+              source: Optional[str] = None, model_version: Optional[str] = None) -> List[Dict]:
+        """
+        Trend chart: per bucket_s time bucket with predictions, their count and mean /
+        max leak size (same filters as query), oldest first
+        """
+        from_where, params = self._filter(start, end, bbox, near, source, model_version)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT floor_div(p.time_s, ?) * ? AS time_s, COUNT(*) AS count, "
+                "AVG(p.leak_size_lps) AS mean_size_lps, MAX(p.leak_size_lps) AS max_size_lps "
+                f"FROM {from_where} GROUP BY 1 ORDER BY 1",
+                [bucket_s, bucket_s] + params).fetchall()
+        return [dict(row) for row in rows]
+
+    def summary(self) -> Dict:
+        """Row count, time span and index kind"""
+        with self._lock:
+            count, first, last = self._db.execute("SELECT COUNT(*), MIN(time_s), MAX(time_s) FROM predictions").fetchone()
+        return {"predictions": count, "first_time_s": first, "last_time_s": last,
+                "spatial_index": self.spatial_index, "grid_m": self.grid_m}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
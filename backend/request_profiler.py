@@ -0,0 +1,157 @@
+"""
+On-Demand Request Profiling
+Opt-in, admin-only profiling of single API requests: a sampling profiler over every
+thread (so simulation worker threads are included) producing flamegraph-compatible
+folded stacks, or a cProfile of the event-loop thread
+"""
+
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+# Profiling is disabled unless this environment variable holds the admin token
+ADMIN_TOKEN_ENV = "LEAK_API_PROFILE_TOKEN"
+PROFILE_MODES = ("sample", "cprofile")
+# Neither profiler can tell requests apart (cProfile hooks the whole event-loop thread,
+# the sampler every thread), so only one profile runs at a time
+_profile_active = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is running"""
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    """True if token matches the configured admin token (never when none is configured)"""
+    expected = os.environ.get(ADMIN_TOKEN_ENV)
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of every thread at a fixed interval from a background thread
+    Stacks are aggregated as "thread;outer;...;inner count" lines (folded format, loadable
+    by flamegraph.pl, speedscope or inferno)
+    """
+
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+
+class RequestProfile:
+    """
+    Profiler for one request, in either PROFILE_MODES mode
+
+    Neither mode is scoped to the request: cprofile records everything the event-loop
+    thread runs between start and stop, including other requests' coroutines interleaved
+    at each await, and sample records every thread of the process, including other
+    requests' coroutines and to_thread workers. A report is only attributable to the
+    profiled request when that is the only one in flight. Starting a second profile, of
+    either mode, while one is running raises ProfilerBusy.
+    """
+
+    def __init__(self, mode: str = "sample", interval_s: float = 0.005):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}, expected one of {PROFILE_MODES}")
+        self.mode = mode
+        self._sampler = SamplingProfiler(interval_s) if mode == "sample" else None
+        self._cprofile = cProfile.Profile() if mode == "cprofile" else None
+        self._started = 0.0
+        self.duration_s = 0.0
+
+    def start(self):
+        if not _profile_active.acquire(blocking=False):
+            raise ProfilerBusy("Another profiled request is in progress; retry when it has finished")
+        self._started = time.perf_counter()
+        if self._sampler is not None:
+            self._sampler.start()
+        else:
+            self._cprofile.enable()
+
+    def stop(self):
+        if self._sampler is not None:
+            self._sampler.stop()
+        else:
+            self._cprofile.disable()
+        _profile_active.release()
+        self.duration_s = time.perf_counter() - self._started
+
+    def report(self) -> str:
+        """Folded stacks (sample mode) or cumulative-time pstats listing (cprofile mode)"""
+        if self._sampler is not None:
+            return self._sampler.folded()
+        out = io.StringIO()
+        pstats.Stats(self._cprofile, stream=out).sort_stats("cumulative").print_stats(80)
+        return out.getvalue()
+
+
+class ProfileStore:
+    """Keeps the most recent max_profiles profiles in memory for the admin endpoints"""
+
+    def __init__(self, max_profiles: int = 50):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile, method: str, path: str, status: int) -> str:
+        profile_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._profiles[profile_id] = {
+                "id": profile_id,
+                "method": method,
+                "path": path,
+                "status": status,
+                "mode": profile.mode,
+                "duration_s": profile.duration_s,
+                "created": time.time(),
+                "report": profile.report(),
+            }
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [{k: v for k, v in p.items() if k != "report"} for p in reversed(self._profiles.values())]
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._profiles.get(profile_id)
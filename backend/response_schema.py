@@ -0,0 +1,96 @@
+"""
+Compact Simulation Response
+Version 2 of the /api/generate_data payload: the node list, the time axis and one
+2-D pressure array instead of one NODE_x_Hourk key per reading, the leak-node series
+once (v1 repeats them as pressure_history / demand_history) and aggregates computed
+with NumPy. Arrays are JSON lists or base64 little-endian float32
+"""
+
+import base64
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .generate_data import RESOLUTION_MAP
+
+RESPONSE_FORMATS = ("v1", "v2")
+ARRAY_ENCODINGS = ("json", "base64")
+
+# Scalar fields of a generate_data row carried over as they are
+LEAK_FIELDS = ("leak", "leak_node", "leak_x", "leak_y", "leak_size_lps", "leak_node_pressure_head",
+               "emitter_coeff", "leak_start_min", "leak_duration_hr")
+
+
+def encode_array(array: np.ndarray, encoding: str = "json"):
+    """
+    A JSON list (NaN as null) or {"dtype": "<f4", "shape": [...], "data": base64}, the
+    row-major bytes that np.frombuffer(..., "<f4").reshape(shape) reads back
+    """
+    if encoding == "base64":
+        packed = np.ascontiguousarray(array, dtype="<f4")
+        return {"dtype": "<f4", "shape": list(packed.shape),
+                "data": base64.b64encode(packed.tobytes()).decode("ascii")}
+    array = np.asarray(array, dtype=np.float64)
+    if np.isnan(array).any():
+        return np.where(np.isnan(array), None, array).tolist()
+    return array.tolist()
+
+
+def pressure_matrix(data: Dict, nodes: Sequence[str], step_m: int, duration_h: int) -> np.ndarray:
+    """Pressures (nodes, steps) of a generate_data row, NaN where a reading is missing"""
+    label = RESOLUTION_MAP[step_m]
+    steps = duration_h * 60 // step_m
+    values = [data.get(f"{nid}_{label}{k}", "") for nid in nodes for k in range(steps)]
+    return np.array([np.nan if v == "" else v for v in values], dtype=np.float64).reshape(len(nodes), steps)
+
+
+def average_pressure(data: Dict) -> Optional[float]:
+    """Mean of every observation-node reading of a generate_data row (the v1 average_pressure)"""
+    values = np.array([v for key, v in data.items() if key.startswith("NODE") and v != ""], dtype=np.float64)
+    return float(values.mean()) if len(values) else None
+
+
+def compact_response(data: Dict, nodes: List[str], step_m: int, duration_h: int, encoding: str = "json") -> Dict:
+    """
+    Version 2 response for a generate_data row.
+
+    Parameters:
+    - data (dict): Row returned by DataGenerator.generate_data (or SignatureTable.row).
+    - nodes (list of str): Observation nodes, the rows of the pressure array.
+    - step_m (int), duration_h (int): Sampling step and collection window of the row.
+    - encoding (str): One of ARRAY_ENCODINGS for the pressure and leak series arrays.
+
+    Returns:
+    - dict: JSON-ready payload; pressures[i][k] is node i at time_s[k] (simulation seconds).
+    """
+    pressures = pressure_matrix(data, nodes, step_m, duration_h)
+    start_s = int(round(float(data.get("collection_start_hr", 0.0)) * 3600))
+    step_s = step_m * 60
+
+    leak_pressure = data.get("leak_pressure_time", {})
+    leak_demand = data.get("leak_demand_time", {})
+    series_times = np.fromiter(leak_pressure.keys(), dtype=np.int64, count=len(leak_pressure))
+
+    with np.errstate(invalid="ignore"):
+        node_mean = np.nanmean(pressures, axis=1) if pressures.size else np.zeros(0)
+
+    def scalar(value) -> Optional[object]:
+        return None if value == "" else value
+
+    return {
+        "format": "v2",
+        "nodes": list(nodes),
+        "time_s": (start_s + step_s * np.arange(pressures.shape[1])).tolist(),
+        "step_s": step_s,
+        "collection_start_hr": data.get("collection_start_hr"),
+        "collection_duration_hr": data.get("collection_duration_hr"),
+        **{field: scalar(data[field]) for field in LEAK_FIELDS if field in data},
+        "pressures": encode_array(pressures, encoding),
+        "average_pressure": average_pressure(data),
+        "node_average_pressure": encode_array(node_mean, "json"),
+        "leak_series": {
+            "time_s": series_times.tolist(),
+            "pressure": encode_array(np.fromiter(leak_pressure.values(), dtype=np.float64, count=len(leak_pressure)), encoding),
+            "demand": encode_array(np.fromiter(leak_demand.values(), dtype=np.float64, count=len(leak_demand)), encoding),
+        },
+    }
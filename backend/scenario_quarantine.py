@@ -0,0 +1,99 @@
+"""
+Scenario Quarantine
+The hydraulic loops raise SimulationDiverged at the first non-finite value (or EPANET
+warning, in dataset builds); the failing scenario (node, emitter, leak start and
+duration) goes into a JSON quarantine list, per network version, that later dataset
+builds skip instead of re-simulating
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+QUARANTINE_FILE = Path(__file__).parent / "quarantine.json"
+
+
+class SimulationDiverged(RuntimeError):
+    """
+    A scenario's hydraulics diverged: a non-finite pressure or demand (node set) or an
+    EPANET warning (code set, e.g. 1 unbalanced, 3 disconnected, 6 negative pressures)
+    """
+
+    def __init__(self, leak_node: Optional[str], emitter_cof: Optional[float], time_s: int, reason: str,
+                 node: Optional[str] = None, code: Optional[int] = None, leak_start_s: Optional[int] = None,
+                 leak_duration_s: Optional[int] = None):
+        self.leak_node = leak_node
+        self.emitter_cof = float(emitter_cof) if emitter_cof is not None else None
+        # Leak start (simulation seconds) and duration of the scenario; time_s is when it diverged
+        self.leak_start_s = int(leak_start_s) if leak_start_s is not None else None
+        self.leak_duration_s = int(leak_duration_s) if leak_duration_s is not None else None
+        self.time_s = int(time_s)
+        self.reason = reason
+        self.node = node
+        self.code = code
+        super().__init__(f"leak_node={leak_node} C={emitter_cof} diverged at t={self.time_s}s: {reason}")
+
+    def to_dict(self) -> Dict:
+        return {"leak_node": self.leak_node, "emitter_cof": self.emitter_cof, "leak_start_s": self.leak_start_s,
+                "leak_duration_s": self.leak_duration_s, "time_s": self.time_s, "reason": self.reason,
+                "node": self.node, "code": self.code}
+
+
+class ScenarioQuarantine:
+    """
+    Diverged scenarios of one network, persisted in a JSON list shared by every network
+
+    Scenarios are keyed on (leak node, emitter coefficient, leak start, leak duration):
+    whether a leak drives the network past what it can supply depends on the demand at
+    the time it is open, so the same leak started at another hour is simulated again.
+    Entries of other network versions are kept in the file but never match.
+    """
+
+    def __init__(self, inp_file: Union[str, Path], path: Union[str, Path] = QUARANTINE_FILE):
+        self.path = Path(path)
+        self.network_version = hashlib.sha256(Path(inp_file).read_bytes()).hexdigest()
+        self._lock = threading.Lock()
+        self._entries: List[Dict] = []
+        if self.path.exists():
+            with open(self.path) as f:
+                self._entries = json.load(f)
+        self._keys = {self._key(e["leak_node"], e["emitter_cof"], e.get("leak_start_s"), e.get("leak_duration_s"))
+                      for e in self._entries if e.get("network_version") == self.network_version}
+
+    @staticmethod
+    def _key(leak_node: Optional[str], emitter_cof: Optional[float], leak_start_s: Optional[int],
+             leak_duration_s: Optional[int]):
+        return (leak_node, round(float(emitter_cof), 6) if emitter_cof is not None else None,
+                int(leak_start_s) if leak_start_s is not None else None,
+                int(leak_duration_s) if leak_duration_s is not None else None)
+
+    def contains(self, leak_node: Optional[str], emitter_cof: Optional[float], leak_start_s: Optional[int],
+                 leak_duration_s: Optional[int]) -> bool:
+        """Whether this exact scenario (leak start and duration in simulation seconds) diverged before"""
+        return self._key(leak_node, emitter_cof, leak_start_s, leak_duration_s) in self._keys
+
+    def add(self, error: SimulationDiverged):
+        """Record a diverged scenario and rewrite the file"""
+        with self._lock:
+            key = self._key(error.leak_node, error.emitter_cof, error.leak_start_s, error.leak_duration_s)
+            if key in self._keys:
+                return
+            self._keys.add(key)
+            self._entries.append({**error.to_dict(), "network_version": self.network_version,
+                                  "recorded": time.time()})
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(self._entries, f, indent=1)
+            os.replace(tmp, self.path)
+
+    def entries(self) -> List[Dict]:
+        """Entries of this network version"""
+        with self._lock:
+            return [e for e in self._entries if e.get("network_version") == self.network_version]
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -0,0 +1,226 @@
+"""
+Scenario Sampler
+Plans leak scenarios for build_dataset instead of the exhaustive leak node x emitter
+grid: Latin hypercube samples of (leak node, emitter, start hour) stratified over
+topology clusters of the pipe graph, and an active-learning loop that trains
+LeakLocalizationNN and sends further simulations to the clusters where its
+validation localization error is highest
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import torch
+import wntr
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+from torch.utils.data import DataLoader, Subset
+
+from .legacy_generate_data import EMITTER_CHOICES, build_dataset
+
+# (leak node, emitter coefficient, leak start hour), the scenario format of build_dataset
+Scenario = Tuple[str, float, int]
+OUTPUT_COLUMNS = ["leak_x", "leak_y", "leak_size_lps"]
+
+
+def latin_hypercube(n: int, dims: int, rng: np.random.Generator) -> np.ndarray:
+    """n points in [0, 1)^dims with exactly one point in each of the n equal strata of every axis"""
+    strata = np.stack([rng.permutation(n) for _ in range(dims)], axis=1)
+    return (strata + rng.random((n, dims))) / n
+
+
+def allocate(total: int, weights: Sequence[float]) -> np.ndarray:
+    """Split total into non-negative integers proportional to weights (largest remainder)"""
+    weights = np.asarray(weights, dtype=np.float64)
+    share = total * weights / weights.sum()
+    counts = np.floor(share).astype(int)
+    counts[np.argsort(counts - share)[:total - counts.sum()]] += 1
+    return counts
+
+
+def topology_clusters(wn: wntr.network.WaterNetworkModel, num_clusters: int,
+                      nodes: Optional[Sequence[str]] = None) -> List[List[str]]:
+    """
+    Partition nodes (default: every junction) into num_clusters groups that are close
+    along the pipes: seeds are picked by farthest-point sampling of the pipe-length
+    distance and every node joins its nearest seed. Each cluster is ordered by distance
+    from its seed, so evenly spaced positions in the list cover it from the centre out.
+    """
+    nodes = list(nodes) if nodes is not None else list(wn.junction_name_list)
+    index = {name: i for i, name in enumerate(wn.node_name_list)}
+    rows, cols, lengths = [], [], []
+    for _, link in wn.links():
+        rows.append(index[link.start_node_name])
+        cols.append(index[link.end_node_name])
+        lengths.append(max(float(getattr(link, "length", 0.0)), 1e-3))
+    graph = coo_matrix((lengths, (rows, cols)), shape=(len(index), len(index))).tocsr()
+    candidates = np.array([index[n] for n in nodes])
+
+    # Farthest-point seeds: start from the node farthest from the first candidate
+    nearest = dijkstra(graph, directed=False, indices=candidates[0])[candidates]
+    seeds: List[int] = []
+    for _ in range(min(num_clusters, len(nodes))):
+        seed = int(candidates[np.argmax(nearest)])
+        seeds.append(seed)
+        from_seed = dijkstra(graph, directed=False, indices=seed)[candidates]
+        nearest = from_seed if len(seeds) == 1 else np.minimum(nearest, from_seed)
+
+    distance, _, sources = dijkstra(graph, directed=False, indices=seeds, min_only=True,
+                                    return_predecessors=True)
+    clusters: Dict[int, List[Tuple[float, str]]] = {seed: [] for seed in seeds}
+    for name, i in zip(nodes, candidates):
+        clusters[int(sources[i]) if sources[i] >= 0 else seeds[0]].append((distance[i], name))
+    return [[name for _, name in sorted(members)] for members in clusters.values() if members]
+
+
+class ScenarioSampler:
+    """
+    Space-filling scenario plans over the topology clusters of one network
+
+    Every plan draws, per cluster, a Latin hypercube over (position in the cluster,
+    emitter choice, start hour), so each cluster's nodes, the emitter choices and the
+    start hours are all covered evenly even with few scenarios per cluster.
+    """
+
+    def __init__(self, inp_path: Union[str, Path], num_clusters: int = 40, leak_nodes: Optional[Sequence[str]] = None,
+                 emitter_choices: Sequence[float] = EMITTER_CHOICES, start_hours: Tuple[int, int] = (0, 19),
+                 seed: int = 42):
+        self.inp_path = str(inp_path)
+        self.emitter_choices = list(emitter_choices)
+        self.start_hours = start_hours
+        self.rng = np.random.default_rng(seed)
+        wn = wntr.network.WaterNetworkModel(self.inp_path)
+        self.clusters = topology_clusters(wn, num_clusters, leak_nodes)
+        self.cluster_of = {name: c for c, members in enumerate(self.clusters) for name in members}
+
+    def plan(self, counts: Sequence[int]) -> List[Scenario]:
+        """counts[c] scenarios in cluster c"""
+        lo, hi = self.start_hours
+        scenarios: List[Scenario] = []
+        for members, n in zip(self.clusters, counts):
+            if n <= 0:
+                continue
+            u = latin_hypercube(int(n), 3, self.rng)
+            for a, b, c in u:
+                scenarios.append((members[int(a * len(members))],
+                                  float(self.emitter_choices[int(b * len(self.emitter_choices))]),
+                                  lo + int(c * (hi - lo + 1))))
+        return scenarios
+
+    def initial(self, num_scenarios: int) -> List[Scenario]:
+        """Scenarios spread over the clusters in proportion to their size"""
+        return self.plan(allocate(num_scenarios, [len(members) for members in self.clusters]))
+
+    def refine(self, num_scenarios: int, errors: pd.DataFrame) -> List[Scenario]:
+        """
+        Scenarios spread over the clusters in proportion to the mean localization error
+        of their validation samples (errors: leak_node and error_m columns); clusters
+        without validation samples get the largest cluster error so they are explored too
+        """
+        cluster = errors["leak_node"].map(self.cluster_of)
+        mean_error = errors.groupby(cluster)["error_m"].mean()
+        fill = float(mean_error.max()) if len(mean_error) else 1.0
+        weights = [len(members) * float(mean_error.get(c, fill)) for c, members in enumerate(self.clusters)]
+        return self.plan(allocate(num_scenarios, weights))
+
+
+def localization_errors(csv_file: Union[str, Path], input_columns: List[str], hidden_dims: List[int],
+                        epochs: int = 60, batch_size: int = 32, lr: float = 0.001, val_fraction: float = 0.2,
+                        seed: int = 42) -> pd.DataFrame:
+    """
+    Train LeakLocalizationNN on the leak rows of csv_file and return the distance between
+    predicted and true leak coordinates for every validation row (leak_node, error_m)
+    """
+    from .Localization import LeakLocalizationNN
+    from .utils.Dataset import LeakDataset
+    from .utils.Seed import set_seed
+    from .utils.TrainValidate import train_model
+
+    set_seed(seed)
+    dataset = LeakDataset(str(csv_file), input_columns, OUTPUT_COLUMNS)
+    leak_nodes = pd.read_csv(csv_file, usecols=["leak_node"])["leak_node"].to_numpy()
+    order = torch.randperm(len(dataset), generator=torch.Generator().manual_seed(seed)).numpy()
+    val_size = max(1, int(round(val_fraction * len(dataset))))
+    val_idx, train_idx = order[:val_size], order[val_size:]
+
+    model = LeakLocalizationNN(input_dim=len(input_columns), hidden_dims=hidden_dims, output_dim=len(OUTPUT_COLUMNS))
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    criterion = torch.nn.MSELoss()
+    loader = DataLoader(Subset(dataset, train_idx), batch_size=batch_size, shuffle=True)
+    for _ in range(epochs):
+        train_model(model, loader, optimizer, criterion, torch.device("cpu"))
+
+    model.eval()
+    with torch.no_grad():
+        inputs, targets = dataset[val_idx]
+        outputs = model(inputs)
+    params = dataset.get_normalization_params()
+    scale = torch.tensor([params["output_stds"][c] for c in OUTPUT_COLUMNS[:2]])
+    error = torch.linalg.norm((outputs[:, :2] - targets[:, :2]) * scale, dim=1).numpy()
+    return pd.DataFrame({"leak_node": leak_nodes[val_idx], "error_m": error})
+
+
+def active_learning(
+    sampler: ScenarioSampler,
+    obs_nodes: List[str],
+    csv_file: Union[str, Path],
+    initial_scenarios: int,
+    rounds: int,
+    scenarios_per_round: int,
+    hidden_dims: List[int],
+    epochs: int = 60,
+    sample_minutes: int = 60,
+    leak_duration_hr: float = 4.0,
+) -> List[Dict]:
+    """
+    Build a dataset in rounds: an initial space-filling plan, then per round train the
+    model on everything simulated so far and simulate scenarios_per_round more where
+    its validation error is highest. The dataset is (re)written to csv_file after every
+    round; returns the mean validation error (m) and dataset size of each round.
+
+    Parameters:
+    - sampler (ScenarioSampler): Clusters, emitter choices and start hours to plan over.
+    - obs_nodes (list of str): Observation nodes, the model inputs are their hourly means.
+    - csv_file (str or Path): Output dataset (leak rows only).
+    - initial_scenarios (int): Scenarios of the initial plan.
+    - rounds (int), scenarios_per_round (int): Active-learning rounds and their size.
+    - hidden_dims (list of int), epochs (int): Model trained in each round.
+    - sample_minutes (int), leak_duration_hr (float): Passed to build_dataset.
+    """
+    input_columns = [f"{n}_Hour{h}" for n in obs_nodes for h in range(24)]
+
+    def simulate(scenarios: List[Scenario]) -> pd.DataFrame:
+        return build_dataset(sampler.inp_path, obs_nodes, [], sample_minutes=sample_minutes,
+                             leak_duration_hr=leak_duration_hr, emitter_exponent=1,
+                             scenarios=scenarios, include_baseline=False)
+
+    data = simulate(sampler.initial(initial_scenarios))
+    history = []
+    for round_ in range(rounds + 1):
+        data["scenario_id"] = np.arange(1, len(data) + 1)
+        data.to_csv(csv_file, index=False)
+        errors = localization_errors(csv_file, input_columns, hidden_dims, epochs=epochs)
+        history.append({"round": round_, "scenarios": len(data), "val_error_m": float(errors["error_m"].mean())})
+        print(f"[SAMPLER] round {round_}: {len(data)} scenarios, validation error {history[-1]['val_error_m']:.1f} m")
+        if round_ == rounds:
+            break
+        data = pd.concat([data, simulate(sampler.refine(scenarios_per_round, errors))], ignore_index=True)
+    return history
+
+
+if __name__ == "__main__":
+    from .generate_data import OBS_NODES
+    from .run_model import MODEL_HIDDEN_DIMS
+
+    inp_file = Path(__file__).parent / "main_network.inp"
+    csv_file = Path(tempfile.gettempdir()) / "sampled_dataset.csv"
+
+    # The exhaustive grid is every junction x 6 emitters (~5.6k runs); this plans 2k
+    sampler = ScenarioSampler(inp_file, num_clusters=40, emitter_choices=EMITTER_CHOICES, seed=42)
+    history = active_learning(sampler, OBS_NODES, csv_file, initial_scenarios=800, rounds=4,
+                              scenarios_per_round=300, hidden_dims=MODEL_HIDDEN_DIMS, epochs=60)
+    print(history)
+    print(f"Wrote {csv_file}")
@@ -0,0 +1,316 @@
+"""
+Linearized Sensitivity Surrogate
+Predicts observed-node pressures for any leak scenario from a precomputed pressure
+sensitivity matrix instead of a full EPANET run
+
+For every junction j and hour t a few probe runs (emitters of increasing size held at
+j) give the secant response of the 21 OBS_NODES pressures, S[j, t] = dP_obs / dq_j,
+and of j's own pressure, s_jj, at each probe's leak flow. A leak of emitter coefficient
+C (exponent 1) then draws q = C p0_j / (1 - C s_jj(q)), solved by a few fixed-point
+passes with S and s_jj interpolated in q between the probes, and shifts the observed
+pressures by S[j, t](q) q.
+"""
+
+import os
+import time
+import uuid
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .generate_data import EPANET_OUT_DIR, DataGenerator, OBS_NODES
+
+_generator: Optional[DataGenerator] = None
+
+
+def _init_worker(inp_file: str, horizon_hours: int, build_id: str):
+    global _generator
+    _generator = DataGenerator(inp_file, step_m=60, duration_h=horizon_hours,
+                               run_name=f"surrogate_{build_id}_{os.getpid()}", keep_files=False)
+
+
+def _run(junction: Optional[str], emitter_cof: float, read_all: bool = False):
+    # One hourly EPANET run with an emitter held at junction for the whole horizon;
+    # returns pressures (steps x observed [+ all junctions]) and the junction's pressure
+    gd = _generator
+    en = gd.epnet
+    pressure = gd._EN("PRESSURE")
+    obs_idx = [en.ENgetnodeindex(n) for n in OBS_NODES]
+    all_idx = [en.ENgetnodeindex(n) for n in gd.wn.junction_name_list] if read_all else []
+    leak_idx = en.ENgetnodeindex(junction) if junction is not None else None
+
+    horizon_s = gd.TOTAL_HOURS * 3600
+    en.ENsettimeparam(gd._EN("DURATION"), horizon_s)
+    en.ENsettimeparam(gd._EN("HYDSTEP"), 3600)
+    en.ENsettimeparam(gd._EN("REPORTSTEP"), 3600)
+    if leak_idx is not None:
+        en.ENsetnodevalue(leak_idx, gd._EN("EMITTER"), float(emitter_cof))
+
+    obs = np.full((gd.TOTAL_HOURS + 1, len(OBS_NODES)), np.nan)
+    everything = np.full((gd.TOTAL_HOURS + 1, len(all_idx)), np.nan)
+    own = np.full(gd.TOTAL_HOURS + 1, np.nan)
+    try:
+        en.ENopenH()
+        en.ENinitH(0)
+        while True:
+            t = en.ENrunH()
+            if t % 3600 == 0 and t <= horizon_s:
+                k = t // 3600
+                obs[k] = [en.ENgetnodevalue(i, pressure) for i in obs_idx]
+                if read_all:
+                    everything[k] = [en.ENgetnodevalue(i, pressure) for i in all_idx]
+                if leak_idx is not None:
+                    own[k] = en.ENgetnodevalue(leak_idx, pressure)
+            if en.ENnextH() <= 0:
+                break
+        en.ENcloseH()
+    finally:
+        if leak_idx is not None:
+            en.ENsetnodevalue(leak_idx, gd._EN("EMITTER"), 0.0)
+    return obs, everything, own
+
+
+def _probe(args):
+    j, junction, probe_emitters, base_obs, base_own = args
+    s_obs, s_own, flows = [], [], []
+    for emitter in probe_emitters:
+        obs, _, own = _run(junction, emitter)
+        # Secant sensitivities over the probe leak's flow q = C p (exponent 1)
+        q = emitter * np.clip(own, 0.0, None)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s_obs.append(np.nan_to_num((obs - base_obs) / q[:, None]))
+            s_own.append(np.nan_to_num((own - base_own) / q))
+        flows.append(np.nan_to_num(q))
+    return j, np.array(s_obs, dtype=np.float32), np.array(s_own, dtype=np.float32), np.array(flows, dtype=np.float32)
+
+
+class SensitivitySurrogate:
+    """
+    Hourly pressure sensitivities of the observed nodes to a leak at every junction
+
+    Arrays (t = hour 0..horizon, k = probe 0..K-1):
+    - base_obs (T, 21): no-leak observed pressures
+    - base_junction (T, J): no-leak pressure at every junction
+    - sens_obs (K, J, T, 21): secant dP_obs / dq_j in m per flow unit
+    - sens_self (K, J, T): secant dP_j / dq_j
+    - probe_flow (K, J, T): leak flow of each probe, increasing in k
+    """
+
+    def __init__(self, junctions, coordinates, base_obs, base_junction, sens_obs, sens_self,
+                 probe_flow, probe_emitters, flow_to_lps):
+        self.junctions = list(junctions)
+        self.junction_index = {n: i for i, n in enumerate(self.junctions)}
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+        self.base_obs = np.asarray(base_obs, dtype=np.float32)
+        self.base_junction = np.asarray(base_junction, dtype=np.float32)
+        self.sens_obs = np.asarray(sens_obs, dtype=np.float32)
+        self.sens_self = np.asarray(sens_self, dtype=np.float32)
+        self.probe_flow = np.asarray(probe_flow, dtype=np.float32)
+        self.probe_emitters = [float(c) for c in probe_emitters]
+        self.flow_to_lps = float(flow_to_lps)
+        self.horizon_hours = self.base_obs.shape[0] - 1
+
+    @classmethod
+    def build(cls, inp_file: Union[str, Path], horizon_hours: int = 48,
+              probe_emitters: Sequence[float] = (0.25, 1.0, 4.0), junctions: Optional[Sequence[str]] = None,
+              num_workers: Optional[int] = None) -> "SensitivitySurrogate":
+        """
+        Run one baseline and len(probe_emitters) probe simulations per junction, spread over num_workers
+        processes (each with its own EPANET project). horizon_hours must cover the latest
+        collection start plus the 24 h window the surrogate will be asked for.
+        """
+        global _generator
+        # Every EPANET file of this build is named surrogate_<build_id>_*, and deleted at the end
+        build_id = uuid.uuid4().hex[:8]
+        _init_worker(str(inp_file), horizon_hours, build_id)
+        if junctions is None:
+            junctions = _generator.wn.junction_name_list
+        junctions = list(junctions)
+        coordinates = [_generator.wn.get_node(n).coordinates for n in junctions]
+        flow_to_lps = _generator._flow_to_lps_factor(_generator._get_flow_unit())
+
+        base_obs, base_all, _ = _run(None, 0.0, read_all=True)
+        all_names = _generator.wn.junction_name_list
+        base_junction = base_all[:, [all_names.index(n) for n in junctions]]
+        _generator.close()
+        _generator = None  # workers open their own projects
+
+        probe_emitters = sorted(float(c) for c in probe_emitters)
+        tasks = [(j, n, probe_emitters, base_obs, base_junction[:, j]) for j, n in enumerate(junctions)]
+        shape = (len(probe_emitters), len(junctions), horizon_hours + 1)
+        sens_obs = np.zeros(shape + (len(OBS_NODES),), dtype=np.float32)
+        sens_self = np.zeros(shape, dtype=np.float32)
+        probe_flow = np.zeros(shape, dtype=np.float32)
+
+        num_workers = num_workers or os.cpu_count() or 1
+        started = time.perf_counter()
+        try:
+            with Pool(num_workers, initializer=_init_worker, initargs=(str(inp_file), horizon_hours, build_id)) as pool:
+                for done, (j, s_obs, s_own, flows) in enumerate(pool.imap_unordered(_probe, tasks, chunksize=8), start=1):
+                    sens_obs[:, j] = s_obs
+                    sens_self[:, j] = s_own
+                    probe_flow[:, j] = flows
+                    if done % 100 == 0 or done == len(tasks):
+                        print(f"[SURROGATE] {done}/{len(tasks)} junctions probed, {done / (time.perf_counter() - started):.1f}/s")
+        finally:
+            # Pool workers exit without closing their generators
+            for path in EPANET_OUT_DIR.glob(f"surrogate_{build_id}_*"):
+                path.unlink(missing_ok=True)
+
+        return cls(junctions, coordinates, base_obs, base_junction, sens_obs, sens_self, probe_flow,
+                   probe_emitters, flow_to_lps)
+
+    def save(self, path: Union[str, Path]):
+        np.savez(
+            path,
+            junctions=np.array(self.junctions),
+            coordinates=self.coordinates,
+            base_obs=self.base_obs,
+            base_junction=self.base_junction,
+            sens_obs=self.sens_obs,
+            sens_self=self.sens_self,
+            probe_flow=self.probe_flow,
+            probe_emitters=np.array(self.probe_emitters),
+            flow_to_lps=self.flow_to_lps,
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "SensitivitySurrogate":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["junctions"].tolist(), data["coordinates"], data["base_obs"], data["base_junction"],
+                       data["sens_obs"], data["sens_self"], data["probe_flow"], data["probe_emitters"],
+                       float(data["flow_to_lps"]))
+
+    def _probe_weights(self, j: np.ndarray, q: np.ndarray) -> np.ndarray:
+        # Linear interpolation weights (N, T, K) over the probes at leak flow q (N, T),
+        # holding the nearest probe's secant outside the probed range
+        flows = np.moveaxis(self.probe_flow[:, j], 0, -1).astype(np.float64)
+        weights = np.zeros(flows.shape)
+        num_probes = flows.shape[-1]
+        if num_probes == 1:
+            weights[...] = 1.0
+            return weights
+        q = np.clip(q, flows[..., 0], flows[..., -1])
+        lower = np.clip((q[..., None] > flows).sum(axis=-1) - 1, 0, num_probes - 2)[..., None]
+        lo = np.take_along_axis(flows, lower, axis=-1)[..., 0]
+        hi = np.take_along_axis(flows, lower + 1, axis=-1)[..., 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = np.where(hi > lo, (q - lo) / (hi - lo), 0.0)
+        np.put_along_axis(weights, lower, (1.0 - frac)[..., None], axis=-1)
+        np.put_along_axis(weights, lower + 1, frac[..., None], axis=-1)
+        return weights
+
+    def predict(self, node_ids: Sequence[str], emitter_cofs, collection_start_hours, leak_start_mins,
+                leak_duration_hours, window_hours: int = 24) -> Dict[str, np.ndarray]:
+        """
+        Vectorized prediction for N scenarios (scalars broadcast)
+
+        Follows DataGenerator's step semantics: the emitter switches on after the first
+        hourly step at or after the leak start and off after the first step at or after its
+        end, so it affects the samples in between (the latter inclusive).
+
+        Returns:
+        - pressures (N, 21, window_hours): observed hourly pressures, node-major like HOURLY_NODES
+        - leak_size_lps (N,), leak_node_pressure_head (N,): as in DataGenerator.generate_data
+        """
+        j = np.array([self.junction_index[n] for n in node_ids])
+        n = len(j)
+        C = np.broadcast_to(np.asarray(emitter_cofs, dtype=np.float64), (n,))
+        start_h = np.broadcast_to(np.asarray(collection_start_hours, dtype=np.int64), (n,))
+        if (start_h + window_hours > self.horizon_hours).any() or (start_h < 0).any():
+            raise ValueError(f"Collection windows must end within the {self.horizon_hours} h surrogate horizon")
+        leak_start_s = start_h * 3600 + np.broadcast_to(np.asarray(leak_start_mins, dtype=np.float64), (n,)) * 60.0
+        leak_end_s = leak_start_s + np.broadcast_to(np.asarray(leak_duration_hours, dtype=np.float64), (n,)) * 3600.0
+
+        # Every hourly step of the simulated horizon, so leak-size means can span it
+        t = np.arange(self.horizon_hours + 1)
+        on_after = np.ceil(leak_start_s / 3600.0)[:, None]
+        off_at = np.ceil(leak_end_s / 3600.0)[:, None]
+        active = (t[None, :] > on_after) & (t[None, :] <= off_at)  # (N, T)
+
+        p0 = np.clip(self.base_junction[:, j].T.astype(np.float64), 0.0, None)  # (N, T)
+        sens_self = np.moveaxis(self.sens_self[:, j], 0, -1).astype(np.float64)  # (N, T, K)
+        # Fixed point of q = C p0 / (1 - C s_jj(q)), starting from the middle probe's secant
+        q = C[:, None] * p0
+        weights = np.zeros(sens_self.shape)
+        weights[..., sens_self.shape[-1] // 2] = 1.0
+        for _ in range(4):
+            s_self = (weights * sens_self).sum(axis=-1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                q = np.where(active, C[:, None] * p0 / (1.0 - C[:, None] * s_self), 0.0)
+            q = np.clip(np.nan_to_num(q), 0.0, None)
+            weights = self._probe_weights(j, q)
+        s_self = (weights * sens_self).sum(axis=-1)
+        p_leak = np.clip(p0 + s_self * q, 0.0, None)
+
+        window = start_h[:, None] + np.arange(window_hours)[None, :]  # (N, W)
+        rows = np.arange(n)[:, None]
+        sens_obs = np.einsum("nwk,knwo->nwo", weights[rows, window],
+                             self.sens_obs[:, j[:, None], window])  # (N, W, 21)
+        pressures = self.base_obs[window] + sens_obs * q[rows, window][..., None]
+
+        # DataGenerator stops recording at the end of the collection window
+        in_leak = ((t[None, :] * 3600 >= leak_start_s[:, None]) & (t[None, :] * 3600 < leak_end_s[:, None])
+                   & (t[None, :] <= (start_h + window_hours)[:, None]))
+        counts = in_leak.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            head = np.where(counts > 0, (p_leak * in_leak).sum(axis=1) / counts, 0.0)
+        return {
+            "pressures": np.ascontiguousarray(pressures.transpose(0, 2, 1), dtype=np.float32),
+            "leak_size_lps": C * head * self.flow_to_lps,
+            "leak_node_pressure_head": head,
+        }
+
+    def validate(self, inp_file: Union[str, Path], num_scenarios: int = 50, seed: int = 42) -> Dict:
+        """
+        Compare against full EPANET runs of random scenarios (DataGenerator, hourly)
+        Returns error statistics of the observed pressures and the leak size
+        """
+        rng = np.random.default_rng(seed)
+        nodes = list(rng.choice(self.junctions, num_scenarios))
+        C = rng.uniform(0.1, 5.0, num_scenarios).round(2)
+        starts = rng.integers(0, self.horizon_hours - 24 + 1, num_scenarios)
+        leak_mins = rng.integers(1, 24, num_scenarios) * 60
+        durations = rng.integers(1, 13, num_scenarios)
+
+        predicted = self.predict(nodes, C, starts, leak_mins, durations)
+        gd = DataGenerator(str(inp_file), step_m=60, duration_h=24, run_name="surrogate_validate",
+                           abort_on_warnings=False, keep_files=False)
+        errors, size_errors = [], []
+        try:
+            for i in range(num_scenarios):
+                row = gd.generate_data(nodes[i], float(C[i]), int(starts[i]), int(leak_mins[i]), int(durations[i]),
+                                       write_csv=False, close=False)
+                actual = np.array([[row[f"{nid}_Hour{h}"] for h in range(24)] for nid in OBS_NODES], dtype=np.float64)
+                errors.append(predicted["pressures"][i] - actual)
+                size_errors.append(predicted["leak_size_lps"][i] - row["leak_size_lps"])
+        finally:
+            gd.close()
+        errors = np.abs(np.array(errors))
+        size_errors = np.abs(np.array(size_errors))
+        return {
+            "scenarios": num_scenarios,
+            "pressure_mae_m": float(errors.mean()),
+            "pressure_p99_abs_m": float(np.quantile(errors, 0.99)),
+            "pressure_max_abs_m": float(errors.max()),
+            "leak_size_mae_lps": float(size_errors.mean()),
+            "leak_size_max_abs_lps": float(size_errors.max()),
+        }
+
+
+if __name__ == "__main__":
+    inp_file = Path(__file__).parent / "main_network.inp"
+    surrogate_path = Path(__file__).parent / "model" / "sensitivity_surrogate.npz"
+
+    surrogate = SensitivitySurrogate.build(inp_file, horizon_hours=48)
+    surrogate.save(surrogate_path)
+    print(f"Saved {surrogate_path}")
+
+    print("Validation vs EPANET:", surrogate.validate(inp_file, num_scenarios=50))
+
+    nodes = list(np.random.default_rng(0).choice(surrogate.junctions, 10000))
+    start = time.perf_counter()
+    surrogate.predict(nodes, 1.0, 0, 360, 4)
+    print(f"{len(nodes) / (time.perf_counter() - start):.0f} scenarios/sec")
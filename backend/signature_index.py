@@ -0,0 +1,117 @@
+"""
+Nearest-Neighbour Leak Localization
+Matches an observed hourly pressure window against the precomputed signature table
+and ranks candidate leak junctions by distance, as a second engine beside the MLP
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .signature_table import SignatureTable
+
+
+class SignatureIndex:
+    """
+    Brute-force k-NN over the pressure-deviation vectors (signature - no-leak baseline)
+    of one collection start hour of a SignatureTable
+
+    The deviations are held in RAM as a contiguous float32 (scenarios x 21*24) matrix
+    with precomputed squared norms, so a query is one matrix-vector product. Scenarios
+    are node-major in the table, which lets the per-node best match be a reshape + min.
+    """
+
+    def __init__(self, table: SignatureTable, collection_start_hour: Optional[int] = None):
+        self.table = table
+        collection_axis = table.axes[4]
+        if collection_start_hour is None:
+            collection_start_hour = collection_axis[0]
+        if int(collection_start_hour) not in collection_axis:
+            raise ValueError(f"Collection start hour {collection_start_hour} is not in the table ({collection_axis})")
+        c = collection_axis.index(int(collection_start_hour))
+        self.collection_start_hour = int(collection_start_hour)
+
+        self.nodes = table.axes[0]
+        self.coordinates = table.index["coordinates"]
+        self.columns = [f"{nid}_Hour{h}" for nid in table.obs_nodes for h in range(table.duration_h)]
+
+        # Scenario rows of this collection start, in (node, emitter, start, duration) order
+        rows = np.arange(len(table)).reshape(table.shape)[..., c].reshape(-1)
+        self.rows = rows
+        self.per_node = len(rows) // len(self.nodes)
+
+        self.baseline = self._hourly(table.baseline[c][None])[0]
+        deviations = self._hourly(table.signatures[rows]) - self.baseline
+        # Failed scenarios are NaN; push them out of reach
+        invalid = ~np.isfinite(deviations).all(axis=1)
+        deviations[invalid] = 0.0
+        self.deviations = np.ascontiguousarray(deviations, dtype=np.float32)
+        self.norms = np.einsum("ij,ij->i", self.deviations, self.deviations)
+        self.norms[invalid] = np.inf
+
+    def _hourly(self, signatures: np.ndarray) -> np.ndarray:
+        # (n, nodes, steps) -> (n, nodes*hours) hourly means, node-major like HOURLY_NODES
+        signatures = np.asarray(signatures, dtype=np.float32)
+        per_hour = 60 // self.table.step_m
+        n, nodes, steps = signatures.shape
+        return signatures.reshape(n, nodes, steps // per_hour, per_hour).mean(axis=3).reshape(n, -1)
+
+    def query(self, pressures: np.ndarray, k: int = 5) -> List[List[Dict]]:
+        """
+        Rank the k most likely leak junctions for each observed window
+        pressures is (Q, 504) or (504,) raw hourly pressures in self.columns order
+        Returns, per window, candidates sorted by distance (metres of pressure deviation);
+        junctions without a single valid scenario (all failed or quarantined) are never ranked
+        """
+        pressures = np.asarray(pressures, dtype=np.float32)
+        if pressures.ndim == 1:
+            pressures = pressures[None, :]
+        if pressures.ndim != 2 or pressures.shape[1] != self.deviations.shape[1]:
+            raise ValueError(f"Expected a Q x {self.deviations.shape[1]} pressure matrix, got shape {pressures.shape}")
+        if not np.isfinite(pressures).all():
+            raise ValueError("Pressure matrix contains non-finite values")
+
+        queries = pressures - self.baseline
+        # ||q - x||^2 = ||q||^2 - 2 q.x + ||x||^2, one GEMM for all queries
+        d2 = self.norms[None, :] - 2.0 * (queries @ self.deviations.T)
+        d2 += np.einsum("ij,ij->i", queries, queries)[:, None]
+
+        per_node = d2.reshape(len(queries), len(self.nodes), self.per_node)
+        best_scenario = per_node.argmin(axis=2)
+        best_d2 = np.take_along_axis(per_node, best_scenario[..., None], axis=2)[..., 0]
+
+        results = []
+        for q in range(len(queries)):
+            valid = np.flatnonzero(np.isfinite(best_d2[q]))
+            k_q = min(max(1, int(k)), len(valid))
+            if k_q == 0:
+                results.append([])
+                continue
+            top = valid[np.argpartition(best_d2[q, valid], k_q - 1)[:k_q]]
+            top = top[np.argsort(best_d2[q, top])]
+            candidates = []
+            for n in top:
+                scenario = self.table.scenario(int(self.rows[n * self.per_node + best_scenario[q, n]]))
+                candidates.append({
+                    "node_id": self.nodes[n],
+                    "x": self.coordinates[n][0],
+                    "y": self.coordinates[n][1],
+                    "distance": float(np.sqrt(max(best_d2[q, n], 0.0))),
+                    "emitter_cof": scenario["emitter_cof"],
+                    "leak_start_min": scenario["leak_start_min"],
+                    "leak_duration_hours": scenario["leak_duration_hours"],
+                })
+            results.append(candidates)
+        return results
+
+    def query_frame(self, data, k: int = 5) -> List[List[Dict]]:
+        """
+        Same as query for a DataFrame with the hourly columns (e.g. generated_data.csv); rows
+        carrying collection_start_hr must have been collected from this index's start hour
+        """
+        if "collection_start_hr" in data.columns:
+            starts = set(np.round(data["collection_start_hr"].to_numpy(dtype=np.float64)).astype(int).tolist())
+            if starts != {self.collection_start_hour}:
+                raise ValueError(f"Rows collected from hour(s) {sorted(starts)} queried against the "
+                                 f"hour-{self.collection_start_hour} baseline")
+        return self.query(data[self.columns].to_numpy(dtype=np.float32), k=k)
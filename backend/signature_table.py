@@ -0,0 +1,366 @@
+"""
+Leak Signature Lookup Table
+Offline precompute of every (node, emitter, leak start, leak duration, collection start)
+scenario on a discrete grid, stored as memory-mapped arrays so /api/generate_data
+can answer on-grid requests without running EPANET
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+import uuid
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .generate_data import EPANET_OUT_DIR, DataGenerator, OBS_NODES, RESOLUTION_MAP
+from .periodic_baseline import PeriodicBaseline
+from .scenario_quarantine import ScenarioQuarantine, SimulationDiverged
+
+INDEX_FILE = "index.json"
+GRID_AXES = ("nodes", "emitter_cofs", "leak_start_mins", "leak_duration_hours", "collection_start_hours")
+
+
+def network_version(inp_file: Union[str, Path]) -> str:
+    """SHA-256 of the INP file the table was built from"""
+    return hashlib.sha256(Path(inp_file).read_bytes()).hexdigest()
+
+
+_generator: Optional[DataGenerator] = None
+_generator_args: Tuple = ()
+
+
+def _init_worker(inp_file: str, step_m: int, duration_h: int, build_id: str):
+    global _generator_args
+    _generator_args = (inp_file, step_m, duration_h, build_id)
+
+
+def _get_generator() -> DataGenerator:
+    # One persistent EPANET project per worker, reopened after a failed run
+    global _generator
+    if _generator is None:
+        inp_file, step_m, duration_h, build_id = _generator_args
+        _generator = DataGenerator(inp_file, step_m=step_m, duration_h=duration_h,
+                                   run_name=f"signatures_{build_id}_{os.getpid()}", abort_on_warnings=True,
+                                   keep_files=False)
+    return _generator
+
+
+def _simulate(task: Tuple[int, str, float, int, float, int]):
+    global _generator
+    idx, node_id, emitter_cof, collection_start_hour, leak_start_min, leak_duration_hours = task
+    gd = _get_generator()
+    try:
+        row = gd.generate_data(node_id, emitter_cof, collection_start_hour, leak_start_min, leak_duration_hours,
+                               write_csv=False, close=False)
+    except SimulationDiverged as e:
+        # The generator closed its hydraulics and stays usable; the error goes back as a
+        # dict since it does not pickle across the pool
+        return idx, e.to_dict()
+    except Exception as e:
+        print(f"[SIGNATURE] scenario {idx} ({node_id}, C={emitter_cof}) failed: {e}")
+        try:
+            gd.close()
+        except Exception:
+            pass
+        _generator = None
+        return idx, None
+
+    label = gd.get_resolution_label(gd.STEP_S // 60)
+    pressures = np.array(
+        [[row[f"{nid}_{label}{k}"] if row[f"{nid}_{label}{k}"] != "" else np.nan for k in range(gd.total_steps)]
+         for nid in OBS_NODES],
+        dtype=np.float32,
+    )
+    times = np.array(list(row["leak_pressure_time"].keys()), dtype=np.int32)
+    series = np.array([list(row["leak_pressure_time"].values()), list(row["leak_demand_time"].values())],
+                      dtype=np.float32)
+    stats = np.array([row["leak_size_lps"], row["leak_node_pressure_head"]], dtype=np.float64)
+    return idx, (pressures, times, series, stats)
+
+
+def build_signature_table(
+    inp_file: Union[str, Path],
+    table_dir: Union[str, Path],
+    emitter_cofs: Sequence[float],
+    leak_start_mins: Sequence[int],
+    leak_duration_hours: Sequence[int] = (4,),
+    collection_start_hours: Sequence[int] = (0,),
+    nodes: Optional[Iterable[str]] = None,
+    step_m: int = 60,
+    duration_h: int = 24,
+    num_workers: int = 1,
+    quarantine: Optional[ScenarioQuarantine] = None,
+):
+    """
+    Simulate every scenario of the grid once and write the table to table_dir.
+
+    Parameters:
+    - inp_file (str or Path): Network the scenarios are simulated on.
+    - table_dir (str or Path): Output directory (created; existing table files are overwritten).
+    - emitter_cofs, leak_start_mins, leak_duration_hours, collection_start_hours (sequences): Grid axes.
+    - nodes (iterable of str): Leak nodes; defaults to every junction of the network.
+    - step_m (int): Sampling step in minutes, duration_h (int): collection window in hours.
+    - num_workers (int): Simulation processes, each with its own EPANET project.
+    - quarantine (ScenarioQuarantine): Diverged scenarios are recorded here and quarantined
+      scenarios are skipped (stored as failed); defaults to the shared quarantine.json.
+    """
+    global _generator
+    table_dir = Path(table_dir)
+    table_dir.mkdir(parents=True, exist_ok=True)
+    index_path = table_dir / INDEX_FILE
+    if index_path.exists():
+        index_path.unlink()  # the table is only valid once a new index is written
+
+    # Every EPANET file of this build is named signatures_<build_id>_*, and deleted at the end
+    build_id = uuid.uuid4().hex[:8]
+    probe = DataGenerator(str(inp_file), step_m=step_m, duration_h=duration_h, run_name=f"signatures_{build_id}_probe",
+                          keep_files=False)
+    if nodes is None:
+        nodes = probe.wn.junction_name_list
+    nodes = list(nodes)
+    coordinates = [list(probe.wn.get_node(n).coordinates) for n in nodes]
+    total_steps = probe.total_steps
+
+    # Baseline (no leak) signature per collection start, tiled from one periodic cycle
+    # when the network allows it, else a zero emitter at any node
+    baseline = np.lib.format.open_memmap(table_dir / "baseline.npy", mode="w+", dtype=np.float32,
+                                         shape=(len(collection_start_hours), len(OBS_NODES), total_steps))
+    try:
+        periodic = PeriodicBaseline(inp_file, step_m=step_m, run_name=f"signatures_{build_id}_baseline", keep_files=False)
+    except ValueError:
+        periodic = None
+    _init_worker(str(inp_file), step_m, duration_h, build_id)
+    for c, start_hour in enumerate(collection_start_hours):
+        if periodic is not None:
+            baseline[c] = periodic.series(int(start_hour) * 3600, total_steps).T
+        else:
+            baseline[c] = _simulate((-1, nodes[0], 0.0, start_hour, 0, 0))[1][0]
+    # Leak-node series cover every hydraulic step up to the latest collection end
+    series_len = (max(collection_start_hours) + duration_h) * 3600 // (step_m * 60) + 1
+    probe.close()
+    # Don't let forked workers inherit an open EPANET project
+    if _generator is not None:
+        _generator.close()
+        _generator = None
+
+    axes = [nodes, list(map(float, emitter_cofs)), list(map(int, leak_start_mins)),
+            list(map(int, leak_duration_hours)), list(map(int, collection_start_hours))]
+    shape = tuple(len(axis) for axis in axes)
+    n_scenarios = int(np.prod(shape))
+
+    signatures = np.lib.format.open_memmap(table_dir / "signatures.npy", mode="w+", dtype=np.float32,
+                                           shape=(n_scenarios, len(OBS_NODES), total_steps))
+    leak_series = np.lib.format.open_memmap(table_dir / "leak_series.npy", mode="w+", dtype=np.float32,
+                                            shape=(n_scenarios, 2, series_len))
+    leak_times = np.lib.format.open_memmap(table_dir / "leak_times.npy", mode="w+", dtype=np.int32,
+                                           shape=(n_scenarios, series_len))
+    leak_stats = np.lib.format.open_memmap(table_dir / "leak_stats.npy", mode="w+", dtype=np.float64,
+                                           shape=(n_scenarios, 2))
+    signatures[:] = np.nan
+    leak_series[:] = np.nan
+    leak_times[:] = -1
+    leak_stats[:] = np.nan
+
+    if quarantine is None:
+        quarantine = ScenarioQuarantine(inp_file)
+    failed = []
+
+    def tasks():
+        for idx in range(n_scenarios):
+            n, e, s, d, c = np.unravel_index(idx, shape)
+            # Same absolute leak start and duration as DataGenerator.generate_data
+            if quarantine.contains(nodes[n], axes[1][e], axes[4][c] * 3600 + axes[2][s] * 60, axes[3][d] * 3600):
+                failed.append(idx)
+                continue
+            yield idx, nodes[n], axes[1][e], axes[4][c], axes[2][s], axes[3][d]
+
+    started = time.perf_counter()
+    if num_workers > 1:
+        pool = Pool(num_workers, initializer=_init_worker, initargs=(str(inp_file), step_m, duration_h, build_id))
+        results = pool.imap_unordered(_simulate, tasks(), chunksize=16)
+    else:
+        pool = None
+        results = map(_simulate, tasks())
+
+    try:
+        for done, (idx, result) in enumerate(results, start=1):
+            if isinstance(result, dict):
+                quarantine.add(SimulationDiverged(**result))
+                failed.append(idx)
+            elif result is None:
+                failed.append(idx)
+            else:
+                pressures, times, series, stats = result
+                m = min(series_len, len(times))
+                signatures[idx] = pressures
+                leak_times[idx, :m] = times[:m]
+                leak_series[idx, :, :m] = series[:, :m]
+                leak_stats[idx] = stats
+            if done % 1000 == 0 or done == n_scenarios:
+                elapsed = time.perf_counter() - started
+                print(f"[SIGNATURE] {done}/{n_scenarios} scenarios, {done / elapsed:.1f}/s")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if _generator is not None:
+            _generator.close()
+            _generator = None
+        # Pool workers exit without closing their generators
+        for path in EPANET_OUT_DIR.glob(f"signatures_{build_id}_*"):
+            path.unlink(missing_ok=True)
+
+    for array in (baseline, signatures, leak_series, leak_times, leak_stats):
+        array.flush()
+
+    index = {
+        "network_version": network_version(inp_file),
+        "step_m": step_m,
+        "duration_h": duration_h,
+        "obs_nodes": OBS_NODES,
+        "coordinates": coordinates,
+        "axes": dict(zip(GRID_AXES, axes)),
+        "failed": failed,
+    }
+    with open(index_path, "w") as f:
+        json.dump(index, f)
+    print(f"[SIGNATURE] wrote {n_scenarios} scenarios ({len(failed)} failed) to {table_dir}")
+
+
+class SignatureTable:
+    """
+    Read-only, memory-mapped view of a table written by build_signature_table
+    """
+
+    def __init__(self, table_dir: Union[str, Path]):
+        self.table_dir = Path(table_dir)
+        with open(self.table_dir / INDEX_FILE) as f:
+            self.index = json.load(f)
+
+        self.network_version = self.index["network_version"]
+        self.step_m = self.index["step_m"]
+        self.duration_h = self.index["duration_h"]
+        self.obs_nodes = self.index["obs_nodes"]
+        self.axes = [self.index["axes"][name] for name in GRID_AXES]
+        self.shape = tuple(len(axis) for axis in self.axes)
+        # value -> position along each axis
+        self._positions = [{value: i for i, value in enumerate(axis)} for axis in self.axes]
+        self._failed = set(self.index["failed"])
+
+        self.signatures = np.load(self.table_dir / "signatures.npy", mmap_mode="r")
+        self.baseline = np.load(self.table_dir / "baseline.npy", mmap_mode="r")
+        self.leak_series = np.load(self.table_dir / "leak_series.npy", mmap_mode="r")
+        self.leak_times = np.load(self.table_dir / "leak_times.npy", mmap_mode="r")
+        self.leak_stats = np.load(self.table_dir / "leak_stats.npy", mmap_mode="r")
+
+    @classmethod
+    def open(cls, table_dir: Union[str, Path], inp_file: Union[str, Path]) -> Optional["SignatureTable"]:
+        """The table in table_dir, or None if it is missing or was built for another network version"""
+        if not (Path(table_dir) / INDEX_FILE).exists():
+            return None
+        table = cls(table_dir)
+        if table.network_version != network_version(inp_file):
+            print(f"[SIGNATURE] {table_dir} was built for another network version, ignoring it")
+            return None
+        return table
+
+    def __len__(self) -> int:
+        return self.signatures.shape[0]
+
+    def lookup(self, node_id: str, emitter_cof: float, collection_start_hour: int,
+               leak_start_min: int, leak_duration_hours: int) -> Optional[int]:
+        """Scenario index for on-grid parameters, None if any parameter is off-grid"""
+        key = (node_id, float(emitter_cof), int(leak_start_min), int(leak_duration_hours), int(collection_start_hour))
+        if key[2] != leak_start_min or key[3] != leak_duration_hours or key[4] != collection_start_hour:
+            return None
+        try:
+            position = [positions[value] for positions, value in zip(self._positions, key)]
+        except KeyError:
+            return None
+        idx = int(np.ravel_multi_index(position, self.shape))
+        return None if idx in self._failed else idx
+
+    def scenario(self, idx: int) -> Dict:
+        """Grid parameters of scenario idx"""
+        n, e, s, d, c = np.unravel_index(idx, self.shape)
+        return {
+            "node_id": self.axes[0][n],
+            "emitter_cof": self.axes[1][e],
+            "leak_start_min": self.axes[2][s],
+            "leak_duration_hours": self.axes[3][d],
+            "collection_start_hour": self.axes[4][c],
+        }
+
+    def row(self, idx: int) -> Dict:
+        """Scenario idx as the row dict DataGenerator.generate_data returns"""
+        params = self.scenario(idx)
+        leak_x, leak_y = self.index["coordinates"][self._positions[0][params["node_id"]]]
+        size_lps, head = (float(v) for v in self.leak_stats[idx])
+        row = {
+            "leak": 1, "leak_node": params["node_id"],
+            "leak_x": leak_x, "leak_y": leak_y,
+            "leak_size_lps": size_lps,
+            "leak_node_pressure_head": head,
+            "emitter_coeff": params["emitter_cof"],
+            "leak_start_min": float(params["leak_start_min"]),
+            "leak_duration_hr": float(params["leak_duration_hours"]),
+            "collection_start_hr": float(params["collection_start_hour"]),
+            "collection_duration_hr": float(self.duration_h),
+        }
+
+        valid = self.leak_times[idx] >= 0
+        times = self.leak_times[idx][valid].tolist()
+        pressures, demands = (series[valid] for series in self.leak_series[idx])
+        row["leak_demand_time"] = dict(zip(times, demands.astype(np.float64).tolist()))
+        row["leak_pressure_time"] = dict(zip(times, pressures.astype(np.float64).tolist()))
+
+        label = RESOLUTION_MAP.get(self.step_m, f"Min{self.step_m}")
+        signature = self.signatures[idx].astype(np.float64)
+        for j, nid in enumerate(self.obs_nodes):
+            for k, val in enumerate(signature[j]):
+                row[f"{nid}_{label}{k}"] = float(val) if math.isfinite(val) else ""
+
+        # Sub-hourly tables also carry the hourly features the model expects
+        if self.step_m < 60:
+            per_hour = 60 // self.step_m
+            hourly = signature.reshape(len(self.obs_nodes), -1, per_hour).mean(axis=2)
+            for j, nid in enumerate(self.obs_nodes):
+                for h, val in enumerate(hourly[j]):
+                    row[f"{nid}_Hour{h}"] = float(val) if math.isfinite(val) else ""
+        return row
+
+    def summary(self) -> Dict:
+        """Grid axes (without the node list) and table size"""
+        return {
+            "scenarios": len(self),
+            "nodes": len(self.axes[0]),
+            "step_m": self.step_m,
+            "failed": len(self._failed),
+            **{name: axis for name, axis in zip(GRID_AXES[1:], self.axes[1:])},
+        }
+
+
+if __name__ == "__main__":
+    inp_file = Path(__file__).parent / "main_network.inp"
+    table_dir = Path(__file__).parent / "signatures"
+
+    # Values offered by the simulation form (emitter slider, start hour 1-24, duration slider)
+    emitter_cofs = [0.1, 0.25, 0.5, 1.0, 2.0, 5.0]
+    leak_start_mins = [60 * h for h in range(1, 25)]
+    leak_duration_hours = [4]
+    collection_start_hours = [0]
+
+    build_signature_table(
+        inp_file,
+        table_dir,
+        emitter_cofs=emitter_cofs,
+        leak_start_mins=leak_start_mins,
+        leak_duration_hours=leak_duration_hours,
+        collection_start_hours=collection_start_hours,
+        num_workers=os.cpu_count() or 1,
+    )
@@ -0,0 +1,123 @@
+"""
+Simulation Result Cache
+Bounded LRU cache for deterministic simulation results, keyed on the request
+parameters and the network version (SHA-256 of the INP file), with an optional
+on-disk tier that survives restarts
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+
+class SimulationCache:
+    """
+    In-memory LRU of at most max_entries results, backed by pickles in
+    disk_dir/<network version>/ when disk_dir is set
+
+    The network version is re-hashed only when the INP file's size or mtime changes;
+    a new version drops every entry computed for the old one, in memory and on disk.
+    """
+
+    def __init__(self, inp_file: Union[str, Path], max_entries: int = 256, disk_dir: Optional[Union[str, Path]] = None):
+        self.inp_file = Path(inp_file)
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stat: Optional[Tuple[int, int]] = None
+        self._version: Optional[str] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def network_version(self) -> str:
+        """SHA-256 of the INP file, refreshed when the file changes"""
+        st = os.stat(self.inp_file)
+        stat = (st.st_size, st.st_mtime_ns)
+        if stat != self._stat:
+            version = hashlib.sha256(self.inp_file.read_bytes()).hexdigest()
+            if version != self._version:
+                self._invalidate(keep=version)
+            self._stat, self._version = stat, version
+        return self._version
+
+    def _invalidate(self, keep: Optional[str] = None):
+        # Drop every entry that does not belong to network version `keep`
+        self._entries.clear()
+        if self.disk_dir is not None and self.disk_dir.exists():
+            for version_dir in self.disk_dir.iterdir():
+                if version_dir.is_dir() and version_dir.name != keep:
+                    shutil.rmtree(version_dir, ignore_errors=True)
+
+    def invalidate(self):
+        """Drop all cached results"""
+        with self._lock:
+            self._invalidate()
+            self._stat = self._version = None
+
+    def _disk_path(self, version: str, key: Tuple) -> Path:
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return self.disk_dir / version / f"{digest}.pkl"
+
+    def get(self, params: Tuple) -> Optional[Any]:
+        """Cached result for params under the current network version, or None"""
+        with self._lock:
+            version = self.network_version
+            key = (version,) + tuple(params)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            if self.disk_dir is not None:
+                path = self._disk_path(version, key)
+                if path.exists():
+                    with open(path, "rb") as f:
+                        value = pickle.load(f)
+                    self._store(key, value)
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def _store(self, key: Tuple, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, params: Tuple, value: Any):
+        """Cache the result for params under the current network version"""
+        with self._lock:
+            version = self.network_version
+            key = (version,) + tuple(params)
+            self._store(key, value)
+
+            if self.disk_dir is not None:
+                path = self._disk_path(version, key)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                with open(tmp, "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, path)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "network_version": self._version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
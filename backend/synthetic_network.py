@@ -0,0 +1,211 @@
+"""
+Synthetic Network Generator
+Writes valid EPANET INP files of a chosen size and topology (grid, tree or looped)
+with coordinates, elevations, demands and a daily demand pattern, for scale testing
+the parser, the API and the simulator
+
+    python -m backend.synthetic_network big.inp --junctions 100000 --topology looped
+"""
+
+import argparse
+import math
+from collections import deque
+from pathlib import Path
+from typing import Dict, Union
+
+import numpy as np
+
+TOPOLOGIES = ("grid", "tree", "looped")
+
+# Commercial pipe sizes (mm); each tree pipe gets the smallest keeping peak velocity <= 1 m/s
+DIAMETERS_MM = np.array([100, 150, 200, 250, 300, 400, 500, 600, 800, 1000, 1200])
+
+# Same shape as main_network.inp's pattern: low at night, morning and evening peaks
+DEMAND_PATTERN = [0.5, 0.45, 0.4, 0.4, 0.5, 0.8, 1.3, 1.6, 1.4, 1.1, 1.0, 1.0,
+                  1.05, 1.0, 0.95, 0.95, 1.05, 1.3, 1.5, 1.4, 1.1, 0.9, 0.7, 0.6]
+
+
+def _lattice_edges(cols: int, n: int) -> np.ndarray:
+    # Right and down neighbours of a row-major lattice truncated to n nodes
+    idx = np.arange(n)
+    right = idx[(idx % cols < cols - 1) & (idx + 1 < n)]
+    down = idx[idx + cols < n]
+    return np.concatenate([np.stack([right, right + 1], axis=1), np.stack([down, down + cols], axis=1)])
+
+
+def _bfs_tree(edges: np.ndarray, n: int, sources: np.ndarray, rng: np.random.Generator):
+    # Multi-source BFS spanning tree with random tie-breaking: like a branched distribution
+    # system, every junction is reached from its nearest feed by a shortest lattice path.
+    # Returns (parent node, parent edge index, visit order)
+    order = rng.permutation(len(edges))
+    ends = np.concatenate([edges[order], edges[order][:, ::-1]])
+    edge_ids = np.concatenate([order, order])
+    by_node = np.argsort(ends[:, 0], kind="stable")
+    neighbours, neighbour_edges = ends[by_node, 1], edge_ids[by_node]
+    offsets = np.searchsorted(ends[by_node, 0], np.arange(n + 1))
+
+    parent = np.full(n, -1)
+    parent_edge = np.full(n, -1)
+    visited = np.zeros(n, dtype=bool)
+    visited[sources] = True
+    queue = deque(int(s) for s in sources)
+    visit_order = []
+    while queue:
+        node = queue.popleft()
+        visit_order.append(node)
+        for k in range(offsets[node], offsets[node + 1]):
+            nb = neighbours[k]
+            if not visited[nb]:
+                visited[nb] = True
+                parent[nb] = node
+                parent_edge[nb] = neighbour_edges[k]
+                queue.append(nb)
+    return parent, parent_edge, np.array(visit_order)
+
+
+def write_synthetic_network(
+    path: Union[str, Path],
+    num_junctions: int,
+    topology: str = "looped",
+    loop_fraction: float = 0.2,
+    spacing_m: float = 50.0,
+    total_demand_lps: float = 200.0,
+    junctions_per_reservoir: int = 10000,
+    seed: int = 42,
+) -> Dict:
+    """
+    Write a synthetic network to path.
+
+    Junctions sit on a jittered square lattice. "tree" keeps a branched spanning tree
+    grown from the reservoirs, "looped" adds loop_fraction of the other lattice pipes
+    back to it and "grid" keeps every lattice pipe. Tree pipes are sized for the peak
+    demand they carry. Reservoirs are spread evenly, one per junctions_per_reservoir
+    junctions. Units are LPS with Hazen-Williams headloss like main_network.inp.
+
+    Parameters:
+    - path (str or Path): Output INP file.
+    - num_junctions (int): Number of junctions.
+    - topology (str): "grid", "tree" or "looped".
+    - loop_fraction (float): Share of the other lattice pipes "looped" adds to the tree.
+    - spacing_m (float): Lattice spacing (pipe length scale) in metres.
+    - total_demand_lps (float): Base demand summed over all junctions.
+    - junctions_per_reservoir (int): Junctions served per reservoir.
+    - seed (int): Random seed; the same arguments always write the same file.
+
+    Returns:
+    - dict: Counts of junctions, reservoirs and pipes written.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology {topology!r}, expected one of {TOPOLOGIES}")
+    if num_junctions < 2:
+        raise ValueError("A network needs at least 2 junctions")
+
+    rng = np.random.default_rng(seed)
+    n = int(num_junctions)
+    cols = int(math.ceil(math.sqrt(n)))
+
+    idx = np.arange(n)
+    x = (idx % cols) * spacing_m + rng.uniform(-0.2, 0.2, n) * spacing_m
+    y = (idx // cols) * spacing_m + rng.uniform(-0.2, 0.2, n) * spacing_m
+    # Gentle terrain: a tilted plane plus noise
+    elevation = 100.0 + 0.002 * (x + y) + rng.normal(0.0, 1.0, n)
+    demand = rng.uniform(0.5, 1.5, n)
+    demand *= total_demand_lps / demand.sum()
+
+    num_reservoirs = max(1, n // junctions_per_reservoir)
+    feeds = np.linspace(0, n - 1, num_reservoirs).astype(int)
+    head = elevation.max() + 60.0
+
+    edges = _lattice_edges(cols, n)
+    parent, parent_edge, visit_order = _bfs_tree(edges, n, feeds, rng)
+    in_tree = np.zeros(len(edges), dtype=bool)
+    in_tree[parent_edge[parent_edge >= 0]] = True
+
+    # Size tree pipes for the peak demand of the junctions downstream of them;
+    # loop-closing pipes get the smallest size
+    downstream = demand.copy()
+    for node in visit_order[::-1]:
+        if parent[node] >= 0:
+            downstream[parent[node]] += downstream[node]
+    peak_m3s = np.zeros(len(edges))
+    has_parent = parent_edge >= 0
+    peak_m3s[parent_edge[has_parent]] = downstream[has_parent] * max(DEMAND_PATTERN) / 1000.0
+    needed_mm = np.sqrt(4.0 * peak_m3s / math.pi) * 1000.0
+    diameters = DIAMETERS_MM[np.minimum(np.searchsorted(DIAMETERS_MM, needed_mm), len(DIAMETERS_MM) - 1)]
+    feed_diameters = DIAMETERS_MM[np.minimum(np.searchsorted(
+        DIAMETERS_MM, np.sqrt(4.0 * downstream[feeds] * max(DEMAND_PATTERN) / 1000.0 / math.pi) * 1000.0),
+        len(DIAMETERS_MM) - 1)]
+
+    if topology == "tree":
+        keep = in_tree
+    elif topology == "looped":
+        keep = in_tree | (rng.random(len(edges)) < loop_fraction)
+    else:
+        keep = np.ones(len(edges), dtype=bool)
+    edges, diameters = edges[keep], diameters[keep]
+    lengths = np.hypot(x[edges[:, 0]] - x[edges[:, 1]], y[edges[:, 0]] - y[edges[:, 1]])
+
+    out = []
+    out.append(f"[TITLE]\nSynthetic {topology} network, {n} junctions, seed {seed}\n")
+
+    out.append("[JUNCTIONS]\n;ID              \tElev        \tDemand      \tPattern         ")
+    out.extend(f" J{i}\t{elevation[i]:.2f}\t{demand[i]:.5f}\t1\t;" for i in range(n))
+
+    out.append("\n[RESERVOIRS]\n;ID              \tHead        \tPattern         ")
+    out.extend(f" R{r}\t{head:.2f}\t\t;" for r in range(num_reservoirs))
+
+    out.append("\n[TANKS]\n\n[PIPES]\n;ID              \tNode1           \tNode2           \tLength      \tDiameter    \tRoughness   \tMinorLoss   \tStatus")
+    out.extend(f" P{k}\tJ{a}\tJ{b}\t{lengths[k]:.3f}\t{diameters[k]}\t140\t0\tOPEN\t;"
+               for k, (a, b) in enumerate(edges))
+    out.extend(f" PR{r}\tR{r}\tJ{j}\t10\t{feed_diameters[r]}\t140\t0\tOPEN\t;" for r, j in enumerate(feeds))
+
+    out.append("\n[PATTERNS]\n;ID              \tMultipliers")
+    for start in range(0, len(DEMAND_PATTERN), 6):
+        out.append(" 1\t" + "\t".join(f"{m:g}" for m in DEMAND_PATTERN[start:start + 6]))
+
+    out.append("""
+[TIMES]
+ Duration           \t24:00
+ Hydraulic Timestep \t1:00
+ Pattern Timestep   \t1:00
+ Report Timestep    \t1:00
+ Report Start       \t0:00
+ Statistic          \tNONE
+
+[REPORT]
+ Status             \tNo
+ Summary            \tNo
+
+[OPTIONS]
+ Units              \tLPS
+ Headloss           \tH-W
+ Trials             \t40
+ Accuracy           \t0.001
+ Unbalanced         \tContinue 10
+ Pattern            \t1
+ Demand Multiplier  \t1
+ Emitter Exponent   \t1
+ Quality            \tNone mg/L
+
+[COORDINATES]
+;Node            \tX-Coord           \tY-Coord""")
+    out.extend(f"J{i}\t{x[i]:.3f}\t{y[i]:.3f}" for i in range(n))
+    out.extend(f"R{r}\t{x[j] - spacing_m / 2:.3f}\t{y[j] - spacing_m / 2:.3f}" for r, j in enumerate(feeds))
+    out.append("\n[END]\n")
+
+    with open(path, "w") as f:
+        f.write("\n".join(out))
+    return {"junctions": n, "reservoirs": num_reservoirs, "pipes": len(edges) + num_reservoirs}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Write a synthetic EPANET network")
+    ap.add_argument("output", help="INP file to write")
+    ap.add_argument("--junctions", type=int, default=50000)
+    ap.add_argument("--topology", choices=TOPOLOGIES, default="looped")
+    ap.add_argument("--loop-fraction", type=float, default=0.2)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    counts = write_synthetic_network(args.output, args.junctions, args.topology, args.loop_fraction, seed=args.seed)
+    print(f"Wrote {args.output}: {counts}")
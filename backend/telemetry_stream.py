@@ -0,0 +1,117 @@
+"""
+Live Telemetry Ingestion
+Keeps per-node hourly pressures in a preallocated ring buffer and re-scores the
+model every time a new hour of readings completes
+"""
+
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .generate_data import OBS_NODES
+from .hourly_aggregator import HourlyAggregator
+from .prediction_archive import input_hash
+
+
+class TelemetryStream:
+    """
+    Constant-memory sliding window over live pressure readings
+
+    Readings are averaged per node within each clock hour by a HourlyAggregator. When an
+    hour closes it is written into the ring buffer and, if the last window_hours hours
+    are complete for every node, the window is scored.
+    """
+
+    def __init__(
+        self,
+        score_fn: Callable[[np.ndarray], Dict],
+        obs_nodes: List[str] = OBS_NODES,
+        window_hours: int = 24,
+        capacity_hours: Optional[int] = None,
+        step_m: Optional[int] = None,
+    ):
+        self.score_fn = score_fn
+        self.obs_nodes = list(obs_nodes)
+        self.node_index = {n: i for i, n in enumerate(self.obs_nodes)}
+        self.window_hours = window_hours
+        self.capacity = max(capacity_hours or window_hours, window_hours)
+
+        # Ring buffer of hourly means, slot = hour % capacity
+        self._hourly = np.full((len(self.obs_nodes), self.capacity), np.nan, dtype=np.float32)
+        self._slot_hour = np.full(self.capacity, -1, dtype=np.int64)
+
+        # Running sums for the hour still being filled; an hour closes on its boundary,
+        # when the first reading from a later hour arrives
+        self._aggregator = HourlyAggregator(self.obs_nodes, step_m=step_m, on_hour=self._close_hour)
+        self._pending: List[Dict] = []
+
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+        self.latest_prediction: Optional[Dict] = None
+
+    def ingest(self, readings: Iterable[Dict]) -> List[Dict]:
+        """
+        Add readings and score every window completed by them
+        Each reading is {"node_id": str, "timestamp": epoch seconds, "pressure": float};
+        readings for unknown nodes, non-finite values or already-closed hours are rejected
+        Returns the predictions produced, oldest first
+        """
+        with self._lock:
+            for reading in sorted(readings, key=lambda r: r["timestamp"]):
+                idx = self.node_index.get(reading["node_id"])
+                if idx is not None and self._aggregator.add_reading(reading["timestamp"], idx, float(reading["pressure"])):
+                    self.accepted += 1
+                else:
+                    self.rejected += 1
+            predictions, self._pending = self._pending, []
+        return predictions
+
+    def _close_hour(self, hour: int, means: np.ndarray):
+        slot = hour % self.capacity
+        self._hourly[:, slot] = means
+        self._slot_hour[slot] = hour
+        prediction = self._score_window(hour)
+        if prediction is not None:
+            self._pending.append(prediction)
+
+    def window(self, end_hour: int) -> Optional[np.ndarray]:
+        """
+        Model input vector for the window_hours hours ending at end_hour (inclusive),
+        node-major like HOURLY_NODES; None if any hour or node is missing
+        """
+        hours = np.arange(end_hour - self.window_hours + 1, end_hour + 1)
+        slots = hours % self.capacity
+        if not np.array_equal(self._slot_hour[slots], hours):
+            return None
+        window = self._hourly[:, slots]
+        if not np.isfinite(window).all():
+            return None
+        return window.reshape(-1)
+
+    def _score_window(self, end_hour: int) -> Optional[Dict]:
+        window = self.window(end_hour)
+        if window is None:
+            return None
+        scores = self.score_fn(window[None, :])
+        prediction = {key: values[0] for key, values in scores.items() if isinstance(values, list)}
+        prediction["window_start_s"] = (end_hour - self.window_hours + 1) * 3600
+        prediction["window_end_s"] = (end_hour + 1) * 3600
+        prediction["input_hash"] = input_hash(window)
+        self.latest_prediction = prediction
+        return prediction
+
+    def status(self) -> Dict:
+        """Buffer fill level, ingestion counters and the latest prediction"""
+        with self._lock:
+            closed = self._slot_hour[self._slot_hour >= 0]
+            open_hour = self._aggregator.open_hour
+            return {
+                "open_hour_start_s": open_hour * 3600 if open_hour is not None else None,
+                "buffered_hours": int(closed.size),
+                "window_hours": self.window_hours,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "latest_prediction": self.latest_prediction,
+            }
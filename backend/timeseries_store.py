@@ -0,0 +1,241 @@
+"""
+Time-Series History Store
+Embedded, append-only history of node pressures, demands and predictions: raw points
+in fixed-size chunks (int64 epoch seconds, float32 values) plus hourly and daily
+rollups (count, sum, min, max) stored densely by bucket, so a range at any resolution
+is one seek and one read whatever the length of the history before it
+"""
+
+import json
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+HISTORY_DIR = Path(__file__).parent / "history"
+# Bucket width in seconds of every resolution; "raw" is every appended point
+RESOLUTIONS = {"raw": 0, "hourly": 3600, "daily": 86400}
+ROLLUP_DTYPE = np.dtype([("count", "<u4"), ("sum", "<f8"), ("min", "<f4"), ("max", "<f4")])
+
+
+class _Series:
+    """
+    One (metric, key) series in its own directory
+
+    raw/NNNNNN.ts and raw/NNNNNN.f32 hold chunk_points points each (the last chunk is
+    filled first); hourly.bin and daily.bin hold one ROLLUP_DTYPE record per bucket from
+    the series' first bucket on, empty buckets included, so bucket b is record
+    b - origin. Points must arrive in non-decreasing time order; older ones are dropped.
+    """
+
+    def __init__(self, directory: Path, chunk_points: int):
+        self.dir = directory
+        self.chunk_points = chunk_points
+        (self.dir / "raw").mkdir(parents=True, exist_ok=True)
+        meta_path = self.dir / "meta.json"
+        self.origins: Dict[str, int] = json.loads(meta_path.read_text())["origins"] if meta_path.exists() else {}
+
+        # First timestamp of every raw chunk, for range lookups
+        self._chunk_first: List[int] = []
+        self._last_ts: Optional[int] = None
+        self._last_chunk_len = 0
+        for path in sorted((self.dir / "raw").glob("*.ts")):
+            ts = np.fromfile(path, dtype="<i8")
+            if len(ts):
+                self._chunk_first.append(int(ts[0]))
+                self._last_ts = int(ts[-1])
+                self._last_chunk_len = len(ts)
+
+    def _chunk_paths(self, chunk: int) -> Tuple[Path, Path]:
+        return self.dir / "raw" / f"{chunk:06d}.ts", self.dir / "raw" / f"{chunk:06d}.f32"
+
+    def append(self, timestamps: np.ndarray, values: np.ndarray) -> int:
+        if self._last_ts is not None:
+            keep = timestamps >= self._last_ts
+            timestamps, values = timestamps[keep], values[keep]
+        if len(timestamps) == 0:
+            return 0
+
+        # Raw points: top up the last chunk, then open new ones
+        written = 0
+        while written < len(timestamps):
+            if not self._chunk_first or self._last_chunk_len >= self.chunk_points:
+                self._chunk_first.append(int(timestamps[written]))
+                self._last_chunk_len = 0
+            n = min(self.chunk_points - self._last_chunk_len, len(timestamps) - written)
+            ts_path, value_path = self._chunk_paths(len(self._chunk_first) - 1)
+            with open(ts_path, "ab") as f:
+                f.write(timestamps[written:written + n].astype("<i8").tobytes())
+            with open(value_path, "ab") as f:
+                f.write(values[written:written + n].astype("<f4").tobytes())
+            self._last_chunk_len += n
+            written += n
+        self._last_ts = int(timestamps[-1])
+
+        for resolution, width in RESOLUTIONS.items():
+            if width:
+                self._append_rollup(resolution, width, timestamps, values)
+        return len(timestamps)
+
+    def _append_rollup(self, resolution: str, width: int, timestamps: np.ndarray, values: np.ndarray):
+        buckets = timestamps // width
+        if resolution not in self.origins:
+            self.origins[resolution] = int(buckets[0])
+            (self.dir / "meta.json").write_text(json.dumps({"origins": self.origins}))
+        origin = self.origins[resolution]
+        path = self.dir / f"{resolution}.bin"
+        size = path.stat().st_size // ROLLUP_DTYPE.itemsize if path.exists() else 0
+
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        first = int(buckets[0]) - origin
+        records = np.zeros(int(buckets[-1]) - origin - first + 1, dtype=ROLLUP_DTYPE)
+        records["min"] = np.nan
+        records["max"] = np.nan
+        positions = buckets[starts] - origin - first
+        records["count"][positions] = np.diff(np.r_[starts, len(buckets)])
+        records["sum"][positions] = np.add.reduceat(values.astype(np.float64), starts)
+        records["min"][positions] = np.minimum.reduceat(values, starts)
+        records["max"][positions] = np.maximum.reduceat(values, starts)
+
+        if first < size:
+            # Appends are time-ordered, so only the last stored bucket can still be open
+            previous = np.fromfile(path, dtype=ROLLUP_DTYPE, count=1, offset=first * ROLLUP_DTYPE.itemsize)[0]
+            records[0]["count"] += previous["count"]
+            records[0]["sum"] += previous["sum"]
+            records[0]["min"] = np.fmin(records[0]["min"], previous["min"])
+            records[0]["max"] = np.fmax(records[0]["max"], previous["max"])
+        elif first > size:
+            gap = np.zeros(first - size, dtype=ROLLUP_DTYPE)
+            gap["min"] = np.nan
+            gap["max"] = np.nan
+            records = np.concatenate([gap, records])
+            first = size
+        with open(path, "r+b" if path.exists() else "wb") as f:
+            f.seek(first * ROLLUP_DTYPE.itemsize)
+            f.write(records.tobytes())
+
+    def raw(self, start: int, end: int, limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        first = max(bisect_right(self._chunk_first, start) - 1, 0)
+        last = bisect_left(self._chunk_first, end)
+        times, values = [], []
+        for chunk in range(first, last):
+            ts_path, value_path = self._chunk_paths(chunk)
+            ts = np.fromfile(ts_path, dtype="<i8")
+            lo, hi = np.searchsorted(ts, start, "left"), np.searchsorted(ts, end, "left")
+            times.append(ts[lo:hi])
+            values.append(np.fromfile(value_path, dtype="<f4", count=hi - lo, offset=4 * lo))
+        times = np.concatenate(times) if times else np.zeros(0, dtype=np.int64)
+        values = np.concatenate(values) if values else np.zeros(0, dtype=np.float32)
+        if limit is not None:
+            times, values = times[-limit:], values[-limit:]
+        return times, values
+
+    def rollup(self, resolution: str, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        width = RESOLUTIONS[resolution]
+        path = self.dir / f"{resolution}.bin"
+        if resolution not in self.origins or not path.exists():
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=ROLLUP_DTYPE)
+        origin = self.origins[resolution]
+        size = path.stat().st_size // ROLLUP_DTYPE.itemsize
+        lo = min(max(start // width - origin, 0), size)
+        hi = min(max(-(-end // width) - origin, lo), size)
+        records = np.fromfile(path, dtype=ROLLUP_DTYPE, count=hi - lo, offset=lo * ROLLUP_DTYPE.itemsize)
+        buckets = origin + lo + np.arange(len(records))
+        filled = records["count"] > 0
+        return buckets[filled] * width, records[filled]
+
+
+class TimeSeriesStore:
+    """
+    Directory of append-only series keyed by (metric, key), e.g. ("pressure", "NODE_474")
+    or ("prediction", "leak_x"); series are created on first append. Names other than
+    letters, digits, "_", "." and "-" (and "." / "..") raise ValueError
+    """
+
+    def __init__(self, root: Union[str, Path] = HISTORY_DIR, chunk_points: int = 65536):
+        self.root = Path(root)
+        self.chunk_points = chunk_points
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _safe(name: str) -> str:
+        # Metric and key names are directory names as they are: rewriting them would let
+        # two names share (and corrupt) one series
+        if name in ("", ".", "..") or re.fullmatch(r"[A-Za-z0-9_.-]+", name) is None:
+            raise ValueError(f"Invalid series name {name!r}: expected letters, digits, '_', '.' or '-'")
+        return name
+
+    def _get(self, metric: str, key: str, create: bool) -> Optional[_Series]:
+        series = self._series.get((metric, key))
+        if series is None:
+            directory = self.root / self._safe(metric) / self._safe(key)
+            if not create and not directory.exists():
+                return None
+            series = self._series[(metric, key)] = _Series(directory, self.chunk_points)
+        return series
+
+    def append(self, metric: str, key: str, timestamps: Iterable[float], values: Iterable[float]) -> int:
+        """
+        Append points (epoch seconds, values) to a series; points older than its latest
+        point and non-finite values are dropped. Returns the number of points stored
+        """
+        timestamps = np.asarray(list(timestamps) if not isinstance(timestamps, np.ndarray) else timestamps,
+                                dtype=np.float64)
+        values = np.asarray(list(values) if not isinstance(values, np.ndarray) else values, dtype=np.float32)
+        keep = np.isfinite(timestamps) & np.isfinite(values)
+        order = np.argsort(timestamps[keep], kind="stable")
+        timestamps = np.floor(timestamps[keep][order]).astype(np.int64)
+        values = values[keep][order]
+        with self._lock:
+            return self._get(metric, key, create=True).append(timestamps, values)
+
+    def append_many(self, metric: str, points: Iterable[Tuple[str, float, float]]) -> int:
+        """Append (key, epoch seconds, value) points of several series of one metric"""
+        grouped: Dict[str, Tuple[List[float], List[float]]] = {}
+        for key, timestamp, value in points:
+            times, values = grouped.setdefault(key, ([], []))
+            times.append(timestamp)
+            values.append(value)
+        return sum(self.append(metric, key, times, values) for key, (times, values) in grouped.items())
+
+    def query(self, metric: str, key: str, start: float, end: float, resolution: str = "hourly",
+              limit: Optional[int] = None) -> Dict:
+        """
+        Points of a series with start <= time < end (epoch seconds)
+
+        "raw" returns time_s and value (the last limit points if limit is set); "hourly"
+        and "daily" return time_s (bucket start), count, mean, min and max of every
+        non-empty bucket. Missing series give empty lists.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution!r}, expected one of {tuple(RESOLUTIONS)}")
+        start, end = int(np.floor(start)), int(np.ceil(end))
+        with self._lock:
+            series = self._get(metric, key, create=False)
+            if resolution == "raw":
+                times, values = series.raw(start, end, limit) if series is not None else (np.zeros(0), np.zeros(0))
+                return {"time_s": times.tolist(), "value": values.tolist()}
+            times, records = series.rollup(resolution, start, end) if series is not None else (
+                np.zeros(0), np.zeros(0, dtype=ROLLUP_DTYPE))
+        return {
+            "time_s": times.tolist(),
+            "count": records["count"].tolist(),
+            "mean": (records["sum"] / np.maximum(records["count"], 1)).tolist(),
+            "min": records["min"].tolist(),
+            "max": records["max"].tolist(),
+        }
+
+    def latest(self, metric: str, key: str) -> Optional[int]:
+        """Time (epoch seconds) of the last point of a series, None if it has none"""
+        with self._lock:
+            series = self._get(metric, key, create=False)
+            return series._last_ts if series is not None else None
+
+    def keys(self, metric: str) -> List[str]:
+        """Series stored for a metric (directory names)"""
+        directory = self.root / self._safe(metric)
+        return sorted(p.name for p in directory.iterdir() if p.is_dir()) if directory.exists() else []
@@ -0,0 +1,108 @@
+import copy
+import torch
+
+
+class SensorAugmentation:
+    def __init__(self, input_stds, num_sensors=21, noise_std=0.05, bias_std=0.2, drift_std=0.2,
+                 dropout_prob=0.02, sensor_dropout_prob=0.01, seed=None):
+        """
+        On-the-fly sensor corruption of normalized input batches, so every epoch sees each
+        simulated scenario as a different set of field readings.
+
+        Inputs are laid out sensor-major like HOURLY_NODES (all hours of the first sensor,
+        then the next), i.e. a batch (B, num_sensors * hours) is viewed as (B, num_sensors, hours).
+        Each call draws, per sample and sensor:
+        - white noise with noise_std (m) on every reading,
+        - a constant bias with bias_std (m),
+        - a linear drift from 0 at the first hour to N(0, drift_std) (m) at the last,
+        - missing readings with dropout_prob, and a whole missing sensor with sensor_dropout_prob;
+          missing values are set to the column mean (0 after normalization).
+
+        Parameters:
+        - input_stds (sequence of float or torch.Tensor): Normalization std per input column, converts metres to normalized units.
+        - num_sensors (int): Number of sensors (observation nodes) in the input.
+        - noise_std, bias_std, drift_std (float): Standard deviations in metres of pressure head (0 disables).
+        - dropout_prob, sensor_dropout_prob (float): Probabilities of a missing reading / sensor (0 disables).
+        - seed (int): Seed of the augmentation's own random generator (independent of the global seed).
+        """
+        self.inv_stds = 1.0 / torch.as_tensor(input_stds, dtype=torch.float32).view(num_sensors, -1)
+        self.num_sensors = num_sensors
+        self.noise_std = noise_std
+        self.bias_std = bias_std
+        self.drift_std = drift_std
+        self.dropout_prob = dropout_prob
+        self.sensor_dropout_prob = sensor_dropout_prob
+        self.seed = seed
+        self._generator = None
+
+    @classmethod
+    def from_normalization(cls, normalization_params, input_columns, **kwargs):
+        """
+        Build the augmentation for the columns of a LeakDataset.
+
+        Parameters:
+        - normalization_params (dict): Output of LeakDataset.get_normalization_params().
+        - input_columns (list of str): Input columns in model order, "<node>_Hour<h>" (node-major)
+          or one column per sensor.
+        - kwargs: Passed to SensorAugmentation; num_sensors defaults to the number of distinct
+          nodes in input_columns.
+
+        Returns:
+        - SensorAugmentation
+        """
+        stds = [float(normalization_params["input_stds"].get(c, 1.0)) for c in input_columns]
+        kwargs.setdefault("num_sensors", len(dict.fromkeys(c.rsplit("_Hour", 1)[0] for c in input_columns)))
+        return cls(stds, **kwargs)
+
+    def reseeded(self, seed):
+        """Copy with its own generator seeded with seed (e.g. one per DDP rank)"""
+        other = copy.copy(self)
+        other.seed = seed
+        other._generator = None
+        return other
+
+    def __getstate__(self):
+        # torch.Generator does not pickle; a worker re-creates it from the seed
+        state = self.__dict__.copy()
+        state["_generator"] = None
+        return state
+
+    def __call__(self, inputs):
+        """
+        Corrupt a batch of normalized inputs.
+
+        Parameters:
+        - inputs (torch.Tensor): Normalized inputs of shape (B, num_sensors * hours).
+
+        Returns:
+        - torch.Tensor: Augmented inputs of the same shape, dtype and device.
+        """
+        if self._generator is None:
+            self._generator = torch.Generator()
+            if self.seed is not None:
+                self._generator.manual_seed(self.seed)
+        g = self._generator
+        batch = inputs.shape[0]
+        hours = self.inv_stds.shape[1]
+        shape = (batch, self.num_sensors, hours)
+        per_sensor = (batch, self.num_sensors, 1)
+
+        # Offsets in metres, drawn on the CPU generator so results do not depend on the device
+        delta = torch.zeros(shape)
+        if self.noise_std:
+            delta += self.noise_std * torch.randn(shape, generator=g)
+        if self.bias_std:
+            delta += self.bias_std * torch.randn(per_sensor, generator=g)
+        if self.drift_std:
+            ramp = torch.linspace(0.0, 1.0, hours)
+            delta += self.drift_std * torch.randn(per_sensor, generator=g) * ramp
+
+        x = inputs.view(shape) + (delta * self.inv_stds).to(inputs.device, inputs.dtype)
+
+        mask = torch.zeros(shape, dtype=torch.bool)
+        if self.dropout_prob:
+            mask |= torch.rand(shape, generator=g) < self.dropout_prob
+        if self.sensor_dropout_prob:
+            mask |= torch.rand(per_sensor, generator=g) < self.sensor_dropout_prob
+        x = x.masked_fill(mask.to(inputs.device), 0.0)
+        return x.reshape(inputs.shape)
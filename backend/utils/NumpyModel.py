@@ -0,0 +1,95 @@
+import numpy as np
+
+
+class NumpyLeakModel:
+    """
+    Pure NumPy forward pass for an artifact written by SaveLoad.export_numpy_artifact.
+
+    Lets inference processes score LeakLocalizationNN without importing torch.
+    """
+
+    def __init__(self, weights, biases, input_columns, input_means, input_stds, output_names, output_means, output_stds):
+        self.weights = weights  # (in_features, out_features) per layer, ready for x @ W
+        self.biases = biases
+        self.input_columns = input_columns
+        self.input_means = input_means
+        self.input_stds = input_stds
+        self.output_names = output_names
+        self.output_means = output_means
+        self.output_stds = output_stds
+
+    @classmethod
+    def load(cls, filepath):
+        """
+        Load an exported .npz artifact (float32 or int8-quantized weights).
+
+        Parameters:
+        - filepath (str): Path to the .npz artifact.
+
+        Returns:
+        - NumpyLeakModel: Model ready for inference.
+        """
+        with np.load(filepath, allow_pickle=False) as data:
+            weights, biases = [], []
+            for i in range(int(data["num_layers"])):
+                if f"W{i}" in data:
+                    weight = data[f"W{i}"]
+                else:
+                    weight = data[f"W{i}_q"].astype(np.float32) * data[f"W{i}_scale"][:, None]
+                weights.append(np.ascontiguousarray(weight.T, dtype=np.float32))
+                biases.append(data[f"b{i}"].astype(np.float32))
+
+            return cls(
+                weights,
+                biases,
+                data["input_columns"].tolist(),
+                data["input_means"].astype(np.float32),
+                data["input_stds"].astype(np.float32),
+                data["output_names"].tolist(),
+                data["output_means"].astype(np.float64),
+                data["output_stds"].astype(np.float64),
+            )
+
+    def forward(self, x):
+        """
+        Run the network on normalized inputs.
+
+        Parameters:
+        - x (np.ndarray): Normalized inputs of shape (N, input_dim).
+
+        Returns:
+        - np.ndarray: Normalized predictions of shape (N, output_dim).
+        """
+        last = len(self.weights) - 1
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            x = x @ weight
+            x += bias
+            if i < last:
+                np.maximum(x, 0.0, out=x)
+        return x
+
+    def predict_array(self, inputs):
+        """
+        Normalize raw inputs, run the network and denormalize the outputs.
+
+        Parameters:
+        - inputs (np.ndarray): Raw inputs of shape (N, input_dim) in input_columns order.
+
+        Returns:
+        - np.ndarray: Denormalized predictions of shape (N, output_dim).
+        """
+        x = (np.asarray(inputs, dtype=np.float32) - self.input_means) / self.input_stds
+        return self.forward(x) * self.output_stds + self.output_means
+
+    def predict(self, inputs):
+        """
+        Same as predict_array, returned as {output_name: list of values} like
+        PredictLeakLocation.denormalize_outputs.
+
+        Parameters:
+        - inputs (np.ndarray or pd.DataFrame): Raw inputs; DataFrames are reordered to input_columns.
+        """
+        if hasattr(inputs, "columns"):
+            inputs = inputs[self.input_columns].to_numpy(dtype=np.float32)
+        predictions = self.predict_array(inputs)
+        return {name: predictions[:, i].tolist() for i, name in enumerate(self.output_names)}
@@ -0,0 +1,131 @@
+import copy
+import statistics
+import time
+import torch
+import torch.nn as nn
+
+EXECUTION_MODES = ("eager", "script", "compile", "bf16", "int8")
+
+
+class _CastWrapper(nn.Module):
+    """Runs a low-precision copy of a model while keeping float32 inputs and outputs."""
+
+    def __init__(self, model, dtype):
+        super().__init__()
+        self.model = model
+        self.dtype = dtype
+
+    def forward(self, x):
+        return self.model(x.to(self.dtype)).float()
+
+
+def optimize_model(model, mode="eager", example_input=None):
+    """
+    Build an inference-only version of a trained model for the given execution mode.
+
+    Parameters:
+    - model (torch.nn.Module): Trained model (left untouched; low-precision modes work on a copy).
+    - mode (str): One of EXECUTION_MODES:
+        "eager"   - the model as-is, in eval mode.
+        "script"  - traced and frozen TorchScript graph.
+        "compile" - torch.compile (inductor) graph.
+        "bf16"    - bfloat16 weights and activations.
+        "int8"    - dynamically quantized int8 nn.Linear weights.
+    - example_input (torch.Tensor): Sample batch, required for "script".
+
+    Returns:
+    - torch.nn.Module: Callable model in eval mode taking and returning float32 tensors.
+    """
+    model.eval()
+    if mode == "eager":
+        return model
+    if mode == "script":
+        if example_input is None:
+            raise ValueError("example_input is required for mode 'script'")
+        with torch.no_grad():
+            return torch.jit.freeze(torch.jit.trace(model, example_input))
+    if mode == "compile":
+        return torch.compile(model)
+    if mode == "bf16":
+        return _CastWrapper(copy.deepcopy(model).to(torch.bfloat16), torch.bfloat16).eval()
+    if mode == "int8":
+        return torch.ao.quantization.quantize_dynamic(copy.deepcopy(model), {nn.Linear}, dtype=torch.qint8)
+    raise ValueError(f"Unknown execution mode '{mode}'. Expected one of {EXECUTION_MODES}")
+
+
+def _time_forward(model, inputs, repeats, warmup):
+    with torch.inference_mode():
+        for _ in range(warmup):
+            model(inputs)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            outputs = model(inputs)
+            timings.append((time.perf_counter() - start) * 1000.0)
+    return outputs, timings
+
+
+def benchmark_execution_modes(model, inputs, modes=EXECUTION_MODES, batch_sizes=(1, 256), repeats=50, warmup=5, output_stds=None):
+    """
+    Compare latency and accuracy of each execution mode against the eager float32 model.
+
+    Parameters:
+    - model (torch.nn.Module): Trained model.
+    - inputs (torch.Tensor): Normalized inputs; batches are taken from (or tiled up to) its rows.
+    - modes (iterable of str): Execution modes to benchmark.
+    - batch_sizes (iterable of int): Batch sizes to time.
+    - repeats (int), warmup (int): Timed and untimed forward passes per configuration.
+    - output_stds (dict): Output std devs; if given, errors are also reported in real units.
+
+    Returns:
+    - list of dict: One row per (mode, batch_size) with median/p95 latency in ms, speedup over
+      eager and the max/mean absolute output difference from eager.
+    """
+    results = []
+    for batch_size in batch_sizes:
+        repeat_count = -(-batch_size // inputs.shape[0])
+        batch = inputs.repeat(repeat_count, 1)[:batch_size].contiguous()
+        reference, eager_timings = _time_forward(optimize_model(model, "eager"), batch, repeats, warmup)
+        eager_median = statistics.median(eager_timings)
+
+        for mode in modes:
+            row = {"mode": mode, "batch_size": batch_size}
+            try:
+                candidate = optimize_model(model, mode, example_input=batch)
+                outputs, timings = _time_forward(candidate, batch, repeats, warmup)
+            except Exception as e:
+                row["error"] = str(e)
+                results.append(row)
+                continue
+
+            diff = (outputs.float() - reference).abs()
+            timings.sort()
+            row.update({
+                "median_ms": statistics.median(timings),
+                "p95_ms": timings[min(len(timings) - 1, int(0.95 * len(timings)))],
+                "speedup_vs_eager": eager_median / statistics.median(timings),
+                "max_abs_diff": diff.max().item(),
+                "mean_abs_diff": diff.mean().item(),
+            })
+            if output_stds is not None:
+                stds = torch.tensor(list(output_stds.values()), dtype=torch.float32)
+                row["max_abs_diff_real"] = dict(zip(output_stds.keys(), (diff * stds).max(dim=0).values.tolist()))
+            results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+    import pandas as pd
+    from ..run_model import HOURLY_NODES, PredictLeakLocation
+
+    main_path = Path(__file__).parent.parent
+    predictor = PredictLeakLocation()
+    model, normalization_params = predictor.load_model(main_path / "model" / "leak_model.pth", HOURLY_NODES, "cpu")
+    test_inputs = pd.read_csv(main_path / "generated_data.csv")[HOURLY_NODES]
+    inputs = predictor.normalize_inputs(test_inputs, normalization_params["input_means"], normalization_params["input_stds"])
+    # Jitter the sample so large batches are not the same row repeated
+    inputs = inputs.repeat(256, 1) + 0.05 * torch.randn(256 * inputs.shape[0], inputs.shape[1])
+
+    for row in benchmark_execution_modes(model, inputs, output_stds=normalization_params["output_stds"]):
+        print(row)
@@ -0,0 +1,209 @@
+import os
+import socket
+import time
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader
+from torch.utils.data.distributed import DistributedSampler
+from .TrainValidate import train_model, validate_model, append_loss_log
+from .SaveLoad import save_model_with_params
+from .Seed import set_seed
+
+
+def configure_cpu_threads(num_threads=None, num_interop_threads=None):
+    """
+    Set the number of intra-op (and optionally inter-op) threads PyTorch uses on CPU.
+
+    Parameters:
+    - num_threads (int): Intra-op threads. Default is every available core.
+    - num_interop_threads (int): Inter-op threads (optional). Can only be changed before
+      PyTorch runs any parallel work, so failures are ignored.
+
+    Returns:
+    - int: The intra-op thread count now in effect.
+    """
+    if num_threads is None:
+        num_threads = os.cpu_count() or 1
+    torch.set_num_threads(max(1, int(num_threads)))
+    if num_interop_threads is not None:
+        try:
+            torch.set_num_interop_threads(max(1, int(num_interop_threads)))
+        except RuntimeError:
+            pass
+    return torch.get_num_threads()
+
+
+def timed_train_epoch(model, dataloader, optimizer, criterion, device, autocast_dtype=None, augment=None):
+    """
+    Run one training epoch with train_model and measure its throughput.
+
+    Returns:
+    - train_loss (float): Mean training loss over the epoch.
+    - samples_per_sec (float): Training samples processed per second.
+    """
+    num_samples = len(dataloader.sampler)
+    start = time.perf_counter()
+    train_loss = train_model(model, dataloader, optimizer, criterion, device, autocast_dtype, augment)
+    elapsed = time.perf_counter() - start
+    return train_loss, num_samples / elapsed if elapsed > 0 else float("inf")
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _ddp_worker(rank, world_size, config, result_queue):
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(config["master_port"])
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+
+    try:
+        configure_cpu_threads(config["threads_per_worker"], 1)
+        set_seed(config["seed"])
+
+        device = torch.device("cpu")
+        model = config["model_cls"](**config["model_kwargs"])
+        model.to(device)
+        ddp_model = DistributedDataParallel(model)
+
+        # Each worker trains on its own shard; gradients are averaged over gloo
+        sampler = DistributedSampler(config["train_dataset"], num_replicas=world_size, rank=rank, shuffle=True, seed=config["seed"])
+        train_loader = DataLoader(config["train_dataset"], batch_size=config["batch_size"], sampler=sampler)
+        val_loader = DataLoader(config["val_dataset"], batch_size=config["batch_size"], shuffle=False)
+
+        optimizer = torch.optim.Adam(ddp_model.parameters(), lr=config["lr"])
+        criterion = torch.nn.MSELoss()
+        # Every rank corrupts its shard with its own augmentation stream
+        augment = config["augment"].reseeded(config["seed"] + rank) if config["augment"] is not None else None
+
+        normalization_params = config["normalization_params"]
+        best_val_loss = float("inf")
+        epoch_throughput = []
+        num_epochs = config["num_epochs"]
+
+        for epoch in range(num_epochs):
+            sampler.set_epoch(epoch)
+            start = time.perf_counter()
+            train_loss = train_model(ddp_model, train_loader, optimizer, criterion, device, augment=augment)
+            elapsed = time.perf_counter() - start
+
+            # Global throughput: all samples seen by every worker over the slowest worker's time
+            totals = torch.tensor([train_loss, float(len(sampler))], dtype=torch.float64)
+            dist.all_reduce(totals, op=dist.ReduceOp.SUM)
+            slowest = torch.tensor([elapsed], dtype=torch.float64)
+            dist.all_reduce(slowest, op=dist.ReduceOp.MAX)
+            train_loss = totals[0].item() / world_size
+            samples_per_sec = totals[1].item() / slowest.item() if slowest.item() > 0 else float("inf")
+            epoch_throughput.append(samples_per_sec)
+
+            if rank != 0:
+                continue
+
+            val_loss, normalized_output_losses, denormalized_output_losses = validate_model(
+                model, val_loader, criterion, device,
+                normalization_params["output_means"], normalization_params["output_stds"]
+            )
+
+            print(f"Epoch {epoch + 1}/{num_epochs}, Train Loss: {train_loss:.4f}, Validation Loss: {val_loss:.4f}, "
+                  f"Throughput: {samples_per_sec:.0f} samples/sec ({world_size} workers)")
+
+            if config["loss_log_path"]:
+                append_loss_log(config["loss_log_path"], epoch + 1, train_loss, val_loss,
+                                normalized_output_losses, denormalized_output_losses, samples_per_sec)
+
+            if val_loss < best_val_loss:
+                best_val_loss = val_loss
+                if config["model_save_path"]:
+                    save_model_with_params(
+                        model=model,
+                        filepath=config["model_save_path"],
+                        input_means=normalization_params["input_means"],
+                        input_stds=normalization_params["input_stds"],
+                        output_means=normalization_params["output_means"],
+                        output_stds=normalization_params["output_stds"],
+                    )
+
+        if rank == 0:
+            result_queue.put({
+                "world_size": world_size,
+                "threads_per_worker": config["threads_per_worker"],
+                "best_val_loss": best_val_loss,
+                "epoch_samples_per_sec": epoch_throughput,
+                "mean_samples_per_sec": sum(epoch_throughput) / len(epoch_throughput) if epoch_throughput else 0.0,
+            })
+    finally:
+        dist.destroy_process_group()
+
+
+def train_cpu_parallel(
+    model_cls,
+    model_kwargs,
+    train_dataset,
+    val_dataset,
+    normalization_params,
+    num_workers=None,
+    threads_per_worker=None,
+    num_epochs=20,
+    lr=0.001,
+    batch_size=32,
+    seed=42,
+    model_save_path=None,
+    loss_log_path=None,
+    augment=None,
+):
+    """
+    Train a model with DistributedDataParallel over the gloo backend using local CPU processes.
+
+    Every worker runs the same train_model loop on its shard of the training set; rank 0
+    validates, logs and checkpoints exactly like the single-process loop in Localization.py.
+
+    Parameters:
+    - model_cls (type): Model class to instantiate in each worker (e.g. LeakLocalizationNN).
+    - model_kwargs (dict): Keyword arguments for model_cls.
+    - train_dataset, val_dataset (torch.utils.data.Dataset): Training and validation splits.
+    - normalization_params (dict): Output of LeakDataset.get_normalization_params().
+    - num_workers (int): Number of training processes. Default is one per 4 cores.
+    - threads_per_worker (int): Intra-op threads per process. Default splits the cores evenly.
+    - num_epochs (int), lr (float), batch_size (int), seed (int): Training hyperparameters.
+    - model_save_path (str): Where the best checkpoint is saved (optional).
+    - loss_log_path (str): Per-epoch loss CSV (optional).
+    - augment (SensorAugmentation): Training-batch augmentation (optional), reseeded per worker.
+
+    Returns:
+    - dict: Best validation loss and the per-epoch throughput report in samples/sec.
+    """
+    cores = os.cpu_count() or 1
+    if num_workers is None:
+        num_workers = max(1, cores // 4)
+    if threads_per_worker is None:
+        threads_per_worker = max(1, cores // num_workers)
+
+    config = {
+        "model_cls": model_cls,
+        "model_kwargs": model_kwargs,
+        "train_dataset": train_dataset,
+        "val_dataset": val_dataset,
+        "normalization_params": normalization_params,
+        "threads_per_worker": threads_per_worker,
+        "num_epochs": num_epochs,
+        "lr": lr,
+        "batch_size": batch_size,
+        "seed": seed,
+        "model_save_path": model_save_path,
+        "loss_log_path": loss_log_path,
+        "augment": augment,
+        "master_port": _free_port(),
+    }
+
+    ctx = mp.get_context("spawn")
+    result_queue = ctx.SimpleQueue()
+    mp.spawn(_ddp_worker, args=(num_workers, config, result_queue), nprocs=num_workers, join=True)
+    report = result_queue.get()
+
+    print(f"CPU-parallel training: {report['world_size']} workers x {report['threads_per_worker']} threads, "
+          f"mean throughput {report['mean_samples_per_sec']:.0f} samples/sec")
+    return report
@@ -1,7 +1,9 @@
+import numpy as np
 import torch
+import torch.nn as nn
 import os
 
-def save_model_with_params(model, filepath, input_means=None, input_stds=None, output_means=None, output_stds=None):
+def save_model_with_params(model, filepath, input_means=None, input_stds=None, output_means=None, output_stds=None, export_path=None, quantize=False):
     """
     Save the trained model along with normalization parameters to a file.
 
@@ -12,6 +14,8 @@ def save_model_with_params(model, filepath, input_means=None, input_stds=None, o
     - input_stds (dict): Standard deviation values of input features for normalization (optional).
     - output_means (dict): Mean values of output features for normalization (optional).
     - output_stds (dict): Standard deviation values of output features for normalization (optional).
+    - export_path (str): Also write a torch-free NumPy inference artifact here (optional).
+    - quantize (bool): Store the exported weights as int8 with per-row scales. Default is False.
     """
     # Create a directory if it doesn't exist
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
@@ -29,6 +33,77 @@ def save_model_with_params(model, filepath, input_means=None, input_stds=None, o
     torch.save(checkpoint, filepath)
     print(f"Model and normalization parameters saved to {filepath}")
 
+    if export_path is not None:
+        export_numpy_artifact(model, export_path, input_means, input_stds, output_means, output_stds, quantize=quantize)
+
+
+def export_numpy_artifact(model, filepath, input_means, input_stds, output_means, output_stds, input_columns=None, quantize=False):
+    """
+    Export a trained model as a self-contained .npz artifact runnable with utils.NumpyModel.
+
+    The artifact holds the weights of every nn.Linear layer in forward order (ReLU between them,
+    none after the last) and the normalization parameters as vectors in input/output column order.
+
+    Parameters:
+    - model (torch.nn.Module): Trained model made of nn.Linear layers with ReLU activations.
+    - filepath (str): Destination .npz path.
+    - input_means, input_stds, output_means, output_stds (dict): Normalization parameters.
+    - input_columns (list of str): Input column order. Default is the key order of input_means.
+    - quantize (bool): Store weights as int8 with a float32 scale per output row. Default is False.
+    """
+    if os.path.dirname(filepath):
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    input_means = input_means or {}
+    input_stds = input_stds or {}
+    if input_columns is None:
+        input_columns = list(input_means.keys())
+
+    layers = [m for m in model.modules() if isinstance(m, nn.Linear)]
+    arrays = {
+        "num_layers": np.array(len(layers)),
+        "input_columns": np.array(input_columns),
+        # Columns without normalization parameters pass through unchanged
+        "input_means": np.array([input_means.get(c, 0.0) for c in input_columns], dtype=np.float32),
+        "input_stds": np.array([input_stds.get(c, 1.0) for c in input_columns], dtype=np.float32),
+        "output_names": np.array(list(output_means.keys())),
+        "output_means": np.array(list(output_means.values()), dtype=np.float64),
+        "output_stds": np.array([output_stds[k] for k in output_means.keys()], dtype=np.float64),
+    }
+    for i, layer in enumerate(layers):
+        weight = layer.weight.detach().cpu().numpy().astype(np.float32)
+        if quantize:
+            scale = np.abs(weight).max(axis=1) / 127.0
+            scale[scale == 0] = 1.0
+            arrays[f"W{i}_q"] = np.round(weight / scale[:, None]).astype(np.int8)
+            arrays[f"W{i}_scale"] = scale.astype(np.float32)
+        else:
+            arrays[f"W{i}"] = weight
+        arrays[f"b{i}"] = layer.bias.detach().cpu().numpy().astype(np.float32)
+
+    np.savez(filepath, **arrays)
+    print(f"NumPy inference artifact saved to {filepath}")
+
+
+def export_checkpoint_to_numpy(model, checkpoint_path, export_path=None, quantize=False):
+    """
+    Convert a checkpoint written by save_model_with_params into a NumPy inference artifact.
+
+    Parameters:
+    - model (torch.nn.Module): Model with the checkpoint's architecture.
+    - checkpoint_path (str): Path to the .pth checkpoint.
+    - export_path (str): Destination .npz path. Default is the checkpoint path with a .npz suffix.
+    - quantize (bool): Store weights as int8 with per-row scales. Default is False.
+
+    Returns:
+    - str: Path of the written artifact.
+    """
+    if export_path is None:
+        export_path = os.path.splitext(str(checkpoint_path))[0] + ".npz"
+    model, normalization_params = load_model_with_params(model, checkpoint_path, "cpu")
+    export_numpy_artifact(model, export_path, **normalization_params, quantize=quantize)
+    return export_path
+
 
 def load_model_with_params(model, filepath, device):
     """
@@ -0,0 +1,263 @@
+import csv
+import itertools
+import os
+import statistics
+import time
+import torch
+import torch.multiprocessing as mp
+from torch.utils.data import DataLoader, TensorDataset
+from .Dataset import LeakDataset
+from .TrainValidate import LOSS_LOG_COLUMNS, train_model, validate_model
+from .SaveLoad import save_model_with_params
+from .Parallel import configure_cpu_threads
+from .Seed import set_seed
+
+# Columns of the sweep results table: one row per (run, epoch)
+SWEEP_RESULT_COLUMNS = [
+    "sweep_id",
+    "run_id",
+    "hidden_dims",
+    "lr",
+    "batch_size",
+    "max_epochs",
+    "status",
+] + LOSS_LOG_COLUMNS
+
+# Worker-process state, filled once per worker by _init_worker
+_WORKER = {}
+
+
+def expand_search_space(search_space):
+    """
+    Expand a search space into the list of candidate configurations (full grid).
+
+    Parameters:
+    - search_space (dict): Maps a hyperparameter name ("hidden_dims", "lr", "batch_size",
+      "num_epochs") to the list of values to try.
+
+    Returns:
+    - list of dict: One dict per candidate configuration.
+    """
+    keys = list(search_space.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*(search_space[k] for k in keys))]
+
+
+def _init_worker(model_cls, inputs, outputs, train_idx, val_idx, normalization_params, peer_losses, lock, threads, seed):
+    configure_cpu_threads(threads, 1)
+    _WORKER.update({
+        "model_cls": model_cls,
+        "train_dataset": TensorDataset(inputs[train_idx], outputs[train_idx]),
+        "val_dataset": TensorDataset(inputs[val_idx], outputs[val_idx]),
+        "normalization_params": normalization_params,
+        "peer_losses": peer_losses,
+        "lock": lock,
+        "seed": seed,
+    })
+
+
+def _should_stop(peer_losses, lock, epoch, best_val_loss, grace_epochs, min_peers):
+    """
+    Median stopping rule: after the grace period, a run stops when its best validation loss
+    is worse than the median best loss other runs had reached at the same epoch.
+    """
+    with lock:
+        peers = list(peer_losses.get(epoch, []))
+        peer_losses[epoch] = peers + [best_val_loss]
+    if epoch < grace_epochs or len(peers) < min_peers:
+        return False
+    return best_val_loss > statistics.median(peers)
+
+
+def _train_candidate(task):
+    run_id, config, options = task
+    set_seed(_WORKER["seed"])
+
+    normalization_params = _WORKER["normalization_params"]
+    output_means = normalization_params["output_means"]
+    output_stds = normalization_params["output_stds"]
+    input_dim = _WORKER["train_dataset"].tensors[0].shape[1]
+    output_dim = _WORKER["train_dataset"].tensors[1].shape[1]
+
+    device = torch.device("cpu")
+    model = _WORKER["model_cls"](input_dim=input_dim, hidden_dims=list(config["hidden_dims"]), output_dim=output_dim)
+    optimizer = torch.optim.Adam(model.parameters(), lr=config["lr"])
+    criterion = torch.nn.MSELoss()
+
+    train_loader = DataLoader(_WORKER["train_dataset"], batch_size=config["batch_size"], shuffle=True)
+    val_loader = DataLoader(_WORKER["val_dataset"], batch_size=config["batch_size"], shuffle=False)
+
+    history = []
+    best_val_loss = float("inf")
+    epochs_since_best = 0
+    status = "completed"
+
+    for epoch in range(1, config["num_epochs"] + 1):
+        start = time.perf_counter()
+        train_loss = train_model(model, train_loader, optimizer, criterion, device)
+        elapsed = time.perf_counter() - start
+        val_loss, normalized_output_losses, denormalized_output_losses = validate_model(
+            model, val_loader, criterion, device, output_means, output_stds
+        )
+        history.append([
+            epoch,
+            train_loss,
+            val_loss,
+            normalized_output_losses["leak_x"],
+            normalized_output_losses["leak_y"],
+            normalized_output_losses["leak_size_lps"],
+            denormalized_output_losses["leak_x"],
+            denormalized_output_losses["leak_y"],
+            denormalized_output_losses["leak_size_lps"],
+            len(train_loader.dataset) / elapsed if elapsed > 0 else "",
+        ])
+
+        if val_loss < best_val_loss:
+            best_val_loss = val_loss
+            epochs_since_best = 0
+            if options["models_dir"]:
+                save_model_with_params(
+                    model=model,
+                    filepath=os.path.join(options["models_dir"], f"{run_id}.pth"),
+                    input_means=normalization_params["input_means"],
+                    input_stds=normalization_params["input_stds"],
+                    output_means=output_means,
+                    output_stds=output_stds,
+                )
+        else:
+            epochs_since_best += 1
+
+        # A run that has trained every epoch is completed, whatever the stopping rules say;
+        # its loss is still recorded for peers with longer schedules
+        last_epoch = epoch == config["num_epochs"]
+        if not last_epoch and options["patience"] is not None and epochs_since_best >= options["patience"]:
+            status = "stopped_patience"
+            break
+        stop = _should_stop(_WORKER["peer_losses"], _WORKER["lock"], epoch, best_val_loss,
+                            options["grace_epochs"], options["min_peers"])
+        if stop and not last_epoch:
+            status = "stopped_median"
+            break
+
+    return run_id, config, status, best_val_loss, history
+
+
+def run_sweep(
+    model_cls,
+    csv_file,
+    input_columns,
+    output_columns,
+    search_space,
+    num_workers=None,
+    results_path="models/sweep_results.csv",
+    models_dir="models/sweep",
+    val_fraction=0.2,
+    grace_epochs=3,
+    min_peers=2,
+    patience=None,
+    seed=42,
+):
+    """
+    Train every configuration of a search space in parallel worker processes.
+
+    The dataset is loaded and normalized once; its tensors are placed in shared memory so the
+    workers read the same storage instead of each loading the CSV. All candidates use the same
+    train/validation split. Losing runs are stopped early with a median stopping rule on the
+    per-epoch validation loss (and optionally a patience limit). Every epoch of every run is
+    appended to a single results table.
+
+    Parameters:
+    - model_cls (type): Model class taking input_dim, hidden_dims and output_dim (e.g. LeakLocalizationNN).
+    - csv_file (str): Path to the training CSV.
+    - input_columns, output_columns (list of str): Columns used as inputs and targets.
+    - search_space (dict): See expand_search_space. Missing keys fall back to the
+      Localization.py defaults.
+    - num_workers (int): Parallel training processes. Default is one per core.
+    - results_path (str): CSV results table (appended to).
+    - models_dir (str): Directory for the best checkpoint of each run, or None to skip saving.
+    - val_fraction (float): Fraction of samples held out for validation.
+    - grace_epochs (int): Epochs every run gets before the median rule applies.
+    - min_peers (int): Minimum other runs reported at an epoch before the median rule applies.
+    - patience (int): Stop a run after this many epochs without improvement (optional).
+    - seed (int): Seed for the split and for every run.
+
+    Returns:
+    - list of dict: Per-run summary sorted by best validation loss.
+    """
+    defaults = {"hidden_dims": [[45, 40, 45]], "lr": [0.001], "batch_size": [32], "num_epochs": [20]}
+    candidates = expand_search_space({**defaults, **search_space})
+
+    set_seed(seed)
+    dataset = LeakDataset(csv_file, input_columns, output_columns)
+    inputs = dataset.inputs.share_memory_()
+    outputs = dataset.outputs.share_memory_()
+    permutation = torch.randperm(len(dataset))
+    val_size = int(round(val_fraction * len(dataset)))
+    val_idx, train_idx = permutation[:val_size], permutation[val_size:]
+
+    cores = os.cpu_count() or 1
+    if num_workers is None:
+        num_workers = cores
+    num_workers = max(1, min(num_workers, len(candidates)))
+    threads = max(1, cores // num_workers)
+
+    sweep_id = time.strftime("sweep%Y%m%d_%H%M%S")
+    options = {"models_dir": models_dir, "grace_epochs": grace_epochs, "min_peers": min_peers, "patience": patience}
+    tasks = [(f"{sweep_id}_{i:03d}", config, options) for i, config in enumerate(candidates)]
+
+    if os.path.dirname(results_path):
+        os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    write_header = not os.path.exists(results_path)
+
+    ctx = mp.get_context("spawn")
+    manager = ctx.Manager()
+    peer_losses = manager.dict()
+    lock = manager.Lock()
+    summary = []
+
+    with ctx.Pool(
+        num_workers,
+        initializer=_init_worker,
+        initargs=(model_cls, inputs, outputs, train_idx, val_idx, dataset.get_normalization_params(),
+                  peer_losses, lock, threads, seed),
+    ) as pool, open(results_path, mode="a", newline="") as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(SWEEP_RESULT_COLUMNS)
+
+        for run_id, config, status, best_val_loss, history in pool.imap_unordered(_train_candidate, tasks):
+            for row in history:
+                writer.writerow([sweep_id, run_id, "-".join(str(d) for d in config["hidden_dims"]),
+                                 config["lr"], config["batch_size"], config["num_epochs"], status] + row)
+            f.flush()
+
+            summary.append({
+                "run_id": run_id,
+                **config,
+                "status": status,
+                "epochs_run": len(history),
+                "best_val_loss": best_val_loss,
+            })
+            print(f"{run_id} {config} -> {status} after {len(history)} epochs, best val loss {best_val_loss:.4f}")
+
+    manager.shutdown()
+    summary.sort(key=lambda r: r["best_val_loss"])
+    return summary
+
+
+if __name__ == "__main__":
+    from ..Localization import LeakLocalizationNN
+
+    search_space = {
+        "hidden_dims": [[45, 40, 45], [50, 50, 100, 70], [64, 64], [128, 64, 32]],
+        "lr": [0.001, 0.0005],
+        "batch_size": [32, 64],
+        "num_epochs": [20],
+    }
+
+    csv_file = "leak_data.csv"  # Path to your CSV file
+    input_columns = ["Node1", "Node2", "Node3", "Node4", "Node5"]  # Define input columns
+    output_columns = ["X_coor", "Y_coor", "burst_size"]  # Define output columns
+
+    results = run_sweep(LeakLocalizationNN, csv_file, input_columns, output_columns, search_space)
+    for r in results[:5]:
+        print(r)
@@ -1,16 +1,38 @@
+import csv
+import os
 import torch
 
+# Column layout of the per-epoch training loss log
+LOSS_LOG_COLUMNS = [
+    "epoch",
+    "train_loss",
+    "val_loss",
+    "val_leak_x_loss_norm",
+    "val_leak_y_loss_norm",
+    "val_leak_size_loss_norm",
+    "val_leak_x_loss_real",
+    "val_leak_y_loss_real",
+    "val_leak_size_loss_real",
+    "train_samples_per_sec",
+]
+
 # Training function
-def train_model(model, dataloader, optimizer, criterion, device):
+def train_model(model, dataloader, optimizer, criterion, device, autocast_dtype=None, augment=None):
+    # augment: optional callable applied to every input batch (e.g. utils.Augment.SensorAugmentation)
     model.train()  # Set the model to training mode
     total_loss = 0.0
+    device_type = torch.device(device).type
 
     for inputs, targets in dataloader:
         inputs, targets = inputs.to(device), targets.to(device)  # Move data to device
+        if augment is not None:
+            inputs = augment(inputs)  # Fresh sensor noise, drift and dropout every batch
         optimizer.zero_grad()  # Zero gradients from the previous step
 
-        outputs = model(inputs)  # Forward pass
-        loss = criterion(outputs, targets)  # Calculate loss
+        # Forward pass, optionally in mixed precision (e.g. torch.bfloat16 on CPU)
+        with torch.autocast(device_type=device_type, dtype=autocast_dtype, enabled=autocast_dtype is not None):
+            outputs = model(inputs)
+            loss = criterion(outputs.float(), targets)  # Calculate loss
         loss.backward()  # Backpropagation
         optimizer.step()  # Update weights
 
@@ -56,4 +78,36 @@ def validate_model(model, dataloader, criterion, device,output_means, output_std
         normalized_output_losses[key] /= num_samples
         denormalized_output_losses[key] /= num_samples  # Average over samples for real-world units
 
-    return total_loss, normalized_output_losses, denormalized_output_losses
\ No newline at end of file
+    return total_loss, normalized_output_losses, denormalized_output_losses
+
+
+def append_loss_log(loss_log_path, epoch, train_loss, val_loss, normalized_output_losses, denormalized_output_losses, samples_per_sec=None):
+    """
+    Append one epoch to the training loss CSV, writing the header if the file is new.
+
+    Parameters:
+    - loss_log_path (str): Path to the CSV log file.
+    - epoch (int): 1-based epoch number.
+    - train_loss (float): Mean training loss for the epoch.
+    - val_loss (float): Mean validation loss for the epoch.
+    - normalized_output_losses (dict): Per-output validation losses in normalized space.
+    - denormalized_output_losses (dict): Per-output validation losses in real units.
+    - samples_per_sec (float): Training throughput for the epoch (optional).
+    """
+    write_header = not os.path.exists(loss_log_path)
+    with open(loss_log_path, mode="a", newline="") as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(LOSS_LOG_COLUMNS)
+        writer.writerow([
+            epoch,
+            train_loss,
+            val_loss,
+            normalized_output_losses["leak_x"],
+            normalized_output_losses["leak_y"],
+            normalized_output_losses["leak_size_lps"],
+            denormalized_output_losses["leak_x"],
+            denormalized_output_losses["leak_y"],
+            denormalized_output_losses["leak_size_lps"],
+            samples_per_sec if samples_per_sec is not None else "",
+        ])
@@ -62,3 +62,58 @@ export async function fetchLeakPredictions() {
   }
   return response.json();
 }
+
+/**
+ * Score many observation windows in one call
+ * @param {number[][]} pressures - N x 504 matrix of hourly pressures in model column order
+ * @param {number} batchSize - Rows per forward pass on the backend
+ */
+export async function fetchBatchLeakPredictions(pressures, batchSize = 4096) {
+  const response = await fetch(`${API_BASE_URL}/leak-predictions/batch?batch_size=${batchSize}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ pressures }),
+  });
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.detail || `Failed to fetch batch predictions: ${response.statusText}`);
+  }
+  return response.json();
+}
+
+/**
+ * Run a leak simulation and receive its progress as Server-Sent Events
+ * @param {Object} params - Same query parameters as /api/generate_data
+ * @param {Object} handlers - Optional onProgress, onResult, onPrediction and onError callbacks
+ * @returns {Function} Call to close the stream early
+ */
+export function streamSimulation(params, { onProgress, onResult, onPrediction, onError } = {}) {
+  const query = new URLSearchParams(params).toString();
+  const source = new EventSource(`${API_BASE_URL}/stream/generate_data?${query}`);
+
+  source.addEventListener('progress', (event) => onProgress?.(JSON.parse(event.data)));
+  source.addEventListener('result', (event) => onResult?.(JSON.parse(event.data)));
+  source.addEventListener('prediction', (event) => {
+    onPrediction?.(JSON.parse(event.data));
+    source.close();
+  });
+  source.addEventListener('error', (event) => {
+    source.close();
+    onError?.(event.data ? JSON.parse(event.data) : { detail: 'Simulation stream failed' });
+  });
+
+  return () => source.close();
+}
+
+/**
+ * Subscribe to new leak predictions pushed by the backend (replaces polling)
+ * @param {Function} onPrediction - Called with each prediction
+ * @returns {Function} Call to unsubscribe
+ */
+export function subscribeLeakPredictions(onPrediction) {
+  const source = new EventSource(`${API_BASE_URL}/stream/predictions`);
+  source.addEventListener('prediction', (event) => onPrediction(JSON.parse(event.data)));
+  return () => source.close();
+}
@@ -0,0 +1,35 @@
+"""
+Shared fixtures; run from the repository root (python -m pytest), which the backend's
+relative model and network paths assume
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The API's history store and prediction archive go to a scratch directory, never backend/
+os.environ.setdefault("LEAK_API_DATA_DIR", tempfile.mkdtemp(prefix="leak-tests-"))
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+MAIN_INP = BACKEND_DIR / "main_network.inp"
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """The FastAPI app's module with an empty simulation cache and generated_data.csv under tmp_path"""
+    from backend import main
+
+    monkeypatch.setattr(main, "GENERATED_CSV", tmp_path / "generated_data.csv")
+    monkeypatch.setattr(main, "generated_csv", {"text": None, "stale": False})
+    main.simulation_cache.invalidate()
+    return main
+
+
+@pytest.fixture
+def client(api):
+    from fastapi.testclient import TestClient
+
+    with TestClient(api.app) as c:
+        yield c
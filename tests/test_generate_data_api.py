@@ -0,0 +1,54 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SCENARIOS = [("NODE_474", 0.5), ("NODE_1383", 1.5), ("NODE_657", 3.0)]
+
+
+def read_events(response):
+    """(event, data) pairs of a Server-Sent Events body"""
+    events = []
+    for message in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def assert_same_prediction(a, b):
+    for field in ("leak_x", "leak_y", "leak_size_lps"):
+        np.testing.assert_allclose(np.ravel(a[field]), np.ravel(b[field]), rtol=1e-5)
+
+
+def test_concurrent_streams_score_their_own_rows(api, client):
+    def stream(scenario):
+        node_id, emitter_cof = scenario
+        response = client.get("/api/stream/generate_data", params={"node_id": node_id, "emitter_cof": emitter_cof})
+        assert response.status_code == 200
+        return dict((event, data) for event, data in read_events(response) if event != "progress")
+
+    with ThreadPoolExecutor(len(SCENARIOS)) as pool:
+        results = list(pool.map(stream, SCENARIOS))
+
+    for (node_id, _), events in zip(SCENARIOS, results):
+        assert "error" not in events
+        assert events["result"]["leak_node"] == node_id
+        expected = api.leak_detector.predict_frame(api.generated_row_frame(events["result"]))
+        assert_same_prediction(events["prediction"], expected)
+    # Different scenarios must not collapse onto one shared row
+    assert len({round(float(np.ravel(e["prediction"]["leak_size_lps"])[0]), 6) for e in results}) > 1
+
+
+def test_cache_hit_makes_its_own_row_current(api, client):
+    (node_a, c_a), (node_b, c_b) = SCENARIOS[:2]
+    first = client.get("/api/generate_data", params={"node_id": node_a, "emitter_cof": c_a}).json()
+    client.get("/api/generate_data", params={"node_id": node_b, "emitter_cof": c_b})
+    again = client.get("/api/generate_data", params={"node_id": node_a, "emitter_cof": c_a}).json()
+    assert api.simulation_cache.stats()["hits"] == 1
+    assert again == first
+    # Nothing is written until the current scenario is read
+    assert not api.GENERATED_CSV.exists()
+
+    predictions = client.get("/api/leak-predictions").json()
+    assert_same_prediction(predictions, api.leak_detector.predict_frame(api.generated_row_frame(first)))
+    assert api.GENERATED_CSV.exists()
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from backend.generate_data import OBS_NODES, DataGenerator
+from backend.periodic_baseline import PeriodicBaseline
+
+from .conftest import MAIN_INP
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return PeriodicBaseline(MAIN_INP, step_m=60, run_name="test_periodic_baseline", keep_files=False)
+
+
+@pytest.mark.parametrize("collection_start_hour", [0, 6, 13])
+def test_tiled_cycle_matches_a_live_no_leak_run(baseline, collection_start_hour):
+    # A zero emitter leaves the network as it is: the live run is the no-leak baseline
+    gd = DataGenerator(str(MAIN_INP), step_m=60, duration_h=24, run_name="test_periodic_baseline", keep_files=False)
+    data = gd.generate_data(OBS_NODES[0], 0.0, collection_start_hour, 60, 4, write_csv=False)
+    live = np.array([[data[f"{nid}_Hour{h}"] for nid in OBS_NODES] for h in range(24)], dtype=np.float64)
+
+    np.testing.assert_allclose(baseline.hourly(collection_start_hour, 24), live, atol=1e-3)
+
+
+def test_series_rejects_off_grid_starts(baseline):
+    with pytest.raises(ValueError):
+        baseline.series(baseline.step_s // 2, 4)
@@ -0,0 +1,21 @@
+import pytest
+
+from backend.request_profiler import ADMIN_TOKEN_ENV, PROFILE_MODES, RequestProfile
+
+
+@pytest.mark.parametrize("running", PROFILE_MODES)
+def test_one_profiled_request_at_a_time(client, monkeypatch, running):
+    monkeypatch.setenv(ADMIN_TOKEN_ENV, "secret")
+    headers = {"X-Admin-Token": "secret"}
+
+    profile = RequestProfile(running)
+    profile.start()
+    try:
+        for mode in PROFILE_MODES:
+            assert client.get("/", headers={**headers, "X-Profile": mode}).status_code == 409
+    finally:
+        profile.stop()
+    for mode in PROFILE_MODES:
+        response = client.get("/", headers={**headers, "X-Profile": mode})
+        assert response.status_code == 200
+        assert "X-Profile-Id" in response.headers
@@ -0,0 +1,44 @@
+import base64
+
+import numpy as np
+import pytest
+
+from backend.generate_data import OBS_NODES
+from backend.response_schema import LEAK_FIELDS
+
+PARAMS = {"node_id": "NODE_1383", "emitter_cof": 1.5, "collection_start_hour": 2, "leak_start_min": 90,
+          "leak_duration_hours": 4}
+
+
+def decode(array):
+    """A v2 array (JSON list with nulls, or base64 float32) as float64"""
+    if isinstance(array, dict):
+        packed = np.frombuffer(base64.b64decode(array["data"]), dtype=array["dtype"]).reshape(array["shape"])
+        return packed.astype(np.float64)
+    return np.array(array, dtype=np.float64)  # None -> NaN
+
+
+@pytest.mark.parametrize("encoding", ["json", "base64"])
+def test_v2_carries_the_same_data_as_v1(client, encoding):
+    v1 = client.get("/api/generate_data", params=PARAMS).json()
+    v2 = client.get("/api/generate_data", params={**PARAMS, "format": "v2", "encoding": encoding}).json()
+    # base64 packs float32
+    rtol = 1e-6 if encoding == "base64" else 0
+
+    assert v2["format"] == "v2"
+    assert v2["nodes"] == OBS_NODES
+    assert v2["time_s"] == [PARAMS["collection_start_hour"] * 3600 + 3600 * h for h in range(24)]
+    flat = np.array([np.nan if v1[f"{nid}_Hour{h}"] == "" else v1[f"{nid}_Hour{h}"]
+                     for nid in OBS_NODES for h in range(24)], dtype=np.float64).reshape(len(OBS_NODES), 24)
+    np.testing.assert_allclose(decode(v2["pressures"]), flat, rtol=rtol)
+
+    for field in LEAK_FIELDS:
+        if field in v1:
+            assert v2[field] == (None if v1[field] == "" else v1[field]), field
+    assert v2["average_pressure"] == pytest.approx(v1["average_pressure"])
+    np.testing.assert_allclose(decode(v2["node_average_pressure"]), np.nanmean(flat, axis=1))
+
+    series = v2["leak_series"]
+    assert [str(t) for t in series["time_s"]] == list(v1["pressure_history"])
+    np.testing.assert_allclose(decode(series["pressure"]), list(v1["pressure_history"].values()), rtol=rtol)
+    np.testing.assert_allclose(decode(series["demand"]), list(v1["demand_history"].values()), rtol=rtol)
@@ -0,0 +1,59 @@
+import pytest
+
+from backend import legacy_generate_data
+from backend.generate_data import OBS_NODES, DataGenerator
+from backend.legacy_generate_data import build_dataset
+from backend.scenario_quarantine import ScenarioQuarantine, SimulationDiverged
+
+from .conftest import MAIN_INP
+
+HOUR = 3600
+# Drives pressures negative (EPANET warning 6) five hours into the run
+DIVERGING = ("NODE_500", 2.0)
+
+
+def diverged(leak_node, emitter_cof, leak_start_s, leak_duration_s=4 * HOUR):
+    return SimulationDiverged(leak_node, emitter_cof, leak_start_s + HOUR, "test", code=6,
+                              leak_start_s=leak_start_s, leak_duration_s=leak_duration_s)
+
+
+def test_entries_are_keyed_on_start_and_duration(tmp_path):
+    quarantine = ScenarioQuarantine(MAIN_INP, tmp_path / "quarantine.json")
+    quarantine.add(diverged("NODE_474", 0.5, 2 * HOUR))
+
+    assert quarantine.contains("NODE_474", 0.5, 2 * HOUR, 4 * HOUR)
+    assert not quarantine.contains("NODE_474", 0.5, 5 * HOUR, 4 * HOUR)
+    assert not quarantine.contains("NODE_474", 0.5, 2 * HOUR, 2 * HOUR)
+    assert not quarantine.contains("NODE_474", 1.0, 2 * HOUR, 4 * HOUR)
+
+    reloaded = ScenarioQuarantine(MAIN_INP, tmp_path / "quarantine.json")
+    assert reloaded.contains("NODE_474", 0.5, 2 * HOUR, 4 * HOUR)
+    assert len(reloaded) == 1
+
+
+def test_build_dataset_skips_only_the_quarantined_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(legacy_generate_data, "EPANET_OUT_DIR", tmp_path)
+    quarantine = ScenarioQuarantine(MAIN_INP, tmp_path / "quarantine.json")
+    quarantine.add(diverged("NODE_474", 0.5, 2 * HOUR))
+
+    df = build_dataset(str(MAIN_INP), OBS_NODES, [], sample_minutes=60, quarantine=quarantine,
+                       scenarios=[("NODE_474", 0.5, 2), ("NODE_474", 0.5, 5), (*DIVERGING, 1)],
+                       include_baseline=False)
+
+    assert df["leak_node"].tolist() == ["NODE_474"]
+    assert df["leak_start_hr"].astype(float).tolist() == [5.0]
+    # The diverging scenario is dropped and recorded with its own start
+    assert quarantine.contains(*DIVERGING, 1 * HOUR, 4 * HOUR)
+    assert not quarantine.contains(*DIVERGING, 2 * HOUR, 4 * HOUR)
+
+
+def test_warnings_abort_only_when_asked():
+    # The dashboard's simulation returns data through an EPANET warning; dataset builds opt in to aborting
+    kwargs = dict(step_m=60, duration_h=24, run_name="test_scenario_quarantine", keep_files=False)
+    data = DataGenerator(str(MAIN_INP), **kwargs).generate_data(*DIVERGING, 0, 60, 4, write_csv=False)
+    assert data["leak_node"] == DIVERGING[0]
+
+    with pytest.raises(SimulationDiverged) as raised:
+        DataGenerator(str(MAIN_INP), abort_on_warnings=True, **kwargs).generate_data(*DIVERGING, 0, 60, 4, write_csv=False)
+    assert raised.value.code == 6
+    assert (raised.value.leak_start_s, raised.value.leak_duration_s) == (HOUR, 4 * HOUR)
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from backend.generate_data import DataGenerator
+from backend.scenario_quarantine import ScenarioQuarantine, SimulationDiverged
+from backend.signature_index import SignatureIndex
+from backend.signature_table import SignatureTable, build_signature_table
+
+from .conftest import MAIN_INP
+
+NODES = ["NODE_474", "NODE_1383", "NODE_657", "NODE_444"]
+QUARANTINED = "NODE_444"
+LEAK_START_MIN, LEAK_DURATION_H, EMITTER = 60, 4, 1.0
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    root = tmp_path_factory.mktemp("signatures")
+    quarantine = ScenarioQuarantine(MAIN_INP, root / "quarantine.json")
+    for start_hour in (0, 6):
+        leak_start_s = start_hour * 3600 + LEAK_START_MIN * 60
+        quarantine.add(SimulationDiverged(QUARANTINED, EMITTER, 0, "test", leak_start_s=leak_start_s,
+                                          leak_duration_s=LEAK_DURATION_H * 3600))
+    build_signature_table(MAIN_INP, root / "table", [EMITTER], [LEAK_START_MIN], [LEAK_DURATION_H], [0, 6],
+                          nodes=NODES, quarantine=quarantine)
+    return SignatureTable(root / "table")
+
+
+def live_row(node_id, collection_start_hour):
+    gd = DataGenerator(str(MAIN_INP), step_m=60, duration_h=24, run_name="test_signature_index", keep_files=False)
+    data = gd.generate_data(node_id, EMITTER, collection_start_hour, LEAK_START_MIN, LEAK_DURATION_H, write_csv=False)
+    return pd.DataFrame([data]).replace("", float("nan"))
+
+
+def test_index_matches_rows_from_its_own_collection_start(table):
+    candidates = SignatureIndex(table, 6).query_frame(live_row("NODE_1383", 6), k=len(NODES))[0]
+    assert candidates[0]["node_id"] == "NODE_1383"
+    assert candidates[0]["distance"] < 1e-2
+    # A junction whose only scenario is quarantined is never ranked, even when k asks for it
+    assert QUARANTINED not in {c["node_id"] for c in candidates}
+    assert len(candidates) == len(NODES) - 1
+
+
+def test_rows_from_another_start_are_rejected(table):
+    with pytest.raises(ValueError):
+        SignatureIndex(table, 0).query_frame(live_row("NODE_1383", 6))
+    with pytest.raises(ValueError):
+        SignatureIndex(table, 3)
@@ -0,0 +1,27 @@
+import threading
+
+import pytest
+import torch
+
+from backend.Localization import LeakLocalizationNN
+from backend.utils import Sweep
+
+OUTPUTS = ("leak_x", "leak_y", "leak_size_lps")
+
+
+@pytest.mark.parametrize("num_epochs,status,epochs_run", [(1, "completed", 1), (3, "stopped_median", 1)])
+def test_median_rule_does_not_relabel_a_finished_run(num_epochs, status, epochs_run):
+    inputs, outputs = torch.randn(40, 6), torch.randn(40, 3)
+    normalization = {"output_means": dict.fromkeys(OUTPUTS, 0.0), "output_stds": dict.fromkeys(OUTPUTS, 1.0),
+                     "input_means": {}, "input_stds": {}}
+    # Peers with a perfect loss at every epoch: the median rule fires from the first epoch on
+    peer_losses = {epoch: [0.0, 0.0] for epoch in range(1, num_epochs + 1)}
+    Sweep._init_worker(LeakLocalizationNN, inputs, outputs, torch.arange(30), torch.arange(30, 40), normalization,
+                       peer_losses, threading.Lock(), 1, 0)
+
+    config = {"hidden_dims": [4], "lr": 1e-3, "batch_size": 8, "num_epochs": num_epochs}
+    options = {"models_dir": None, "patience": None, "grace_epochs": 0, "min_peers": 2}
+    _, _, got_status, _, history = Sweep._train_candidate(("run", config, options))
+
+    assert got_status == status
+    assert len(history) == epochs_run
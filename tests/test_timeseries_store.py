@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from backend.timeseries_store import TimeSeriesStore
+
+T0 = 1_700_000_000
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    # Three days with an empty day-long gap, uneven spacing and several points per second
+    times = np.sort(np.r_[T0 + rng.integers(0, 86400, 2000), T0 + 2 * 86400 + rng.integers(0, 86400, 2000)])
+    return times, rng.normal(50.0, 5.0, len(times)).astype(np.float32)
+
+
+def reference(times, values, width, start, end):
+    keep = (times >= start) & (times < end)
+    buckets = times[keep] // width
+    result = {"time_s": [], "count": [], "mean": [], "min": [], "max": []}
+    for b in np.unique(buckets):
+        v = values[keep][buckets == b].astype(np.float64)
+        result["time_s"].append(int(b) * width)
+        result["count"].append(len(v))
+        result["mean"].append(v.mean())
+        result["min"].append(v.min())
+        result["max"].append(v.max())
+    return result
+
+
+def append_in_batches(store, times, values, batches=7):
+    for chunk in np.array_split(np.arange(len(times)), batches):
+        store.append("pressure", "NODE_474", times[chunk], values[chunk])
+
+
+@pytest.mark.parametrize("resolution,width", [("hourly", 3600), ("daily", 86400)])
+def test_rollups_match_a_groupby_over_raw_points(tmp_path, points, resolution, width):
+    times, values = points
+    append_in_batches(TimeSeriesStore(tmp_path, chunk_points=500), times, values)
+    # Read back from disk by a fresh store; the range starts and ends mid-bucket
+    store = TimeSeriesStore(tmp_path, chunk_points=500)
+    start, end = T0 + 5400, T0 + 3 * 86400 - 5400
+    got = store.query("pressure", "NODE_474", start, end, resolution)
+
+    # Rollups cover whole buckets: the expected buckets are those overlapping [start, end)
+    expected = reference(times, values, width, start // width * width, -(-end // width) * width)
+    assert got["time_s"] == expected["time_s"]
+    assert got["count"] == expected["count"]
+    np.testing.assert_allclose(got["mean"], expected["mean"], rtol=1e-9)
+    np.testing.assert_allclose(got["min"], expected["min"])
+    np.testing.assert_allclose(got["max"], expected["max"])
+
+
+def test_raw_range_spans_chunks_and_drops_older_points(tmp_path, points):
+    times, values = points
+    store = TimeSeriesStore(tmp_path, chunk_points=500)
+    append_in_batches(store, times, values)
+    assert store.append("pressure", "NODE_474", [times[0]], [0.0]) == 0
+
+    start, end = int(times[700]), int(times[3300])
+    got = store.query("pressure", "NODE_474", start, end, "raw")
+    keep = (times >= start) & (times < end)
+    assert got["time_s"] == times[keep].tolist()
+    np.testing.assert_array_equal(np.array(got["value"], dtype=np.float32), values[keep])
+    assert store.latest("pressure", "NODE_474") == int(times[-1])
+    assert store.query("pressure", "NODE_1383", start, end)["time_s"] == []
+
+
+@pytest.mark.parametrize("key", ["..", ".", "", "a/b", "NODE 474"])
+def test_names_that_are_not_plain_directory_names_are_rejected(tmp_path, key):
+    store = TimeSeriesStore(tmp_path)
+    with pytest.raises(ValueError):
+        store.append("pressure", key, [T0], [1.0])
+    with pytest.raises(ValueError):
+        store.query("pressure", key, T0, T0 + 3600)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_telemetry_history_is_kept_for_network_nodes_only(api, client):
+    readings = [{"node_id": node_id, "timestamp": "2026-01-01T00:00:00Z", "pressure": 40.0, "demand": 1.0}
+                for node_id in ("..", "a/b", "NODE_474")]
+    assert client.post("/api/telemetry", json={"readings": readings}).status_code == 200
+
+    for metric in ("pressure", "demand"):
+        assert set(api.history.keys(metric)) <= set(api.parser.nodes)
+        assert "NODE_474" in api.history.keys(metric)
+    assert not (api.history.root / "raw").exists()
+    assert client.get("/api/prediction-history", params={"source": ".."}).status_code == 400